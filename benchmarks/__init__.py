@@ -0,0 +1,3 @@
+# Benchmarks - Performance measurements on synthetic SEC data
+# The Mountain Path - World of Finance
+# Prof. V. Ravichandran
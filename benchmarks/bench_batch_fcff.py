@@ -0,0 +1,67 @@
+"""
+Benchmark: universe FCFF by looping calculate_historical_fcff vs. the batch engine
+Run from the repository root:  python -m benchmarks.bench_batch_fcff
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import argparse
+import logging
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.bench_compact_storage import build
+from valuation.batch_fcff import BatchFCFFEngine
+from valuation.fcff import FCFFCalculator
+
+
+def run(companies: int, years: int, sample: int, workers: int):
+    for name in ("valuation.fcff", "valuation.batch_fcff"):
+        logging.getLogger(name).setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        start = time.perf_counter()
+        build(path, False, companies, years)
+        built = time.perf_counter() - start
+        conn = sqlite3.connect(path)
+
+        calculator = FCFFCalculator(conn)
+        start = time.perf_counter()
+        expected = {c: calculator.calculate_historical_fcff(c, years) for c in range(1, sample + 1)}
+        loop = (time.perf_counter() - start) / sample * companies
+
+        timings = {}
+        for max_workers in (0, workers):
+            engine = BatchFCFFEngine(conn, max_workers=max_workers)
+            start = time.perf_counter()
+            result = engine.compute()
+            timings[max_workers] = time.perf_counter() - start
+        conn.close()
+
+    assert len(result["fcff"]) == companies * years
+    groups = BatchFCFFEngine.by_company(result)
+    for company_id, records in expected.items():
+        rows = groups[company_id]
+        for column in ("fiscal_year", "ebit", "tax_rate", "nopat", "da", "capex", "change_nwc", "fcff"):
+            assert np.array_equal(rows[column], [record[column] for record in records]), column
+
+    print(f"{companies:,} companies x {years} years = {len(result['fcff']):,} company-years "
+          f"(database built in {built:.0f}s)")
+    print(f"  calculate_historical_fcff loop: {loop:7.2f}s (extrapolated from {sample:,})")
+    print(f"  batch engine, inline:           {timings[0]:7.2f}s")
+    print(f"  batch engine, {workers} processes:     {timings[workers]:7.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--companies", type=int, default=5000)
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--sample", type=int, default=500,
+                        help="companies run through the per-company loop")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    run(args.companies, args.years, args.sample, args.workers)
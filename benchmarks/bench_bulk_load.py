@@ -0,0 +1,67 @@
+"""
+Benchmark: bulk load from a synthetic companyfacts.zip
+Run from the repository root:  python -m benchmarks.bench_bulk_load
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import argparse
+import json
+import logging
+import sqlite3
+import tempfile
+import zipfile
+from pathlib import Path
+
+from benchmarks.synthetic import make_company_facts
+from database.schema import FinancialDatabaseSchema
+from extraction.bulk_loader import CompanyFactsZipLoader
+
+
+def write_synthetic_zip(path: Path, companies: int, years: int, extra_tags: int):
+    """Write a companyfacts.zip-shaped archive with one member per CIK"""
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for cik in range(1, companies + 1):
+            payload = make_company_facts(cik, years=years, extra_tags=extra_tags)
+            archive.writestr(f"CIK{cik:010d}.json", json.dumps(payload))
+
+
+def run(companies: int, years: int, extra_tags: int, workers: int,
+        batch_size: int, on_disk: bool):
+    logging.getLogger("extraction.sec_extractor").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        zip_path = Path(tmp) / "companyfacts.zip"
+        write_synthetic_zip(zip_path, companies, years, extra_tags)
+        print(f"Synthetic archive: {companies} companies, "
+              f"{zip_path.stat().st_size / 1e6:.1f} MB compressed")
+
+        # On disk, every commit is an fsync; in memory only statement cost shows
+        conn = sqlite3.connect(Path(tmp) / "bench.db" if on_disk else ":memory:")
+        FinancialDatabaseSchema.create_schema(conn)
+        stats = CompanyFactsZipLoader(conn, zip_path, max_workers=workers,
+                                      batch_size=batch_size).load()
+
+        stored = conn.execute("SELECT COUNT(*) FROM financial_periods").fetchone()[0]
+        assert stats["companies"] == companies
+        assert stored > 0
+        conn.close()
+
+    print(f"  {stats['companies']} companies, {stats['periods']} periods, "
+          f"{stats['facts']:,} facts in {stats['seconds']:.2f}s")
+    print(f"  throughput: {stats['facts_per_sec']:,.0f} facts/sec")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--companies", type=int, default=50)
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--extra-tags", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="parser processes (0 = parse inline)")
+    parser.add_argument("--batch-size", type=int, default=100,
+                        help="companies per commit")
+    parser.add_argument("--on-disk", action="store_true",
+                        help="load into a database file instead of :memory:")
+    args = parser.parse_args()
+    run(args.companies, args.years, args.extra_tags, args.workers,
+        args.batch_size, args.on_disk)
@@ -0,0 +1,73 @@
+"""
+Benchmark: XBRL tag classification, per-call lists vs. compiled lookup table
+Run from the repository root:  python -m benchmarks.bench_classifier
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import argparse
+import time
+
+from benchmarks.synthetic import make_company_facts
+from database.xbrl_classifier import XBRLTagClassifier, get_tag_classifier
+from database.schema import FinancialDatabaseSchema
+
+
+def classify_with_lists(xbrl_tag: str):
+    """The original classify_line_item: three lists rebuilt on every call"""
+    income_tags = [
+        "Revenues", "CostOfRevenue", "GrossProfit", "OperatingExpenses",
+        "OperatingIncomeLoss", "InterestExpense", "OtherIncomeExpenseNet",
+        "IncomeTaxExpenseBenefit", "NetIncomeLoss"
+    ]
+    balance_tags = [
+        "Assets", "AssetsCurrent", "AssetsNonCurrent", "Cash",
+        "AccountsReceivable", "Inventory", "PropertyPlantAndEquipmentNet",
+        "Goodwill", "IntangibleAssetsNetOtherThanGoodwill",
+        "Liabilities", "LiabilitiesCurrent", "AccountsPayable",
+        "LongTermBorrowings", "StockholdersEquity"
+    ]
+    cashflow_tags = [
+        "NetCashProvidedByUsedInOperatingActivities",
+        "PaymentsForAcquisitionsOfProductiveAssets",
+        "DepreciationDepletionAndAmortization", "DepreciationAndAmortization"
+    ]
+    if xbrl_tag in income_tags:
+        return "INCOME", xbrl_tag
+    elif xbrl_tag in balance_tags:
+        return "BALANCE_SHEET", xbrl_tag
+    elif xbrl_tag in cashflow_tags:
+        return "CASH_FLOW", xbrl_tag
+    return "OTHER", xbrl_tag
+
+
+def run(extra_tags: int, rounds: int):
+    payload = make_company_facts(1, years=1, extra_tags=extra_tags)
+    tags = list(payload["facts"]["us-gaap"]) + list(get_tag_classifier().tags)
+    print(f"Full tag set: {len(tags):,} tags x {rounds} rounds")
+
+    start = time.perf_counter()
+    compiled = XBRLTagClassifier(FinancialDatabaseSchema.XBRL_TAG_MAPPING,
+                                 FinancialDatabaseSchema.XBRL_STATEMENT_TYPES)
+    compile_time = time.perf_counter() - start
+
+    timings = {}
+    for label, classify in (("per-call lists", classify_with_lists),
+                            ("compiled table", compiled.classify)):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for tag in tags:
+                classify(tag)
+        timings[label] = (time.perf_counter() - start) / (rounds * len(tags))
+
+    print(f"  compile once:    {compile_time * 1e6:8.1f} us")
+    for label, per_call in timings.items():
+        print(f"  {label:15s} {per_call * 1e9:8.1f} ns / tag")
+    print(f"  speedup:         {timings['per-call lists'] / timings['compiled table']:8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--extra-tags", type=int, default=1500)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    run(args.extra_tags, args.rounds)
@@ -0,0 +1,142 @@
+"""
+Benchmark: on-disk size and read latency, statement tables vs. compact facts store
+Run from the repository root:  python -m benchmarks.bench_compact_storage
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import argparse
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from database.period_facts import deferred_refresh, refresh_period_facts
+from database.schema import FinancialDatabaseSchema
+from database.xbrl_classifier import get_tag_classifier
+
+
+def statement_rows(companies: int, years: int):
+    """(period_id, statement_type, line_item, xbrl_tag, value) for every mapped tag"""
+    classifier = get_tag_classifier()
+    tags = [(tag, *classifier.classify(tag)) for tag in classifier.tags]
+    rng = random.Random(0)
+    period_id = 0
+    for _ in range(companies):
+        for _ in range(years):
+            period_id += 1
+            for tag, statement_type, line_item in tags:
+                yield period_id, statement_type, line_item, tag, rng.uniform(1e6, 1e11)
+
+
+def build(path: Path, compact: bool, companies: int, years: int) -> float:
+    """Create and fill a database file, returning the load time"""
+    conn = sqlite3.connect(path)
+    FinancialDatabaseSchema.create_schema(conn, compact=compact)
+
+    conn.executemany(
+        "INSERT INTO companies (ticker, cik, company_name) VALUES (?, ?, ?)",
+        [(f"T{c}", str(c).zfill(10), f"Company {c}") for c in range(1, companies + 1)]
+    )
+    conn.executemany("""
+        INSERT INTO financial_periods
+        (company_id, period_end_date, fiscal_year, filing_type, filing_date)
+        VALUES (?, ?, ?, '10-K', ?)
+    """, [
+        (c, f"{year}-12-31", year, f"{year + 1}-02-15")
+        for c in range(1, companies + 1) for year in range(2024 - years, 2024)
+    ])
+
+    start = time.perf_counter()
+    with deferred_refresh(conn):
+        if compact:
+            tag_ids = dict(conn.execute("SELECT xbrl_tag, id FROM tag_dictionary"))
+            conn.executemany(
+                "INSERT INTO facts (period_id, tag_id, value) VALUES (?, ?, ?)",
+                ((pid, tag_ids[tag], value)
+                 for pid, _, _, tag, value in statement_rows(companies, years))
+            )
+        else:
+            tables = {"INCOME": "income_statement", "BALANCE_SHEET": "balance_sheet",
+                      "CASH_FLOW": "cash_flow_statement"}
+            batches = {table: [] for table in tables.values()}
+            for pid, statement_type, line_item, tag, value in statement_rows(companies, years):
+                batches[tables[statement_type]].append((pid, line_item, tag, value))
+            for table, batch in batches.items():
+                conn.executemany(f"""
+                    INSERT INTO {table} (period_id, line_item, xbrl_tag, value, unit)
+                    VALUES (?, ?, ?, ?, 'USD')
+                """, batch)
+    refresh_period_facts(conn)
+    conn.commit()
+    elapsed = time.perf_counter() - start
+
+    conn.execute("VACUUM")
+    conn.close()
+    return elapsed
+
+
+def time_reads(path: Path, periods: int, samples: int) -> dict:
+    """Mean latency of the per-period statement reads over random periods"""
+    conn = sqlite3.connect(path)
+    rng = random.Random(1)
+    queries = {name: FinancialDatabaseSchema.HOT_QUERIES[name] for name in (
+        "income_statement_by_period", "balance_sheet_by_period",
+        "cash_flow_by_period", "balance_sheet_by_tags",
+    )}
+
+    timings = {}
+    for name, (sql, params) in queries.items():
+        start = time.perf_counter()
+        for _ in range(samples):
+            conn.execute(sql, (rng.randint(1, periods),) + tuple(params[1:])).fetchall()
+        timings[name] = (time.perf_counter() - start) / samples
+
+    problems = FinancialDatabaseSchema.check_query_plans(conn)
+    conn.close()
+    assert not problems, problems
+    return timings
+
+
+def snapshot(path: Path, period_ids) -> list:
+    conn = sqlite3.connect(path)
+    rows = []
+    for table in FinancialDatabaseSchema.COMPACT_VIEWS:
+        for period_id in period_ids:
+            rows += conn.execute(f"""
+                SELECT period_id, line_item, xbrl_tag, value, unit FROM {table}
+                WHERE period_id = ? ORDER BY xbrl_tag
+            """, (period_id,)).fetchall()
+    conn.close()
+    return rows
+
+
+def run(companies: int, years: int, samples: int):
+    periods = companies * years
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for compact in (False, True):
+            path = Path(tmp) / f"{'compact' if compact else 'tables'}.db"
+            load = build(path, compact, companies, years)
+            results[compact] = (path.stat().st_size, load, time_reads(path, periods, samples))
+
+        sample = random.Random(2).sample(range(1, periods + 1), 20)
+        assert snapshot(Path(tmp) / "tables.db", sample) == snapshot(Path(tmp) / "compact.db", sample), \
+            "compatibility views return different rows"
+
+    print(f"{companies:,} companies x {years} years = {periods:,} periods, "
+          f"{len(get_tag_classifier().tags)} tags each")
+    for compact, label in ((False, "statement tables"), (True, "compact facts")):
+        size, load, timings = results[compact]
+        print(f"  {label:17s} {size / 1e6:8.1f} MB   load {load:6.1f}s")
+        for name, seconds in timings.items():
+            print(f"      {name:28s} {seconds * 1e6:7.1f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--companies", type=int, default=5000)
+    parser.add_argument("--years", type=int, default=15)
+    parser.add_argument("--samples", type=int, default=5000)
+    args = parser.parse_args()
+    run(args.companies, args.years, args.samples)
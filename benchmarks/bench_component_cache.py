@@ -0,0 +1,115 @@
+"""
+Benchmark and invalidation check: shared period component cache
+Run from the repository root:  python -m benchmarks.bench_component_cache
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import argparse
+import logging
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_compact_storage import build
+from benchmarks.bench_instrumentation import pipeline
+from database.component_cache import COMPONENT_CACHE
+from database.period_facts import get_period_facts
+from extraction.sec_extractor import SECEDGARExtractor
+from valuation.fcff import FCFFCalculator
+
+
+def check_invalidation(path: Path):
+    """Extractor writes on the same and on another connection are never served stale"""
+    reader = sqlite3.connect(path)
+    writer = sqlite3.connect(path)
+    calculator = FCFFCalculator(reader)
+    period_id = reader.execute("SELECT MIN(period_id) FROM period_facts").fetchone()[0]
+    calculator.extract_fcff_components(period_id)
+
+    # Same connection: refresh_period_facts drops exactly the rewritten period
+    extractor = SECEDGARExtractor(reader)
+    extractor.insert_financial_facts(period_id, {"OperatingIncomeLoss": {"value": 123.0}})
+    assert calculator.extract_fcff_components(period_id)["ebit"] == 123.0
+
+    # Another connection: its commit changes the reader's PRAGMA data_version
+    SECEDGARExtractor(writer).insert_financial_facts(period_id, {"OperatingIncomeLoss": {"value": 456.0}})
+    assert calculator.extract_fcff_components(period_id)["ebit"] == 456.0
+    fresh = get_period_facts(reader.cursor(), period_id)
+    assert calculator.extract_fcff_components(period_id) == {
+        component: fresh[component] for component in FCFFCalculator.COMPONENTS if component in fresh
+    }
+    reader.close()
+    writer.close()
+
+
+def time_lookups(path: Path, lookups: int) -> dict:
+    """Mean latency of an uncached fetch and of cache hits, in microseconds"""
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")  # as on pooled connections
+    cursor = conn.cursor()
+    period_ids = [row[0] for row in conn.execute("SELECT period_id FROM period_facts LIMIT 500")]
+    for period_id in period_ids:
+        COMPONENT_CACHE.get_period_facts(cursor, period_id)
+
+    timings = {}
+    for name, fetch, interval in (("uncached", get_period_facts, 0.0),
+                                  ("cache hit", COMPONENT_CACHE.get_period_facts, 0.0),
+                                  ("cache hit, 1s revalidation", COMPONENT_CACHE.get_period_facts, 1.0)):
+        COMPONENT_CACHE.revalidate_interval = interval
+        start = time.perf_counter()
+        for i in range(lookups):
+            fetch(cursor, period_ids[i % len(period_ids)])
+        timings[name] = (time.perf_counter() - start) / lookups * 1e6
+    COMPONENT_CACHE.revalidate_interval = 0.0
+    conn.close()
+    return timings
+
+
+def run(companies: int, years: int, lookups: int):
+    for name in ("valuation.fcff", "valuation.dcf", "validation.validator", "extraction.sec_extractor"):
+        logging.getLogger(name).setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = Path(tmp) / "template.db"
+        build(template, False, companies, years)
+        for name in ("uncached.db", "cached.db", "invalidation.db"):
+            (Path(tmp) / name).write_bytes(template.read_bytes())
+
+        timings = {}
+        values = {}
+        for name, maxsize in (("uncached", 0), ("cached", 4096)):
+            COMPONENT_CACHE.clear()
+            COMPONENT_CACHE.reset_stats()
+            COMPONENT_CACHE.maxsize = maxsize
+            conn = sqlite3.connect(Path(tmp) / f"{name}.db")
+            conn.execute("PRAGMA journal_mode=WAL")
+            start = time.perf_counter()
+            values[name] = pipeline(conn, companies)
+            timings[name] = time.perf_counter() - start
+            conn.close()
+        stats = COMPONENT_CACHE.stats()
+
+        latency = time_lookups(template, lookups)
+        check_invalidation(Path(tmp) / "invalidation.db")
+        COMPONENT_CACHE.clear()
+
+    assert values["cached"] == values["uncached"], "cache changed results"
+    lookups_per_company = (stats["hits"] + stats["misses"]) / companies
+
+    print(f"{companies:,} companies through FCFF, DCF and validation, results identical")
+    print(f"  uncached:  {timings['uncached']:7.2f}s  {lookups_per_company:4.1f} period_facts "
+          f"reads per company")
+    print(f"  cached:    {timings['cached']:7.2f}s  {stats['misses'] / companies:4.1f} period_facts "
+          f"reads per company (hit rate {stats['hit_rate']:.0%})")
+    print("  lookup latency: " + ", ".join(f"{name} {us:.1f} us" for name, us in latency.items()))
+    print("  invalidation on same-connection and cross-connection extractor writes: ok")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--companies", type=int, default=300)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--lookups", type=int, default=50000)
+    args = parser.parse_args()
+    run(args.companies, args.years, args.lookups)
@@ -0,0 +1,110 @@
+"""
+Benchmark: reader latency during ingest writes, rollback journal vs. WAL,
+and connection checkout cost, fresh sqlite3.connect vs. ConnectionManager
+Run from the repository root:  python -m benchmarks.bench_connections
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import argparse
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from database.connection import ConnectionManager
+from database.schema import FinancialDatabaseSchema
+
+
+def ingest(manager: ConnectionManager, batches: int, rows: int, done: threading.Event):
+    """Writer: large balance_sheet transactions, like a bulk load"""
+    conn = manager.connection()
+    rng = random.Random(0)
+    for batch in range(batches):
+        conn.executemany(
+            "INSERT INTO balance_sheet (period_id, line_item, xbrl_tag, value) VALUES (?, ?, ?, ?)",
+            ((batch * rows + i, "Assets", "Assets", rng.random()) for i in range(rows))
+        )
+        conn.commit()
+    done.set()
+
+
+def read_latencies(manager: ConnectionManager, done: threading.Event):
+    """Reader: the FCFF per-period lookup, timed until the writer finishes"""
+    conn = manager.read_connection()
+    latencies = []
+    while not done.is_set():
+        start = time.perf_counter()
+        conn.execute("SELECT xbrl_tag, value FROM balance_sheet WHERE period_id = ?",
+                     (random.randint(1, 1000),)).fetchall()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run_journal_mode(journal_mode: str, batches: int, rows: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = ConnectionManager(Path(tmp) / "bench.db",
+                                    pragmas={"cache_size": -2048, "busy_timeout": 30000})
+        manager.JOURNAL_MODE = journal_mode
+        FinancialDatabaseSchema.create_schema(manager.connection())
+
+        done = threading.Event()
+        writer = threading.Thread(target=ingest, args=(manager, batches, rows, done))
+        start = time.perf_counter()
+        writer.start()
+        latencies = read_latencies(manager, done)
+        writer.join()
+        elapsed = time.perf_counter() - start
+        manager.close_all()
+
+    latencies.sort()
+    return elapsed, len(latencies), latencies[len(latencies) * 99 // 100], latencies[-1]
+
+
+def run_checkout(calls: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        manager = ConnectionManager(path)
+        FinancialDatabaseSchema.create_schema(manager.connection())
+
+        start = time.perf_counter()
+        for _ in range(calls):
+            conn = sqlite3.connect(path)
+            for pragma, value in ConnectionManager.PRAGMAS.items():
+                conn.execute(f"PRAGMA {pragma} = {value}")
+            conn.execute("SELECT COUNT(*) FROM companies").fetchone()
+            conn.close()
+        fresh = (time.perf_counter() - start) / calls
+
+        start = time.perf_counter()
+        for _ in range(calls):
+            conn = manager.connection()
+            conn.execute("SELECT COUNT(*) FROM companies").fetchone()
+            conn.close()
+        pooled = (time.perf_counter() - start) / calls
+        manager.close_all()
+
+    return fresh, pooled
+
+
+def run(batches: int, rows: int, calls: int):
+    print(f"Writer: {batches} transactions x {rows:,} rows; reader polls per-period lookups")
+    for journal_mode in ("DELETE", "WAL"):
+        elapsed, reads, p99, worst = run_journal_mode(journal_mode, batches, rows)
+        print(f"  {journal_mode:6s} {reads:8,} reads in {elapsed:5.2f}s   "
+              f"p99 {p99 * 1000:7.2f} ms   max {worst * 1000:7.2f} ms")
+
+    fresh, pooled = run_checkout(calls)
+    print(f"Connection checkout + one query ({calls:,} calls)")
+    print(f"  fresh connect:  {fresh * 1e6:7.1f} us")
+    print(f"  pooled:         {pooled * 1e6:7.1f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batches", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.batches, args.rows, args.calls)
@@ -0,0 +1,83 @@
+"""
+Benchmark: persisting scenario valuations, one save per valuation vs. bulk executemany,
+and reading their projections back as a NumPy matrix
+Run from the repository root:  python -m benchmarks.bench_dcf_projections
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import argparse
+import logging
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from database.schema import FinancialDatabaseSchema
+from valuation.dcf import DCFValuationEngine
+
+
+def scenarios(count: int, max_horizon: int):
+    """Valuation results shaped like perform_dcf_valuation() output"""
+    rng = random.Random(0)
+    for i in range(count):
+        horizon = rng.randint(3, max_horizon)
+        base = rng.uniform(1e8, 1e10)
+        growth = rng.uniform(-0.05, 0.15)
+        yield {
+            "company_id": i % 500 + 1,
+            "base_period_id": i % 500 + 1,
+            "fcff_projections": [base * (1 + growth) ** year for year in range(1, horizon + 1)],
+            "wacc": rng.uniform(0.06, 0.12),
+            "terminal_growth_rate": 0.025,
+            "terminal_value": base * 20,
+            "enterprise_value": base * 15,
+            "equity_value": base * 14,
+            "intrinsic_value_per_share": rng.uniform(10, 500),
+        }
+
+
+def run(count: int, max_horizon: int, single: int):
+    logging.getLogger("valuation.dcf").setLevel(logging.WARNING)
+    results = list(scenarios(count, max_horizon))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(Path(tmp) / "bench.db")
+        FinancialDatabaseSchema.create_schema(conn)
+        engine = DCFValuationEngine(conn)
+
+        start = time.perf_counter()
+        for result in results[:single]:
+            engine.save_dcf_results(result)
+        per_save = (time.perf_counter() - start) / single
+
+        start = time.perf_counter()
+        ids = engine.save_dcf_results_many(results)
+        bulk = time.perf_counter() - start
+
+        start = time.perf_counter()
+        matrix = engine.get_projection_matrix(ids)
+        read = time.perf_counter() - start
+        conn.close()
+
+    horizons = np.array([len(r["fcff_projections"]) for r in results])
+    assert matrix.shape == (count, max_horizon)
+    assert (np.count_nonzero(~np.isnan(matrix), axis=1) == horizons).all(), "horizons truncated"
+    assert np.allclose(matrix[-1, :horizons[-1]], results[-1]["fcff_projections"])
+
+    print(f"{count:,} valuations, horizons 3-{max_horizon} years ({horizons.sum():,} projection rows)")
+    print(f"  one save per valuation: {per_save * count:8.2f}s (extrapolated from {single:,})")
+    print(f"  bulk executemany:       {bulk:8.2f}s")
+    print(f"  read as NumPy matrix:   {read:8.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=200000)
+    parser.add_argument("--max-horizon", type=int, default=10)
+    parser.add_argument("--single", type=int, default=500,
+                        help="valuations saved one at a time for the baseline")
+    args = parser.parse_args()
+    run(args.count, args.max_horizon, args.single)
@@ -0,0 +1,108 @@
+"""
+Benchmark: serial vs. concurrent rate-limited fetching against a local stand-in for SEC
+Run from the repository root:  python -m benchmarks.bench_fetch_many
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import argparse
+import json
+import logging
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.synthetic import make_company_facts
+from extraction.sec_extractor import SECEDGARExtractor
+
+
+class StandInSEC(BaseHTTPRequestHandler):
+    """Serves /companyfacts/CIK##########.json with artificial latency"""
+
+    protocol_version = "HTTP/1.1"   # keep-alive
+    latency = 0.2
+    fail_every = 0                  # return 503 on every Nth request
+    request_times = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            self.request_times.append(time.monotonic())
+            n = len(self.request_times)
+        time.sleep(self.latency)
+
+        if self.fail_every and n % self.fail_every == 0:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        cik = int(self.path.rsplit("CIK", 1)[-1].split(".")[0])
+        body = json.dumps(make_company_facts(cik, years=5, extra_tags=20)).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def max_requests_in_window(times, window: float = 1.0) -> int:
+    """Largest number of requests seen in any sliding window"""
+    times = sorted(times)
+    best, lo = 0, 0
+    for hi, t in enumerate(times):
+        while t - times[lo] >= window:
+            lo += 1
+        best = max(best, hi - lo + 1)
+    return best
+
+
+def run(companies: int, latency: float, workers: int, fail_every: int):
+    logging.getLogger("extraction.sec_extractor").setLevel(logging.ERROR)
+    StandInSEC.latency = latency
+    StandInSEC.fail_every = fail_every
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInSEC)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    ciks = [str(cik) for cik in range(1, companies + 1)]
+
+    conn = sqlite3.connect(":memory:")
+    extractor = SECEDGARExtractor(conn, base_url=base_url)
+
+    start = time.perf_counter()
+    serial = [extractor.fetch_company_facts(cik) for cik in ciks]
+    serial_time = time.perf_counter() - start
+
+    StandInSEC.request_times = []
+    start = time.perf_counter()
+    concurrent = extractor.fetch_many(ciks, max_workers=workers)
+    concurrent_time = time.perf_counter() - start
+    peak_rate = max_requests_in_window(StandInSEC.request_times)
+
+    server.shutdown()
+    conn.close()
+
+    assert all(p is not None for p in serial), "serial fetch lost companies"
+    assert all(concurrent[cik] is not None for cik in ciks), "fetch_many lost companies"
+    # +1: a window can straddle the bucket's initial token and a full second of refill
+    assert peak_rate <= SECEDGARExtractor.MAX_REQUESTS_PER_SECOND + 1, peak_rate
+
+    print(f"{companies} CIKs, {latency * 1000:.0f} ms simulated round trip")
+    print(f"  serial:     {serial_time:6.2f}s")
+    print(f"  fetch_many: {concurrent_time:6.2f}s  ({workers} workers, "
+          f"peak {peak_rate} requests in any 1s window)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--companies", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--fail-every", type=int, default=0,
+                        help="inject a 503 on every Nth request to exercise retries")
+    args = parser.parse_args()
+    run(args.companies, args.latency, args.workers, args.fail_every)
@@ -0,0 +1,111 @@
+"""
+Benchmark and parity check: per-company growth analysis vs. one vectorized pass
+Run from the repository root:  python -m benchmarks.bench_growth
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import argparse
+import logging
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.bench_compact_storage import build
+from valuation.batch_fcff import BatchFCFFEngine
+from valuation.fcff import FCFFCalculator
+from valuation.growth import GROWTH_METHODS, GrowthAnalyzer, growth_from_history
+
+
+def legacy_cagr(fcff_values: list) -> float:
+    """The original calculate_fcff_growth_rate CAGR: positive values only, one year apart"""
+    valid = [f for f in fcff_values if f > 0]
+    return (valid[-1] / valid[0]) ** (1 / (len(valid) - 1)) - 1 if len(valid) >= 2 else np.nan
+
+
+def reference(values: list) -> dict:
+    """Scalar reference estimates for one company's consecutive fiscal years"""
+    positive = [(year, value) for year, value in enumerate(values) if value > 0]
+    estimates = {"log_linear": np.nan, "median_yoy": np.nan}
+    if len(positive) >= 2:
+        years, logs = zip(*((year, np.log(value)) for year, value in positive))
+        estimates["log_linear"] = np.expm1(np.polyfit(years, logs, 1)[0])
+    yoy = [b / a - 1 for a, b in zip(values, values[1:]) if a > 0 and b > 0]
+    if yoy:
+        estimates["median_yoy"] = statistics.median(yoy)
+    return estimates
+
+
+def run(companies: int, years: int, sample: int):
+    for name in ("valuation.fcff", "valuation.batch_fcff"):
+        logging.getLogger(name).setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        build(path, False, companies, years)
+        conn = sqlite3.connect(path)
+        calculator = FCFFCalculator(conn)
+        analyzer = GrowthAnalyzer(conn)
+
+        start = time.perf_counter()
+        batch = analyzer.engine.compute(years=years)
+        fcff_time = time.perf_counter() - start
+
+        groups = BatchFCFFEngine.by_company(batch)
+        records = {
+            company_id: [dict(zip(rows, values)) for values in zip(*(rows[c].tolist() for c in rows))]
+            for company_id, rows in groups.items()
+        }
+        start = time.perf_counter()
+        looped = {company_id: calculator.calculate_fcff_growth_rate(history)
+                  for company_id, history in records.items()}
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = growth_from_history(batch)
+        vector_time = time.perf_counter() - start
+        conn.close()
+
+    index = {company_id: i for i, company_id in enumerate(results["company_id"].tolist())}
+    for company_id, history in records.items():
+        for method in GROWTH_METHODS:
+            assert np.allclose(looped[company_id]["estimates"][method],
+                               results[method][index[company_id]], equal_nan=True), method
+
+    # Without non-positive years inside the series the legacy CAGR is unchanged
+    positive = np.random.default_rng(0).lognormal(4, 0.5, (sample, years))
+    assert np.allclose([legacy_cagr(row) for row in positive.tolist()],
+                       growth_from_history({
+                           "company_id": np.repeat(np.arange(sample), years),
+                           "fiscal_year": np.tile(np.arange(years), sample),
+                           "fcff": positive.ravel(),
+                       })["cagr"])
+    for company_id in list(records)[:sample]:
+        expected = reference([record["fcff"] for record in records[company_id]])
+        for method, value in expected.items():
+            assert np.allclose(value, results[method][index[company_id]], equal_nan=True), method
+
+    print(f"{companies:,} companies x {years} years; per-company and one-pass results identical, "
+          f"legacy CAGR and scalar references matched on {sample:,}")
+    print(f"  {int((batch['fcff'] <= 0).sum()):,} non-positive FCFF company-years")
+    print(f"  batch FCFF:                            {fcff_time * 1e3:8.1f} ms")
+    print(f"  calculate_fcff_growth_rate per company: {loop_time * 1e3:8.1f} ms")
+    print(f"  growth_from_history, one pass:          {vector_time * 1e3:8.1f} ms")
+    for method in GROWTH_METHODS:
+        values = results[method]
+        print(f"    {method:<13} median {np.nanmedian(values) * 100:6.2f}%  "
+              f"available for {int((~np.isnan(values)).sum()):,}")
+    print(f"    method spread median {np.nanmedian(results['spread']) * 100:.2f} pts")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--companies", type=int, default=2000)
+    parser.add_argument("--years", type=int, default=15)
+    parser.add_argument("--sample", type=int, default=200,
+                        help="companies checked against scalar reference estimates")
+    args = parser.parse_args()
+    run(args.companies, args.years, args.sample)
@@ -0,0 +1,82 @@
+"""
+Benchmark and parity check: historical FCFF per period vs. set-based
+Run from the repository root:  python -m benchmarks.bench_historical_fcff
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import argparse
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_ingest import OfflineExtractor
+from benchmarks.synthetic import make_company_facts
+from database import instrumentation
+from database.schema import FinancialDatabaseSchema
+from valuation.fcff import FCFFCalculator
+
+
+def historical_fcff_per_period(calculator: FCFFCalculator, company_id: int, years: int) -> list:
+    """The per-period implementation: two period_facts reads per period"""
+    records = []
+    for period in calculator.get_historical_periods(company_id, years):
+        components = calculator.extract_fcff_components(period["period_id"])
+        records.append({**period, **calculator.calculate_fcff(period["period_id"], components)})
+    return records
+
+
+def executions() -> int:
+    return sum(entry["count"] for entry in instrumentation.STATS.summary())
+
+
+def run(companies: int, years: int):
+    for name in ("valuation.fcff", "extraction.sec_extractor", "database.period_facts"):
+        logging.getLogger(name).setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = instrumentation.connect(Path(tmp) / "bench.db")
+        FinancialDatabaseSchema.create_schema(conn)
+        for cik in range(1, companies + 1):
+            # Few extra tags keeps ingest quick; missing tags exercise the fallbacks
+            extractor = OfflineExtractor(conn, make_company_facts(cik, years=years, extra_tags=5))
+            extractor.process_company_10k(f"T{cik}", str(cik), f"Company {cik}")
+        calculator = FCFFCalculator(conn)
+        company_ids = [row[0] for row in conn.execute("SELECT id FROM companies ORDER BY id")]
+
+        instrumentation.STATS.reset()
+        start = time.perf_counter()
+        expected = [historical_fcff_per_period(calculator, c, years) for c in company_ids]
+        per_period = time.perf_counter() - start
+        per_period_queries = executions()
+
+        instrumentation.STATS.reset()
+        start = time.perf_counter()
+        actual = [calculator.calculate_historical_fcff(c, years) for c in company_ids]
+        set_based = time.perf_counter() - start
+        set_based_queries = executions()
+
+        start = time.perf_counter()
+        arrays = calculator.historical_fcff_arrays(company_ids, years)
+        all_at_once = time.perf_counter() - start
+        conn.close()
+
+    assert actual == expected, "set-based records differ from the per-period implementation"
+    flat = [record["fcff"] for records in expected for record in records]
+    assert arrays["fcff"].tolist() == flat
+
+    periods = len(flat)
+    print(f"{companies:,} companies x {years} years ({periods:,} periods), records identical")
+    print(f"  per period:               {per_period * 1e3:8.1f} ms  "
+          f"{per_period_queries / companies:5.1f} queries per company")
+    print(f"  set-based, per company:   {set_based * 1e3:8.1f} ms  "
+          f"{set_based_queries / companies:5.1f} queries per company")
+    print(f"  set-based, all companies: {all_at_once * 1e3:8.1f} ms  1 query")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--companies", type=int, default=100)
+    parser.add_argument("--years", type=int, default=20)
+    args = parser.parse_args()
+    run(args.companies, args.years)
@@ -0,0 +1,94 @@
+"""
+Benchmark: a what-if valuation batch against the database file vs. an in-memory copy
+Run from the repository root:  python -m benchmarks.bench_in_memory
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import argparse
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_compact_storage import build
+from database.connection import get_manager
+from database.memory import InMemoryDatabase
+from database.schema import FinancialDatabaseSchema
+from valuation.dcf import DCFValuationEngine
+from valuation.fcff import FCFFCalculator
+
+WACC_SCENARIOS = (0.07, 0.08, 0.09, 0.10)
+
+
+def what_if_batch(companies: int) -> list:
+    """Historical FCFF, projection and one saved valuation per WACC scenario per company"""
+    conn = FinancialDatabaseSchema.get_connection()
+    calculator = FCFFCalculator(conn)
+    engine = DCFValuationEngine(conn)
+
+    enterprise_values = []
+    for company_id in range(1, companies + 1):
+        historical = calculator.calculate_historical_fcff(company_id, years=5)
+        growth = calculator.calculate_fcff_growth_rate(historical)["growth_rate"]
+        projections = calculator.project_fcff(historical[-1]["fcff"], growth, 5)
+        for wacc in WACC_SCENARIOS:
+            results = engine.perform_dcf_valuation(
+                company_id, historical[-1]["period_id"], projections, wacc=wacc
+            )
+            engine.save_dcf_results(results)
+            enterprise_values.append(round(results["enterprise_value"]))
+    return enterprise_values
+
+
+def saved_valuations(path: Path) -> int:
+    conn = get_manager(path).read_connection()
+    return conn.execute("SELECT COUNT(*) FROM dcf_calculations").fetchone()[0]
+
+
+def run(companies: int, years: int):
+    for name in ("valuation.fcff", "valuation.dcf", "database.memory", "database.schema"):
+        logging.getLogger(name).setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = Path(tmp) / "template.db"
+        build(template, False, companies, years)
+        disk_path, memory_path = Path(tmp) / "disk.db", Path(tmp) / "memory.db"
+        disk_path.write_bytes(template.read_bytes())
+        memory_path.write_bytes(template.read_bytes())
+
+        FinancialDatabaseSchema.set_db_path(disk_path)
+        start = time.perf_counter()
+        on_disk = what_if_batch(companies)
+        disk = time.perf_counter() - start
+
+        FinancialDatabaseSchema.set_db_path(memory_path)
+        start = time.perf_counter()
+        database = InMemoryDatabase(write_back=True)
+        database.load()
+        loaded = time.perf_counter()
+        in_memory = what_if_batch(companies)
+        batch_done = time.perf_counter()
+        database.save()
+        database.close()
+        end = time.perf_counter()
+
+        assert on_disk == in_memory, "in-memory batch produced different valuations"
+        assert saved_valuations(disk_path) == saved_valuations(memory_path) == len(on_disk), \
+            "valuations missing after write-back"
+        get_manager(disk_path).close_all()
+        get_manager(memory_path).close_all()
+
+    print(f"{companies:,} companies x {years} years, {len(on_disk):,} valuations saved")
+    print(f"  on disk (WAL, commit per save): {disk:7.2f}s")
+    print(f"  in memory, total:               {end - start:7.2f}s")
+    print(f"      load via VACUUM INTO         {loaded - start:7.2f}s")
+    print(f"      batch                        {batch_done - loaded:7.2f}s")
+    print(f"      write-back (one transaction) {end - batch_done:7.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--companies", type=int, default=500)
+    parser.add_argument("--years", type=int, default=10)
+    args = parser.parse_args()
+    run(args.companies, args.years)
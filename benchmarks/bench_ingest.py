@@ -0,0 +1,84 @@
+"""
+Benchmark: per-company ingest time, per-period rescans vs. shared facts index
+Run from the repository root:  python -m benchmarks.bench_ingest
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import argparse
+import logging
+import sqlite3
+import time
+
+from benchmarks.synthetic import make_company_facts
+from database.schema import FinancialDatabaseSchema
+from extraction.sec_extractor import SECEDGARExtractor, _iter_tag_entries
+
+
+class OfflineExtractor(SECEDGARExtractor):
+    """Extractor that serves a prebuilt payload instead of calling SEC"""
+
+    def __init__(self, db_connection: sqlite3.Connection, payload: dict):
+        super().__init__(db_connection)
+        self.payload = payload
+
+    def fetch_company_facts(self, cik: str) -> dict:
+        return self.payload
+
+
+def ingest_with_rescans(extractor: SECEDGARExtractor, payload: dict) -> int:
+    """The original pipeline: every period rescans the whole payload"""
+    company_id = extractor.insert_company("SYN", str(payload["cik"]), payload["entityName"])
+    us_gaap = payload["facts"]["us-gaap"]
+    periods = 0
+    for _unit, entry in _iter_tag_entries(us_gaap["NetIncomeLoss"]):
+        if entry.get("form") != "10-K":
+            continue
+        period_id = extractor.insert_financial_period(
+            company_id, entry["end"], entry["fy"], "10-K", entry["accn"]
+        )
+        if period_id:
+            facts = extractor.get_financial_facts_for_period(payload, entry["end"], "10-K")
+            extractor.insert_financial_facts(period_id, facts)
+            periods += 1
+    return periods
+
+
+def run(years: int, extra_tags: int, repeats: int):
+    logging.getLogger("extraction.sec_extractor").setLevel(logging.WARNING)
+    payload = make_company_facts(cik=320193, years=years, extra_tags=extra_tags)
+    n_entries = sum(
+        1 for tag in payload["facts"]["us-gaap"].values()
+        for _ in _iter_tag_entries(tag)
+    )
+    print(f"Synthetic filer: {years} years, "
+          f"{len(payload['facts']['us-gaap'])} tags, {n_entries:,} entries")
+
+    timings = {"per-period rescan": [], "shared facts index": []}
+    for _ in range(repeats):
+        for label in timings:
+            conn = sqlite3.connect(":memory:")
+            FinancialDatabaseSchema.create_schema(conn)
+            extractor = OfflineExtractor(conn, payload)
+
+            start = time.perf_counter()
+            if label == "per-period rescan":
+                ingest_with_rescans(extractor, payload)
+            else:
+                extractor.process_company_10k("SYN", str(payload["cik"]), payload["entityName"])
+            timings[label].append(time.perf_counter() - start)
+            conn.close()
+
+    before = min(timings["per-period rescan"])
+    after = min(timings["shared facts index"])
+    print(f"  per-period rescan:  {before * 1000:8.1f} ms / company")
+    print(f"  shared facts index: {after * 1000:8.1f} ms / company")
+    print(f"  speedup:            {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--extra-tags", type=int, default=400)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    run(args.years, args.extra_tags, args.repeats)
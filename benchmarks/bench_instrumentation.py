@@ -0,0 +1,82 @@
+"""
+Benchmark: overhead of SQL instrumentation on the valuation pipeline, plus its report
+Run from the repository root:  python -m benchmarks.bench_instrumentation
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import argparse
+import logging
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_compact_storage import build
+from database import instrumentation
+from validation.validator import FinancialValidator
+from valuation.dcf import DCFValuationEngine
+from valuation.fcff import FCFFCalculator
+
+
+def pipeline(conn: sqlite3.Connection, companies: int) -> list:
+    """Historical FCFF, one valuation and validation of the base period per company"""
+    calculator = FCFFCalculator(conn)
+    engine = DCFValuationEngine(conn)
+    validator = FinancialValidator(conn)
+    values = []
+    for company_id in range(1, companies + 1):
+        historical = calculator.calculate_historical_fcff(company_id, years=5)
+        base = historical[-1]
+        projections = calculator.project_fcff(base["fcff"], 0.05, 5)
+        results = engine.perform_dcf_valuation(company_id, base["period_id"], projections)
+        engine.save_dcf_results(results)
+        validator.run_all_validations(base["period_id"])
+        values.append(round(results["enterprise_value"]))
+    return values
+
+
+def run(companies: int, years: int, slow_ms: float):
+    for name in ("valuation.fcff", "valuation.dcf", "validation.validator"):
+        logging.getLogger(name).setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = Path(tmp) / "template.db"
+        build(template, False, companies, years)
+        for name in ("plain.db", "instrumented.db"):
+            (Path(tmp) / name).write_bytes(template.read_bytes())
+
+        conn = sqlite3.connect(Path(tmp) / "plain.db")
+        start = time.perf_counter()
+        expected = pipeline(conn, companies)
+        plain = time.perf_counter() - start
+        conn.close()
+
+        instrumentation.STATS.slow_ms = slow_ms
+        conn = instrumentation.connect(Path(tmp) / "instrumented.db")
+        start = time.perf_counter()
+        values = pipeline(conn, companies)
+        instrumented = time.perf_counter() - start
+        conn.close()
+
+    assert values == expected, "instrumentation changed results"
+    summary = {entry["sql"]: entry for entry in instrumentation.STATS.summary()}
+    historical = instrumentation.normalize_sql(
+        FCFFCalculator(sqlite3.connect(":memory:")).repository.HISTORY_SQL)
+    assert summary[historical]["count"] == companies
+    assert summary[historical]["rows"] == companies * 6  # five years plus the NWC lag year
+
+    print(f"{companies:,} companies through FCFF, DCF and validation")
+    print(f"  plain connection:        {plain:7.2f}s")
+    print(f"  instrumented connection: {instrumented:7.2f}s "
+          f"({(instrumented / plain - 1) * 100:+.0f}%)")
+    print()
+    print(instrumentation.report(top=12))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--companies", type=int, default=300)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--slow-ms", type=float, default=2.0)
+    args = parser.parse_args()
+    run(args.companies, args.years, args.slow_ms)
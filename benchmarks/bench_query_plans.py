@@ -0,0 +1,117 @@
+"""
+Query-plan regression check: every HOT_QUERIES entry must be served by an index
+Upgrades a pre-migration database in place and times each hot query before/after
+
+At the defaults (7,500 periods) the mean over all hot queries only moves from
+about 1.6 ms to 1.5 ms: validation_log_since returns every log row (~20 ms)
+with or without an index and dominates it. Per-key lookups gain, e.g.
+validation_log_by_period ~1,000 -> 9 us and historical_periods ~20 -> 10 us.
+Run from the repository root:  python -m benchmarks.bench_query_plans
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import argparse
+import random
+import sqlite3
+import statistics
+import time
+
+from database.schema import FinancialDatabaseSchema
+
+
+def populate(conn: sqlite3.Connection, companies: int, years: int, tags: int):
+    """Legacy database: base tables only, filled with synthetic statements"""
+    for create_statement in FinancialDatabaseSchema.CREATE_STATEMENTS.values():
+        conn.execute(create_statement)
+
+    rng = random.Random(0)
+    tag_names = ["Assets", "Liabilities", "StockholdersEquity"] + [f"Tag{i}" for i in range(tags)]
+    conn.executemany(
+        "INSERT INTO companies (ticker, cik, company_name) VALUES (?, ?, ?)",
+        [(f"T{c}", str(c).zfill(10), f"Company {c}") for c in range(1, companies + 1)]
+    )
+    conn.executemany("""
+        INSERT INTO financial_periods
+        (company_id, period_end_date, fiscal_year, filing_type, filing_date)
+        VALUES (?, ?, ?, '10-K', ?)
+    """, [
+        (c, f"{year}-12-31", year, f"{year + 1}-02-15")
+        for c in range(1, companies + 1) for year in range(2024 - years, 2024)
+    ])
+
+    period_ids = [row[0] for row in conn.execute("SELECT id FROM financial_periods")]
+    for table in ("income_statement", "balance_sheet", "cash_flow_statement"):
+        conn.executemany(f"""
+            INSERT INTO {table} (period_id, line_item, xbrl_tag, value)
+            VALUES (?, ?, ?, ?)
+        """, (
+            (period_id, tag, tag, rng.uniform(1e6, 1e9))
+            for period_id in period_ids for tag in tag_names
+        ))
+    conn.executemany(
+        "INSERT INTO validation_log (period_id, check_name, passed) VALUES (?, ?, 1)",
+        ((period_id, check) for period_id in period_ids for check in ("BS", "CF", "IS"))
+    )
+    conn.commit()
+    return period_ids
+
+
+def time_hot_queries(conn: sqlite3.Connection, period_ids, companies: int, repeats: int) -> dict:
+    """Mean seconds per execution of each HOT_QUERIES entry over random keys"""
+    timings = {}
+    for name, (sql, params) in FinancialDatabaseSchema.HOT_QUERIES.items():
+        rng = random.Random(1)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            if name == "historical_periods":
+                params = (rng.randint(1, companies), params[1])
+            else:
+                params = (rng.choice(period_ids),) + tuple(params[1:])
+            conn.execute(sql, params).fetchall()
+        timings[name] = (time.perf_counter() - start) / repeats
+    return timings
+
+
+def run(companies: int, years: int, tags: int, repeats: int):
+    conn = sqlite3.connect(":memory:")
+    period_ids = populate(conn, companies, years, tags)
+
+    legacy_problems = FinancialDatabaseSchema.check_query_plans(conn)
+    legacy_time = time_hot_queries(conn, period_ids, companies, repeats)
+
+    applied = FinancialDatabaseSchema.migrate(conn)
+    assert applied == [version for version, _, _ in FinancialDatabaseSchema.MIGRATIONS], applied
+    assert FinancialDatabaseSchema.migrate(conn) == [], "migrations re-applied"
+    assert FinancialDatabaseSchema.get_schema_version(conn) == FinancialDatabaseSchema.SCHEMA_VERSION
+
+    problems = FinancialDatabaseSchema.check_query_plans(conn)
+    indexed_time = time_hot_queries(conn, period_ids, companies, repeats)
+    conn.close()
+
+    # A fresh database must reach the same plans
+    fresh = sqlite3.connect(":memory:")
+    FinancialDatabaseSchema.create_schema(fresh)
+    fresh_problems = FinancialDatabaseSchema.check_query_plans(fresh)
+    fresh.close()
+
+    print(f"{companies} companies x {years} years, {len(period_ids):,} periods")
+    print(f"  legacy plans not using an index: {sorted(legacy_problems)}")
+    print(f"  migrations applied in place:     {applied}")
+    print(f"  hot query mean, legacy:   {statistics.mean(legacy_time.values()) * 1e6:9.1f} us")
+    print(f"  hot query mean, migrated: {statistics.mean(indexed_time.values()) * 1e6:9.1f} us")
+    for name in FinancialDatabaseSchema.HOT_QUERIES:
+        print(f"    {name:34s} {legacy_time[name] * 1e6:9.1f} -> {indexed_time[name] * 1e6:9.1f} us")
+
+    assert not problems, f"hot queries not using an index after migration: {problems}"
+    assert not fresh_problems, f"hot queries not using an index on a fresh schema: {fresh_problems}"
+    print("✓ All hot queries use indexes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--companies", type=int, default=500)
+    parser.add_argument("--years", type=int, default=15)
+    parser.add_argument("--tags", type=int, default=40)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+    run(args.companies, args.years, args.tags, args.repeats)
@@ -0,0 +1,72 @@
+"""
+Benchmark: rebuild the statement tables from a raw facts archive vs. from JSON
+Run from the repository root:  python -m benchmarks.bench_rebuild
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import argparse
+import json
+import logging
+import sqlite3
+import tempfile
+import time
+
+from benchmarks.bench_streaming import snapshot
+from benchmarks.synthetic import make_company_facts
+from database.schema import FinancialDatabaseSchema
+from extraction.http_cache import CompanyFactsCache
+from extraction.raw_archive import RawFactsArchive
+from extraction.sec_extractor import SECEDGARExtractor
+
+
+def run(companies: int, years: int, extra_tags: int):
+    logging.getLogger("extraction.sec_extractor").setLevel(logging.WARNING)
+    logging.getLogger("extraction.raw_archive").setLevel(logging.WARNING)
+    ciks = [str(cik).zfill(10) for cik in range(1, companies + 1)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = CompanyFactsCache(f"{tmp}/cache", offline=True)
+        json_bytes = 0
+        for cik in ciks:
+            body = json.dumps(make_company_facts(int(cik), years=years, extra_tags=extra_tags)).encode()
+            json_bytes += len(body)
+            cache.store(cik, body, {})
+        archive = RawFactsArchive(f"{tmp}/archive")
+
+        # Cached JSON ingest, archiving as it goes (a network fetch would dominate)
+        conn = sqlite3.connect(":memory:")
+        FinancialDatabaseSchema.create_schema(conn)
+        extractor = SECEDGARExtractor(conn, cache=cache, archive=archive, commit_interval=100)
+        start = time.perf_counter()
+        for cik in ciks:
+            extractor.process_company_10k(f"T{cik[-4:]}", cik, f"Company {cik}")
+        extractor.flush()
+        ingest_time = time.perf_counter() - start
+        expected = snapshot(conn)
+        conn.close()
+
+        conn = sqlite3.connect(":memory:")
+        FinancialDatabaseSchema.create_schema(conn)
+        stats = archive.rebuild_database(conn)
+        rebuilt = snapshot(conn)
+        conn.close()
+
+        archive_bytes = sum(path.stat().st_size for path in archive.paths())
+
+    assert rebuilt == expected, "rebuild from archive stored different facts"
+
+    print(f"{companies} companies, {stats['facts']:,} facts re-derived from "
+          f"{stats['archived_facts']:,} archived 10-K rows")
+    print(f"  companyfacts JSON:  {json_bytes / 1e6:8.1f} MB")
+    print(f"  raw facts archive:  {archive_bytes / 1e6:8.1f} MB")
+    print(f"  ingest from JSON:   {ingest_time:8.2f}s")
+    print(f"  rebuild from .npz:  {stats['seconds']:8.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--companies", type=int, default=50)
+    parser.add_argument("--years", type=int, default=15)
+    parser.add_argument("--extra-tags", type=int, default=200)
+    args = parser.parse_args()
+    run(args.companies, args.years, args.extra_tags)
@@ -0,0 +1,95 @@
+"""
+Benchmark: company histories via per-period queries vs. one repository call
+Run from the repository root:  python -m benchmarks.bench_repository
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import argparse
+import logging
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.bench_compact_storage import build
+from database.period_facts import get_period_facts
+from database.repository import FUNDAMENTAL_COLUMNS, FundamentalsRepository
+from database.schema import FinancialDatabaseSchema
+from valuation.dcf import DCFValuationEngine
+
+
+def histories_n_plus_one(conn: sqlite3.Connection, company_ids, years: int) -> list:
+    """The row-by-row path: list the periods, then one period_facts fetch per period"""
+    sql = FinancialDatabaseSchema.HOT_QUERIES["historical_periods"][0]
+    cursor = conn.cursor()
+    records = []
+    for company_id in company_ids:
+        periods = cursor.execute(sql, (company_id, years)).fetchall()
+        for period_id, period_end_date, fiscal_year in sorted(periods, key=lambda p: p[2]):
+            records.append({
+                "company_id": company_id, "period_id": period_id, "fiscal_year": fiscal_year,
+                **get_period_facts(cursor, period_id),
+            })
+    return records
+
+
+def run(companies: int, years: int, window: int):
+    logging.getLogger("valuation.dcf").setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        build(path, False, companies, years)
+        conn = sqlite3.connect(path)
+        company_ids = list(range(1, companies + 1))
+
+        start = time.perf_counter()
+        expected = histories_n_plus_one(conn, company_ids, window)
+        row_by_row = time.perf_counter() - start
+
+        repository = FundamentalsRepository(conn)
+        start = time.perf_counter()
+        history = repository.company_history(company_ids, years=window)
+        one_call = time.perf_counter() - start
+
+        start = time.perf_counter()
+        matrix = repository.company_history_matrix(company_ids, years=window)
+        as_matrix = time.perf_counter() - start
+
+        engine = DCFValuationEngine(conn)
+        latest_year = max(record["fiscal_year"] for record in expected)
+        start = time.perf_counter()
+        bridge_expected = [engine.get_balance_sheet_data(record["period_id"])["net_debt"]
+                           for record in expected if record["fiscal_year"] == latest_year]
+        per_period_bridge = time.perf_counter() - start
+        start = time.perf_counter()
+        bridge = engine.get_base_period_data(company_ids)
+        batch_bridge = time.perf_counter() - start
+        conn.close()
+
+    assert len(expected) == len(history["period_id"])
+    for i, record in enumerate(expected):
+        assert record["period_id"] == history["period_id"][i]
+        for column in FUNDAMENTAL_COLUMNS:
+            value = history[column][i]
+            assert (np.isnan(value) and column not in record) or value == record[column], column
+    assert matrix["revenue"].shape == (companies, window)
+    assert np.array_equal(matrix["revenue"].ravel(), history["revenue"])
+    assert np.allclose(bridge["net_debt"], bridge_expected)
+
+    print(f"{companies:,} companies, last {window} of {years} fiscal years "
+          f"({len(expected):,} periods)")
+    print(f"  per-period queries (N+1):        {row_by_row * 1e3:8.1f} ms")
+    print(f"  company_history, one statement:  {one_call * 1e3:8.1f} ms")
+    print(f"  company_history_matrix:          {as_matrix * 1e3:8.1f} ms")
+    print(f"  equity bridge per company:       {per_period_bridge * 1e3:8.1f} ms")
+    print(f"  get_base_period_data:            {batch_bridge * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--companies", type=int, default=2000)
+    parser.add_argument("--years", type=int, default=15)
+    parser.add_argument("--window", type=int, default=10)
+    args = parser.parse_args()
+    run(args.companies, args.years, args.window)
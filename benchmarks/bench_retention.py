@@ -0,0 +1,130 @@
+"""
+Benchmark: recent-history queries on grown audit tables, before and after retention
+Run from the repository root:  python -m benchmarks.bench_retention
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import argparse
+import logging
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from database.retention import apply_retention
+from database.schema import FinancialDatabaseSchema
+from database.snapshot import Snapshot
+
+NOW = datetime(2025, 1, 1)
+CHECKS = ("balance_sheet_equation", "net_income_reconciliation", "cash_flow_consistency")
+
+
+def populate(conn: sqlite3.Connection, rows: int, days: int):
+    """Two years of validation runs and valuations, oldest first"""
+    rng = random.Random(0)
+    stamps = sorted(
+        (NOW - timedelta(seconds=rng.uniform(0, days * 86400))).strftime("%Y-%m-%d %H:%M:%S")
+        for _ in range(rows)
+    )
+    conn.executemany("""
+        INSERT INTO validation_log
+        (period_id, check_name, expected_value, actual_value, variance, tolerance, passed, check_date)
+        VALUES (?, ?, 1.0, ?, ?, 0.01, ?, ?)
+    """, [
+        (rng.randint(1, 5000), rng.choice(CHECKS), 1 + v, v, abs(v) < 0.01, stamp)
+        for stamp, v in ((stamp, rng.gauss(0, 0.01)) for stamp in stamps)
+    ])
+    conn.executemany("""
+        INSERT INTO dcf_calculations
+        (company_id, base_year_id, calculation_date, projection_years, wacc,
+         terminal_growth_rate, enterprise_value, price_per_share)
+        VALUES (?, ?, ?, 5, ?, 0.025, ?, ?)
+    """, [
+        (c, c, stamp, rng.uniform(0.06, 0.12), rng.uniform(1e9, 1e11), rng.uniform(10, 500))
+        for stamp, c in ((stamp, rng.randint(1, 500)) for stamp in stamps[::4])
+    ])
+    conn.execute("""
+        INSERT INTO dcf_projections (dcf_calc_id, year, fcff)
+        SELECT id, year.value, enterprise_value / 20 FROM dcf_calculations,
+               (SELECT 1 AS value UNION ALL SELECT 2 UNION ALL SELECT 3
+                UNION ALL SELECT 4 UNION ALL SELECT 5) AS year
+    """)
+    conn.commit()
+
+
+def time_history(conn: sqlite3.Connection, repeat: int = 20) -> float:
+    """Mean latency of 'what ran in the last 30 days' over both audit tables"""
+    since = (NOW - timedelta(days=30)).strftime("%Y-%m-%d %H:%M:%S")
+    start = time.perf_counter()
+    for _ in range(repeat):
+        conn.execute("SELECT COUNT(*), SUM(passed) FROM validation_log WHERE check_date >= ?",
+                     (since,)).fetchone()
+        conn.execute("SELECT company_id, enterprise_value FROM dcf_calculations "
+                     "WHERE calculation_date >= ?", (since,)).fetchall()
+    return (time.perf_counter() - start) / repeat
+
+
+def counts(conn: sqlite3.Connection) -> dict:
+    return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("validation_log", "dcf_calculations", "dcf_projections")}
+
+
+def run(rows: int, days: int):
+    logging.getLogger("database.retention").setLevel(logging.WARNING)
+    logging.getLogger("database.snapshot").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(Path(tmp) / "bench.db")
+        FinancialDatabaseSchema.create_schema(conn)
+        populate(conn, rows, days)
+        before = counts(conn)
+
+        # Baseline: the tables as they were, with no time index
+        conn.execute("DROP INDEX idx_validation_log_check_date")
+        conn.execute("DROP INDEX idx_dcf_calculations_date")
+        unindexed = time_history(conn)
+        conn.execute(FinancialDatabaseSchema.CREATE_INDEXES["idx_validation_log_check_date"])
+        conn.execute(FinancialDatabaseSchema.CREATE_INDEXES["idx_dcf_calculations_date"])
+        indexed = time_history(conn)
+
+        start = time.perf_counter()
+        archived = apply_retention(conn, archive_dir=Path(tmp) / "archive", now=NOW)
+        retention = time.perf_counter() - start
+        trimmed = time_history(conn)
+        after = counts(conn)
+
+        # Nothing is lost: hot rows + rolled-up runs == original rows,
+        # and the archive holds exactly the removed rows
+        rolled_up = conn.execute("SELECT SUM(runs) FROM validation_log_daily").fetchone()[0]
+        assert after["validation_log"] + rolled_up == before["validation_log"]
+        rolled_up = conn.execute("SELECT SUM(runs) FROM dcf_calculations_daily").fetchone()[0]
+        assert after["dcf_calculations"] + rolled_up == before["dcf_calculations"]
+        for table, path in conn.execute("SELECT table_name, archive_path FROM retention_runs"):
+            snapshot = Snapshot(path)
+            assert snapshot.manifest["tables"][table]["rows"] == archived[table]
+            if table == "dcf_calculations":
+                assert snapshot.manifest["tables"]["dcf_projections"]["rows"] == \
+                    before["dcf_projections"] - after["dcf_projections"]
+
+        problems = FinancialDatabaseSchema.check_query_plans(conn)
+        assert not problems, problems
+        conn.close()
+
+    print(f"{before['validation_log']:,} validation rows and {before['dcf_calculations']:,} "
+          f"valuations over {days} days")
+    print(f"  last-30-days history, no time index:   {unindexed * 1e3:8.2f} ms")
+    print(f"  last-30-days history, time index:      {indexed * 1e3:8.2f} ms")
+    print(f"  last-30-days history, after retention: {trimmed * 1e3:8.2f} ms")
+    print(f"  retention run (rollup + archive + trim): {retention:6.2f}s")
+    for table in before:
+        print(f"      {table:18s} {before[table]:10,} -> {after[table]:10,} rows")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=730)
+    args = parser.parse_args()
+    run(args.rows, args.days)
@@ -0,0 +1,90 @@
+"""
+Benchmark: FCFF margin by sector, per-period SQLite queries vs. columnar snapshot
+Run from the repository root:  python -m benchmarks.bench_snapshot
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import argparse
+import logging
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.bench_compact_storage import build
+from database.snapshot import Snapshot, export_snapshot
+from valuation.fcff import FCFFCalculator
+
+SECTORS = ("Technology", "Energy", "Healthcare", "Financials", "Industrials", None)
+
+
+def margins_row_by_row(conn: sqlite3.Connection) -> dict:
+    """The per-period path: FCFFCalculator for every 10-K period of every company"""
+    calculator = FCFFCalculator(conn)
+    margins = {}
+    companies = conn.execute("SELECT id, sector FROM companies").fetchall()
+    for company_id, sector in companies:
+        periods = conn.execute(
+            "SELECT id FROM financial_periods WHERE company_id = ? AND filing_type = '10-K'",
+            (company_id,)
+        ).fetchall()
+        for (period_id,) in periods:
+            components = calculator.extract_fcff_components(period_id)
+            revenue = components.get("revenue", 0)
+            if revenue > 0:
+                fcff = calculator.calculate_fcff(period_id, components)["fcff"]
+                margins.setdefault(sector or "Unknown", []).append(fcff / revenue)
+    return {sector: float(np.median(values)) for sector, values in margins.items()}
+
+
+def run(companies: int, years: int):
+    logging.getLogger("valuation.fcff").setLevel(logging.ERROR)
+    logging.getLogger("database.snapshot").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        build(path, False, companies, years)
+        conn = sqlite3.connect(path)
+        conn.executemany("UPDATE companies SET sector = ? WHERE id = ?", [
+            (SECTORS[c % len(SECTORS)], c) for c in range(1, companies + 1)
+        ])
+        conn.commit()
+
+        start = time.perf_counter()
+        expected = margins_row_by_row(conn)
+        row_by_row = time.perf_counter() - start
+
+        start = time.perf_counter()
+        manifest = export_snapshot(conn, Path(tmp) / "snapshot")
+        export = time.perf_counter() - start
+        conn.close()
+
+        start = time.perf_counter()
+        stats = Snapshot(Path(tmp) / "snapshot").fcff_margin_by_sector()
+        query = time.perf_counter() - start
+
+        snapshot_bytes = sum(p.stat().st_size for p in (Path(tmp) / "snapshot").iterdir())
+
+    assert set(stats) == set(expected), (set(stats), set(expected))
+    for sector, median in expected.items():
+        assert abs(stats[sector]["median"] - median) < 1e-9, sector
+
+    rows = sum(table["rows"] for table in manifest["tables"].values())
+    print(f"{companies:,} companies x {years} years, {rows:,} rows exported "
+          f"({snapshot_bytes / 1e6:.1f} MB snapshot)")
+    print(f"  per-period SQLite queries:  {row_by_row:7.2f}s")
+    print(f"  snapshot export (once):     {export:7.2f}s")
+    print(f"  snapshot query:             {query:7.2f}s")
+    for sector, sector_stats in sorted(stats.items()):
+        print(f"    {sector:12s} n={sector_stats['count']:6,}  "
+              f"median FCFF margin {sector_stats['median'] * 100:6.1f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--companies", type=int, default=2000)
+    parser.add_argument("--years", type=int, default=15)
+    args = parser.parse_args()
+    run(args.companies, args.years)
@@ -0,0 +1,68 @@
+"""
+Benchmark: peak memory per company, whole-document vs. streaming parse
+Run from the repository root:  python -m benchmarks.bench_streaming
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import argparse
+import json
+import logging
+import sqlite3
+import tempfile
+import time
+
+from benchmarks.synthetic import make_company_facts
+from database.schema import FinancialDatabaseSchema
+from extraction.http_cache import CompanyFactsCache
+from extraction.sec_extractor import SECEDGARExtractor
+
+
+def snapshot(conn: sqlite3.Connection):
+    """Stored facts, for checking both modes load the same data"""
+    rows = []
+    for table in ("income_statement", "balance_sheet", "cash_flow_statement"):
+        rows += conn.execute(f"""
+            SELECT fp.period_end_date, t.xbrl_tag, t.value
+            FROM {table} t JOIN financial_periods fp ON fp.id = t.period_id
+            ORDER BY 1, 2
+        """).fetchall()
+    return rows
+
+
+def run(years: int, extra_tags: int):
+    logging.getLogger("extraction.sec_extractor").setLevel(logging.WARNING)
+    cik = "0000320193"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = CompanyFactsCache(tmp, offline=True)
+        body = json.dumps(make_company_facts(int(cik), years=years, extra_tags=extra_tags)).encode()
+        cache.store(cik, body, {})
+        print(f"Synthetic mega-filer: {len(body) / 1e6:.1f} MB of JSON")
+        del body
+
+        results = {}
+        for streaming in (False, True):
+            conn = sqlite3.connect(":memory:")
+            FinancialDatabaseSchema.create_schema(conn)
+            extractor = SECEDGARExtractor(conn, cache=cache, track_memory=True)
+
+            start = time.perf_counter()
+            extractor.process_company_10k("MEGA", cik, "Mega Filer", streaming=streaming)
+            elapsed = time.perf_counter() - start
+
+            results[streaming] = (extractor.memory_stats["MEGA"], elapsed, snapshot(conn))
+            conn.close()
+
+    assert results[False][2] == results[True][2], "streaming mode stored different facts"
+
+    for streaming, label in ((False, "whole document"), (True, "streaming")):
+        peak, elapsed, _ = results[streaming]
+        print(f"  {label:15s} peak {peak / 1e6:7.1f} MB   {elapsed:6.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--extra-tags", type=int, default=1500)
+    args = parser.parse_args()
+    run(args.years, args.extra_tags)
@@ -0,0 +1,115 @@
+"""
+Synthetic SEC Company Facts Generator
+Builds deterministic companyfacts-shaped payloads for offline benchmarks
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import random
+from typing import Dict, List
+
+# Tags the pipeline actually classifies, so ingest writes realistic rows
+CORE_TAGS = [
+    "Revenues", "CostOfRevenue", "GrossProfit", "OperatingExpenses",
+    "OperatingIncomeLoss", "InterestExpense", "OtherIncomeExpenseNet",
+    "IncomeTaxExpenseBenefit", "NetIncomeLoss",
+    "Assets", "AssetsCurrent", "Cash", "AccountsReceivable", "Inventory",
+    "PropertyPlantAndEquipmentNet", "Goodwill", "Liabilities",
+    "LiabilitiesCurrent", "AccountsPayable", "LongTermBorrowings",
+    "StockholdersEquity",
+    "NetCashProvidedByUsedInOperatingActivities",
+    "PaymentsForAcquisitionsOfProductiveAssets",
+    "DepreciationDepletionAndAmortization",
+]
+
+
+def _period_values(rng: random.Random, revenue: float) -> Dict[str, float]:
+    """Internally consistent statement values for one fiscal year"""
+    ebit = revenue * rng.uniform(0.10, 0.30)
+    tax = ebit * rng.uniform(0.15, 0.25)
+    assets = revenue * rng.uniform(1.0, 2.0)
+    equity = assets * rng.uniform(0.3, 0.6)
+    current_assets = assets * rng.uniform(0.3, 0.5)
+
+    values = {tag: revenue * rng.uniform(0.01, 0.2) for tag in CORE_TAGS}
+    values.update({
+        "Revenues": revenue,
+        "OperatingIncomeLoss": ebit,
+        "IncomeTaxExpenseBenefit": tax,
+        "NetIncomeLoss": ebit - tax,
+        "Assets": assets,
+        "StockholdersEquity": equity,
+        "Liabilities": assets - equity,
+        "AssetsCurrent": current_assets,
+        "Cash": current_assets * rng.uniform(0.2, 0.4),
+        "LiabilitiesCurrent": current_assets * rng.uniform(0.5, 0.9),
+    })
+    return values
+
+
+def make_company_facts(cik: int, years: int = 20, extra_tags: int = 400,
+                       first_year: int = 2004, seed: int = 0) -> Dict:
+    """
+    Build a Company Facts payload in the SEC layout
+
+    Each 10-K reports the current year plus two comparative years (a few of
+    them restated), and each year has three 10-Q filings, so tags carry the
+    duplicated entries real large filers have.
+
+    Args:
+        cik: Central Index Key of the synthetic company
+        years: Number of fiscal years of filings
+        extra_tags: Unclassified tags added on top of CORE_TAGS
+        first_year: First fiscal year
+        seed: Random seed (combined with cik)
+    """
+    rng = random.Random(seed * 1_000_003 + cik)
+    tags = CORE_TAGS + [f"SyntheticDisclosureItem{i}" for i in range(extra_tags)]
+
+    revenue = rng.uniform(1e8, 1e11)
+    yearly: List[Dict[str, float]] = []
+    for _ in range(years):
+        yearly.append(_period_values(rng, revenue))
+        revenue *= rng.uniform(0.95, 1.15)
+
+    us_gaap = {}
+    for tag in tags:
+        entries = []
+        for y in range(years):
+            fy = first_year + y
+            accession = f"{cik:010d}-{(fy + 1) % 100:02d}-{y:06d}"
+            for lag in range(min(3, y + 1)):
+                values = yearly[y - lag]
+                value = values.get(tag, values["Revenues"] * 0.01)
+                # Occasionally a comparative restates the original figure
+                if lag and rng.random() < 0.02:
+                    value *= 1.01
+                entries.append({
+                    "end": f"{fy - lag}-12-31",
+                    "val": round(value),
+                    "accn": accession,
+                    "fy": fy,
+                    "fp": "FY",
+                    "form": "10-K",
+                    "filed": f"{fy + 1}-02-15",
+                })
+            for q, month in enumerate(("03-31", "06-30", "09-30"), 1):
+                q_accession = f"{cik:010d}-{fy % 100:02d}-{y * 10 + q:06d}"
+                entries.append({
+                    "end": f"{fy}-{month}",
+                    "val": round(yearly[y].get(tag, 0) / 4),
+                    "accn": q_accession,
+                    "fy": fy,
+                    "fp": f"Q{q}",
+                    "form": "10-Q",
+                    "filed": f"{fy}-{month[:2]}-28",
+                })
+        # Comparatives make the same end date appear several times; SEC
+        # files list entries ordered by period end
+        entries.sort(key=lambda e: (e["end"], e["filed"]))
+        us_gaap[tag] = {"label": tag, "units": {"USD": entries}}
+
+    return {
+        "cik": cik,
+        "entityName": f"Synthetic Company {cik}",
+        "facts": {"us-gaap": us_gaap},
+    }
@@ -0,0 +1,236 @@
+"""
+Shared Period Component Cache
+Bounded LRU of period_facts rows shared by the FCFF, DCF and validation engines
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from database.period_facts import get_period_facts
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# FINANCIAL_COMPONENT_CACHE_SIZE sets the number of periods kept (0 disables caching)
+CACHE_SIZE_ENV = "FINANCIAL_COMPONENT_CACHE_SIZE"
+
+# Connections whose database key and data_version are remembered
+_MAX_CONNECTIONS = 32
+
+# Pending invalidation of every period of a database
+_ALL = object()
+
+
+class ComponentCache:
+    """
+    Thread-safe LRU of {column: value} period_facts rows, keyed by database and period
+
+    Entries are invalidated two ways:
+
+    - refresh_period_facts(), the write path of the extractor, drops
+      exactly the periods it rebuilds (invalidate()).
+    - Commits by any other connection, including other processes, change
+      the reading connection's PRAGMA data_version; the next lookup then
+      drops every entry of that database.
+
+    A connection's own commits never change its own data_version, and
+    another connection may cache the old committed row between
+    invalidate() and the writer's commit. The invalidated periods are
+    therefore dropped again at the writer's next lookup outside a
+    transaction, and a lookup inside a transaction bypasses the cache:
+    it may see uncommitted rows that a rollback would discard.
+
+    Direct SQL writes reach period_facts through its triggers, which cannot
+    reach this cache: a connection that writes statement rows itself and
+    reads through the cache calls invalidate() after writing.
+
+    With revalidate_interval > 0 the data_version check runs at most that
+    often per connection, trading freshness against out-of-process writers
+    for cheaper hits.
+    """
+
+    def __init__(self, maxsize: int = 4096, revalidate_interval: float = 0.0):
+        """
+        Args:
+            maxsize: Periods kept before the least recently used is evicted (0 disables)
+            revalidate_interval: Seconds between data_version checks per connection
+        """
+        self.maxsize = maxsize
+        self.revalidate_interval = revalidate_interval
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, Dict[str, float]]" = OrderedDict()
+        # id(conn) -> [conn, database key, data_version, checked at, pragma cursor, pending]
+        # pending: periods to drop again once conn is outside a transaction (_ALL for every period)
+        self._connections: "OrderedDict[int, list]" = OrderedDict()
+        # Bumped by every invalidation; a fetch that raced one is not stored
+        self._generation = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.invalidations = 0
+            self.flushes = 0
+
+    def clear(self):
+        """Drop every entry and remembered connection"""
+        with self._lock:
+            self._entries.clear()
+            self._connections.clear()
+
+    def _connection_state(self, conn: sqlite3.Connection) -> list:
+        """Database key and data_version bookkeeping for a connection (lock held)"""
+        state = self._connections.get(id(conn))
+        if state is not None and state[0] is conn:
+            return state
+
+        path = next((row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "main"), "")
+        # Connections to the same file share entries; each in-memory database is its own
+        key = os.path.realpath(path) if path else f":memory:{id(conn)}"
+        cursor = conn.cursor()
+        version = cursor.execute("PRAGMA data_version").fetchall()[0][0]
+        state = [conn, key, version, time.monotonic(), cursor, None]
+        self._connections[id(conn)] = state
+        while len(self._connections) > _MAX_CONNECTIONS:
+            _, forgotten = self._connections.popitem(last=False)
+            if forgotten[5] is not None:
+                # Its commit can no longer be awaited: drop its database now
+                self.invalidations += self._drop_database(forgotten[1])
+        return state
+
+    def _drop_database(self, key: str) -> int:
+        self._generation += 1
+        stale = [entry for entry in self._entries if entry[0] == key]
+        for entry in stale:
+            del self._entries[entry]
+        return len(stale)
+
+    def _drop_periods(self, key: str, period_ids) -> int:
+        if period_ids is _ALL:
+            return self._drop_database(key)
+        self._generation += 1
+        return sum(self._entries.pop((key, period_id), None) is not None for period_id in period_ids)
+
+    def _revalidate(self, conn: sqlite3.Connection) -> str:
+        """Database key for conn, after dropping its entries if another connection committed"""
+        state = self._connections.get(id(conn))
+        if state is None or state[0] is not conn:
+            with self._lock:
+                state = self._connection_state(conn)
+
+        if state[5] is not None:
+            # First lookup since invalidate() with the writer's transaction closed
+            with self._lock:
+                self.invalidations += self._drop_periods(state[1], state[5])
+                state[5] = None
+
+        if self.revalidate_interval:
+            now = time.monotonic()
+            if now - state[3] < self.revalidate_interval:
+                return state[1]
+            state[3] = now
+
+        # Drained with fetchall() so the statement does not hold a read transaction open
+        version = state[4].execute("PRAGMA data_version").fetchall()[0][0]
+        if version != state[2]:
+            with self._lock:
+                state[2] = version
+                self.flushes += 1
+                self.invalidations += self._drop_database(state[1])
+        return state[1]
+
+    def get_period_facts(self, cursor: sqlite3.Cursor, period_id: int) -> Dict[str, float]:
+        """
+        Cached database.period_facts.get_period_facts()
+
+        Returns a copy, so callers may modify the result. Inside a transaction
+        the row is read directly and not cached.
+        """
+        conn = cursor.connection
+        if self.maxsize <= 0 or conn.in_transaction:
+            return get_period_facts(cursor, period_id)
+
+        entry = (self._revalidate(conn), period_id)
+        with self._lock:
+            facts = self._entries.get(entry)
+            if facts is not None:
+                self._entries.move_to_end(entry)
+                self.hits += 1
+                return dict(facts)
+            self.misses += 1
+            generation = self._generation
+
+        facts = get_period_facts(cursor, period_id)
+        with self._lock:
+            if self._generation != generation:
+                return dict(facts)
+            self._entries[entry] = facts
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return dict(facts)
+
+    def invalidate(self, conn: sqlite3.Connection, period_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Drop cached periods of conn's database
+
+        The periods are dropped again at conn's next lookup outside a
+        transaction, after the write is committed.
+
+        Args:
+            conn: Connection writing the periods
+            period_ids: Periods rewritten; None drops the whole database
+
+        Returns:
+            Number of entries dropped
+        """
+        with self._lock:
+            state = self._connection_state(conn)
+            period_ids = _ALL if period_ids is None else set(period_ids)
+            if period_ids is _ALL or state[5] is _ALL:
+                state[5] = _ALL
+            else:
+                state[5] = period_ids | (state[5] or set())
+            dropped = self._drop_periods(state[1], period_ids)
+            self.invalidations += dropped
+            return dropped
+
+    def stats(self) -> Dict:
+        """Hit/miss counters, current size and hit rate"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "flushes": self.flushes,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+
+# Process-wide instance used by FCFFCalculator, DCFValuationEngine and FinancialValidator
+COMPONENT_CACHE = ComponentCache(int(os.environ.get(CACHE_SIZE_ENV, 4096)))
+
+
+if __name__ == "__main__":
+    from database.schema import FinancialDatabaseSchema
+
+    conn = FinancialDatabaseSchema.get_read_connection()
+    cursor = conn.cursor()
+    period_ids = [row[0] for row in conn.execute("SELECT period_id FROM period_facts LIMIT 100")]
+    for _ in range(3):
+        for period_id in period_ids:
+            COMPONENT_CACHE.get_period_facts(cursor, period_id)
+    print(COMPONENT_CACHE.stats())
+    conn.close()
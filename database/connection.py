@@ -0,0 +1,180 @@
+"""
+SQLite Connection Manager
+Tuned, thread-local connections with WAL journaling and a read-only reader path
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import weakref
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class PooledConnectionMixin:
+    """
+    Close semantics of connections handed out by ConnectionManager
+
+    The handle is shared by every caller on the same thread, so close() is a
+    no-op: it neither closes the handle nor rolls back, because an open
+    transaction may belong to another caller (e.g. an extractor batching
+    commits). release() closes the handle for good, discarding anything
+    still uncommitted.
+    """
+
+    def close(self):
+        pass
+
+    def release(self):
+        sqlite3.Connection.close(self)
+
+    @property
+    def is_open(self) -> bool:
+        try:
+            self.total_changes
+            return True
+        except sqlite3.ProgrammingError:
+            return False
+
+
+class ManagedConnection(PooledConnectionMixin, sqlite3.Connection):
+    """Connection handed out by ConnectionManager"""
+
+
+def connection_factory():
+    """ManagedConnection, or its instrumented counterpart when profiling is on"""
+    from database import instrumentation
+    return instrumentation.PooledInstrumentedConnection if instrumentation.is_enabled() \
+        else ManagedConnection
+
+
+class _ThreadConnections:
+    """A thread's pooled connections, released when its thread-local storage is freed"""
+
+    def __init__(self):
+        self.connections = []
+        weakref.finalize(self, _release_connections, self.connections)
+
+
+def _release_connections(connections: list):
+    for conn in connections:
+        conn.release()
+
+
+class ConnectionManager:
+    """
+    Per-thread pooled connections to one database file
+
+    Writers share WAL journaling, so readers on other connections are never
+    blocked by an open ingest transaction. Every thread (and every process
+    after a fork) gets its own read-write and read-only connection, created on
+    first use and reused for the rest of the thread's life.
+
+    Only the owning thread holds a connection strongly, and releases it when
+    the thread exits (e.g. a finished pool worker); the manager keeps weak
+    references for close_all().
+    """
+
+    # Applied to every connection
+    PRAGMAS = {
+        "synchronous": "NORMAL",       # durable at checkpoints; safe with WAL
+        "cache_size": -65536,          # 64 MiB page cache per connection
+        "mmap_size": 268435456,        # 256 MiB memory-mapped reads
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,          # ms to wait on a locked database
+    }
+
+    # Persistent, database-level settings, applied by the first writer
+    JOURNAL_MODE = "WAL"
+
+    def __init__(self, db_path: Union[str, Path], pragmas: Optional[Dict] = None):
+        """
+        Args:
+            db_path: SQLite database file
+            pragmas: Overrides merged into PRAGMAS
+        """
+        self.db_path = Path(db_path)
+        self.pragmas = {**self.PRAGMAS, **(pragmas or {})}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: "weakref.WeakSet[ManagedConnection]" = weakref.WeakSet()
+        self._pid = os.getpid()
+
+    def _configure(self, conn: sqlite3.Connection, read_only: bool = False):
+        for pragma, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        if read_only:
+            conn.execute("PRAGMA query_only = ON")
+        else:
+            conn.execute(f"PRAGMA journal_mode = {self.JOURNAL_MODE}")
+
+    def _connect(self, read_only: bool) -> ManagedConnection:
+        """A new, unconfigured connection to the database"""
+        if read_only:
+            return sqlite3.connect(f"file:{self.db_path.resolve()}?mode=ro", uri=True,
+                                   factory=connection_factory(), check_same_thread=False)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        return sqlite3.connect(self.db_path, factory=connection_factory(), check_same_thread=False)
+
+    def _open(self, read_only: bool) -> ManagedConnection:
+        conn = self._connect(read_only)
+        self._configure(conn, read_only)
+        conn.row_factory = sqlite3.Row  # Return rows as dictionaries; callers may override
+
+        with self._lock:
+            self._connections.add(conn)
+        return conn
+
+    def _get(self, attr: str, read_only: bool) -> ManagedConnection:
+        # Connections inherited across fork() are never reused by the child
+        if self._pid != os.getpid():
+            self._local = threading.local()
+            self._connections = weakref.WeakSet()
+            self._pid = os.getpid()
+
+        conn = getattr(self._local, attr, None)
+        if conn is None or not conn.is_open:
+            conn = self._open(read_only)
+            setattr(self._local, attr, conn)
+            owned = getattr(self._local, "owned", None)
+            if owned is None:
+                owned = self._local.owned = _ThreadConnections()
+            owned.connections[:] = [c for c in owned.connections if c.is_open] + [conn]
+        return conn
+
+    def connection(self) -> ManagedConnection:
+        """This thread's read-write connection"""
+        return self._get("writer", read_only=False)
+
+    def read_connection(self) -> ManagedConnection:
+        """This thread's read-only connection (never takes write locks)"""
+        if not self.db_path.exists():
+            self.connection()
+        return self._get("reader", read_only=True)
+
+    def close_all(self):
+        """Close every connection this manager opened, in any thread"""
+        with self._lock:
+            connections, self._connections = list(self._connections), weakref.WeakSet()
+        for conn in connections:
+            conn.release()
+        self._local = threading.local()
+
+
+_managers: Dict[Path, ConnectionManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_manager(db_path: Union[str, Path]) -> ConnectionManager:
+    """Process-wide ConnectionManager for a database file"""
+    key = Path(db_path).resolve()
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = _managers[key] = ConnectionManager(db_path)
+        return manager
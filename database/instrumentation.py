@@ -0,0 +1,311 @@
+"""
+SQLite Query Instrumentation
+Opt-in per-statement counts, latency percentiles, rows returned and slow-query plans
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import atexit
+import logging
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from database.connection import PooledConnectionMixin
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# FINANCIAL_DB_PROFILE=1 turns instrumentation on for every pooled connection;
+# FINANCIAL_DB_SLOW_MS sets the slow-statement threshold (default 50 ms)
+PROFILE_ENV = "FINANCIAL_DB_PROFILE"
+SLOW_MS_ENV = "FINANCIAL_DB_SLOW_MS"
+
+# Latencies sampled per statement for the percentiles
+RESERVOIR_SIZE = 1024
+
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDER_LIST = re.compile(r"\?(\s*,\s*\?)+")
+
+
+def normalize_sql(sql: str) -> str:
+    """Statement key: whitespace collapsed, runs of ?-placeholders folded to '?, ...'"""
+    return _PLACEHOLDER_LIST.sub("?, ...", _WHITESPACE.sub(" ", sql).strip())
+
+
+class QueryStats:
+    """
+    Thread-safe per-statement collector
+
+    Each execution records its latency (execute plus the fetches that drain
+    it) and the rows it returned. The first execution of a statement slower
+    than slow_ms has its EXPLAIN QUERY PLAN captured.
+
+    Count, total and maximum are exact. Percentiles come from a uniform
+    reservoir of at most reservoir_size latencies per statement, so memory
+    stays bounded however long the profiled run; they are exact until a
+    statement has run more than reservoir_size times.
+    """
+
+    def __init__(self, slow_ms: float = 50.0, reservoir_size: int = RESERVOIR_SIZE):
+        self.slow_ms = slow_ms
+        self.reservoir_size = reservoir_size
+        self._lock = threading.Lock()
+        self._random = random.Random(0)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            # key -> [count, total seconds, max seconds]
+            self.totals: Dict[str, List[float]] = {}
+            self.latencies: Dict[str, List[float]] = {}
+            self.rows: Dict[str, int] = {}
+            self.plans: Dict[str, List[str]] = {}
+            self.slowest: Dict[str, float] = {}
+
+    def record(self, key: str, seconds: float, rows: int) -> bool:
+        """Add one execution; True if it is slow and the statement has no plan yet"""
+        with self._lock:
+            totals = self.totals.get(key)
+            if totals is None:
+                totals = self.totals[key] = [0, 0.0, 0.0]
+                self.latencies[key] = []
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] = max(totals[2], seconds)
+
+            # Reservoir sampling (Algorithm R): each execution is kept with equal probability
+            sample = self.latencies[key]
+            if len(sample) < self.reservoir_size:
+                sample.append(seconds)
+            else:
+                slot = self._random.randrange(totals[0])
+                if slot < self.reservoir_size:
+                    sample[slot] = seconds
+
+            self.rows[key] = self.rows.get(key, 0) + rows
+            slow = seconds * 1000 >= self.slow_ms
+            if slow:
+                self.slowest[key] = max(self.slowest.get(key, 0.0), seconds)
+            return slow and key not in self.plans
+
+    def add_plan(self, key: str, plan: List[str]):
+        with self._lock:
+            self.plans[key] = plan
+
+    def summary(self) -> List[Dict]:
+        """Per-statement totals, most total time first"""
+        with self._lock:
+            items = [(key, list(self.totals[key]), np.array(values), self.rows[key])
+                     for key, values in self.latencies.items()]
+        summary = []
+        for key, (count, total, slowest), sample, rows in items:
+            p50, p95, p99 = np.percentile(sample, [50, 95, 99])
+            summary.append({
+                "sql": key, "count": count, "total": total, "mean": total / count,
+                "p50": float(p50), "p95": float(p95), "p99": float(p99), "max": slowest,
+                "rows": rows,
+            })
+        return sorted(summary, key=lambda entry: entry["total"], reverse=True)
+
+    def report(self, top: int = 20, width: int = 90) -> str:
+        """Plain-text report of the top statements and captured slow plans"""
+        summary = self.summary()
+        if not summary:
+            return "No SQL statements recorded"
+
+        total = sum(entry["total"] for entry in summary)
+        lines = [
+            f"SQL profile: {sum(e['count'] for e in summary):,} executions of "
+            f"{len(summary):,} statements, {total * 1000:,.1f} ms total",
+            f"{'count':>9} {'total ms':>10} {'%':>5} {'mean ms':>9} {'p50':>8} {'p95':>8} "
+            f"{'p99':>8} {'max':>8} {'rows':>10}  statement",
+        ]
+        for entry in summary[:top]:
+            sql = entry["sql"] if len(entry["sql"]) <= width else entry["sql"][:width - 3] + "..."
+            lines.append(
+                f"{entry['count']:9,} {entry['total'] * 1000:10.1f} "
+                f"{entry['total'] / total * 100 if total else 0:5.1f} {entry['mean'] * 1000:9.3f} "
+                f"{entry['p50'] * 1000:8.3f} {entry['p95'] * 1000:8.3f} {entry['p99'] * 1000:8.3f} "
+                f"{entry['max'] * 1000:8.2f} {entry['rows']:10,}  {sql}"
+            )
+
+        with self._lock:
+            plans = dict(self.plans)
+            slowest = dict(self.slowest)
+        if plans:
+            lines.append(f"\nStatements slower than {self.slow_ms:g} ms:")
+            for key, plan in sorted(plans.items(), key=lambda item: -slowest.get(item[0], 0)):
+                lines.append(f"  [{slowest.get(key, 0) * 1000:.1f} ms] {key[:width]}")
+                lines.extend(f"      {step}" for step in plan)
+        return "\n".join(lines)
+
+
+STATS = QueryStats(float(os.environ.get(SLOW_MS_ENV, 50)))
+
+_enabled = False
+_atexit_registered = False
+
+
+def enable(slow_ms: Optional[float] = None, report_at_exit: bool = True):
+    """
+    Instrument connections opened from now on (ConnectionManager, InMemoryDatabase)
+
+    Args:
+        slow_ms: Threshold for capturing EXPLAIN QUERY PLAN
+        report_at_exit: Log STATS.report() when the process exits
+    """
+    global _enabled, _atexit_registered
+    _enabled = True
+    if slow_ms is not None:
+        STATS.slow_ms = slow_ms
+    if report_at_exit and not _atexit_registered:
+        atexit.register(_report_at_exit)
+        _atexit_registered = True
+
+
+def disable():
+    """Stop instrumenting new connections (existing ones keep recording)"""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled or os.environ.get(PROFILE_ENV, "") not in ("", "0")
+
+
+def report(top: int = 20) -> str:
+    """Report on everything recorded so far"""
+    return STATS.report(top)
+
+
+def _report_at_exit():
+    if STATS.latencies:
+        logger.info("\n" + STATS.report())
+
+
+# Set through the environment, profiling also reports at exit
+if is_enabled():
+    enable()
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times each execution through to the fetches that drain it"""
+
+    _pending = None  # [key, sql, params, seconds, rows] of the open execution
+
+    def _start(self, sql: str, params, method, *args):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            result = method(self, sql, *args)
+        finally:
+            self._pending = [normalize_sql(sql), sql, params, time.perf_counter() - start, 0]
+        if self.description is None:  # no result rows to drain
+            self._finish()
+        return result
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        key, sql, params, seconds, rows = pending
+        if STATS.record(key, seconds, rows) and params is not None:
+            try:
+                explain = sqlite3.Cursor(self.connection)
+                plan = [row[3] for row in explain.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+                STATS.add_plan(key, plan)
+            except sqlite3.Error as e:
+                STATS.add_plan(key, [f"(no plan: {e})"])
+
+    def _fetched(self, start: float, rows: int, exhausted: bool):
+        if self._pending is not None:
+            self._pending[3] += time.perf_counter() - start
+            self._pending[4] += rows
+            if exhausted:
+                self._finish()
+
+    def execute(self, sql: str, parameters=()):
+        return self._start(sql, parameters, sqlite3.Cursor.execute, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters):
+        return self._start(sql, None, sqlite3.Cursor.executemany, seq_of_parameters)
+
+    def executescript(self, sql_script: str):
+        return self._start(sql_script, None, sqlite3.Cursor.executescript)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size: Optional[int] = None):
+        start = time.perf_counter()
+        size = self.arraysize if size is None else size
+        rows = super().fetchmany(size)
+        self._fetched(start, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows), True)
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(start, 0, True)
+            raise
+        self._fetched(start, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose statements are recorded in STATS"""
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or InstrumentedCursor)
+
+    # sqlite3.Connection.execute* bypass Cursor.execute, so route them here
+    def execute(self, sql: str, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script: str):
+        return self.cursor().executescript(sql_script)
+
+
+class PooledInstrumentedConnection(PooledConnectionMixin, InstrumentedConnection):
+    """Instrumented connection handed out by ConnectionManager (pooled close semantics)"""
+
+
+def connect(database, **kwargs) -> InstrumentedConnection:
+    """sqlite3.connect() returning an instrumented connection; close() really closes it"""
+    return sqlite3.connect(database, factory=InstrumentedConnection, **kwargs)
+
+
+if __name__ == "__main__":
+    from database.schema import FinancialDatabaseSchema
+    from valuation.fcff import FCFFCalculator
+
+    enable(slow_ms=1, report_at_exit=False)
+    conn = FinancialDatabaseSchema.get_connection()
+    calculator = FCFFCalculator(conn)
+    for (company_id,) in conn.execute("SELECT id FROM companies LIMIT 20").fetchall():
+        calculator.calculate_historical_fcff(company_id, years=5)
+    print(report())
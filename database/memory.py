@@ -0,0 +1,169 @@
+"""
+In-Memory Database Mode
+Runs a batch against a RAM copy of the database, optionally writing it back in one transaction
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import itertools
+import logging
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+from database.connection import ConnectionManager, ManagedConnection, connection_factory
+from database.schema import FinancialDatabaseSchema
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Distinguishes the in-memory databases of one process
+_names = itertools.count(1)
+
+
+class MemoryConnectionManager(ConnectionManager):
+    """
+    Per-thread pooled connections to one shared in-memory database
+
+    Uses SQLite's memdb VFS: every connection to the same "/name" sees the
+    same database, with ordinary transaction isolation between threads.
+    There is no WAL, so a reader waits (up to busy_timeout) for another
+    thread's write transaction to commit. Within a thread the read
+    connection is the write connection, so a reader never waits on its own
+    uncommitted writes.
+    """
+
+    PRAGMAS = {
+        "cache_size": -65536,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    }
+
+    def __init__(self, name: str):
+        """
+        Args:
+            name: Database name shared by every connection of this manager
+        """
+        super().__init__(name)
+        self.uri = f"file:/{name}?vfs=memdb"
+
+    def _connect(self, read_only: bool) -> ManagedConnection:
+        return sqlite3.connect(self.uri, uri=True, factory=connection_factory(),
+                               check_same_thread=False)
+
+    def _configure(self, conn: sqlite3.Connection, read_only: bool = False):
+        for pragma, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+
+    def read_connection(self) -> ManagedConnection:
+        """This thread's connection (the same one connection() returns)"""
+        return self.connection()
+
+
+class InMemoryDatabase:
+    """
+    Copy of a database file held in memory
+
+        with InMemoryDatabase(write_back=True) as conn:
+            ...  # FinancialDatabaseSchema.get_connection() returns conn
+
+    The file is copied in with VACUUM INTO and brought up to the current
+    schema. While active, get_connection() and get_read_connection()
+    return the calling thread's own connection to the in-memory database
+    (see MemoryConnectionManager), so the whole pipeline runs without disk
+    I/O. On a clean exit with write_back=True the committed contents are
+    backed up into the file in one write transaction; connections other
+    threads hold to the file stay open and see the new contents once it
+    commits.
+    """
+
+    def __init__(self, db_path: Optional[Union[str, Path]] = None, write_back: bool = False):
+        """
+        Args:
+            db_path: Database file to load (default FinancialDatabaseSchema.DB_PATH);
+                     a missing file starts an empty database
+            write_back: Save to db_path when the block exits without an exception
+        """
+        self.db_path = Path(db_path) if db_path else FinancialDatabaseSchema.DB_PATH
+        self.write_back = write_back
+        self.manager: Optional[MemoryConnectionManager] = None
+        self.conn: Optional[ManagedConnection] = None
+        # Unpooled connection keeping the database alive whichever threads exit
+        self._keeper: Optional[sqlite3.Connection] = None
+
+    def load(self) -> ManagedConnection:
+        """Create the in-memory copy and route get_connection() to it"""
+        start = time.perf_counter()
+        self.manager = MemoryConnectionManager(f"financial-{os.getpid()}-{next(_names)}")
+        self._keeper = sqlite3.connect(self.manager.uri, uri=True, check_same_thread=False)
+
+        if self.db_path.exists():
+            # VACUUM INTO rather than the backup API: a backup copies the file's WAL
+            # header flag, which the memdb VFS cannot open
+            source = sqlite3.connect(f"file:{self.db_path.resolve()}?mode=ro", uri=True)
+            try:
+                source.execute("VACUUM INTO ?", (self.manager.uri,))
+            finally:
+                source.close()
+
+        self.conn = self.manager.connection()
+        FinancialDatabaseSchema.migrate(self.conn)
+        FinancialDatabaseSchema._memory_database = self.manager
+
+        logger.info(f"✓ Loaded {self.db_path} into memory in {time.perf_counter() - start:.2f}s")
+        return self.conn
+
+    def save(self, db_path: Optional[Union[str, Path]] = None):
+        """
+        Write the in-memory contents over a database file
+
+        Commits the calling thread's connection first; other threads'
+        uncommitted transactions are not saved. The backup replaces the
+        file's contents in a single write transaction, so readers of the
+        file see either the old or the new database, and a crash leaves the
+        old one.
+        """
+        target = Path(db_path) if db_path else self.db_path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        start = time.perf_counter()
+
+        self.manager.connection().commit()
+        dest = sqlite3.connect(target)
+        try:
+            dest.execute(f"PRAGMA busy_timeout = {ConnectionManager.PRAGMAS['busy_timeout']}")
+            self._keeper.backup(dest)
+        finally:
+            dest.close()
+
+        logger.info(f"✓ Wrote in-memory database back to {target} in {time.perf_counter() - start:.2f}s")
+
+    def close(self):
+        """Stop routing get_connection() to memory and free the copy"""
+        if FinancialDatabaseSchema._memory_database is self.manager:
+            FinancialDatabaseSchema._memory_database = None
+        if self.manager is not None:
+            self.manager.close_all()
+            self.manager = None
+        if self._keeper is not None:
+            self._keeper.close()
+            self._keeper = None
+        self.conn = None
+
+    def __enter__(self) -> ManagedConnection:
+        return self.load()
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self.write_back and exc_type is None:
+                self.save()
+        finally:
+            self.close()
+        return False
+
+
+if __name__ == "__main__":
+    with InMemoryDatabase() as conn:
+        tables = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'").fetchone()[0]
+        companies = conn.execute("SELECT COUNT(*) FROM companies").fetchone()[0]
+        print(f"{FinancialDatabaseSchema.DB_PATH} in memory: {tables} tables, {companies} companies")
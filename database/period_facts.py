@@ -0,0 +1,280 @@
+"""
+Materialized Wide Period Facts
+One row per period with the typed values the valuation and validation code reads
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import sqlite3
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+from database.schema import FinancialDatabaseSchema
+from database.xbrl_classifier import get_tag_classifier
+
+STATEMENT_TABLES = ("income_statement", "balance_sheet", "cash_flow_statement")
+
+# Chunk size for period id lists (4 IN lists per statement stay under SQLite's limit)
+_CHUNK = 200
+
+
+def _ranked_tags(line_items) -> List[str]:
+    """Tags of the line items in preference order: line item order, then synonym rank"""
+    classifier = get_tag_classifier()
+    return [tag for line_item in line_items for tag in classifier.tags_for(line_item)
+            if classifier.line_item(tag) == line_item]
+
+
+def _tag_list(tags) -> str:
+    return ", ".join(f"'{tag}'" for tag in tags)
+
+
+def _column_tags(column: str) -> List[str]:
+    """Tags feeding a period_facts column, in preference order"""
+    if column == "debt":
+        return list(FinancialDatabaseSchema.DEBT_TAGS)
+    return _ranked_tags(FinancialDatabaseSchema.PERIOD_FACT_COLUMNS[column])
+
+
+def _column_sql(column: str) -> str:
+    """
+    Aggregate over rows f(xbrl_tag, value) of one period giving the column value
+
+    The best-ranked tag present wins; in ZERO_FALLBACK_COLUMNS a 0 only wins
+    when no tag has another value.
+    """
+    if column == "debt":
+        return f"SUM(CASE WHEN f.xbrl_tag IN ({_tag_list(FinancialDatabaseSchema.DEBT_TAGS)}) " \
+               f"THEN f.value END)"
+
+    branches = [f"MAX(CASE WHEN f.xbrl_tag = '{tag}' THEN f.value END)" for tag in _column_tags(column)]
+    if column in FinancialDatabaseSchema.ZERO_FALLBACK_COLUMNS:
+        branches = [f"NULLIF({branch}, 0)" for branch in branches[:-1]] + branches[-1:] + branches[:-1]
+    return f"COALESCE({', '.join(branches)})" if len(branches) > 1 else branches[0]
+
+
+def _shares_sql(period: str) -> str:
+    """Latest shares_outstanding row of a period: weighted average, else basic"""
+    return f"""(SELECT COALESCE(so.weighted_avg_shares, so.shares_outstanding)
+                FROM shares_outstanding so WHERE so.period_id = {period}
+                ORDER BY so.id DESC LIMIT 1)"""
+
+
+@lru_cache(maxsize=None)
+def refresh_sql(filtered: bool) -> str:
+    """
+    INSERT OR REPLACE ... SELECT pivoting the statement tables into period_facts
+
+    Columns come from FinancialDatabaseSchema.PERIOD_FACT_COLUMNS through the
+    shared classifier, so synonyms resolve exactly as they do at ingest.
+    """
+    columns = FinancialDatabaseSchema.PERIOD_FACT_COLUMNS
+    period_filter = "WHERE period_id IN ({ids})" if filtered else ""
+
+    facts = " UNION ALL ".join(
+        f"SELECT period_id, xbrl_tag, value FROM {table} {period_filter}"
+        for table in STATEMENT_TABLES
+    )
+    selects = ",\n               ".join(
+        f"{_column_sql(column)} AS {column}" for column in columns
+    )
+
+    return f"""
+        INSERT OR REPLACE INTO period_facts
+        (period_id, company_id, fiscal_year, {", ".join(columns)}, debt, shares, updated_at)
+        SELECT fp.id, fp.company_id, fp.fiscal_year,
+               {selects},
+               {_column_sql("debt")} AS debt,
+               {_shares_sql("fp.id")} AS shares,
+               CURRENT_TIMESTAMP
+        FROM financial_periods fp
+        LEFT JOIN ({facts}) f ON f.period_id = fp.id
+        {"WHERE fp.id IN ({ids})" if filtered else ""}
+        GROUP BY fp.id
+    """
+
+
+def _period_update_sql(compact: bool, row: str) -> str:
+    """
+    UPDATE of the period_facts row of a changed statement row (NEW or OLD)
+
+    Only columns fed by the row's tag are recomputed, from that period's
+    rows with the column's tags (an index range per statement table).
+    """
+    if compact:
+        def source(tags):
+            return f"""SELECT t.xbrl_tag, f.value FROM facts f
+                       JOIN tag_dictionary t ON t.id = f.tag_id
+                       WHERE f.period_id = {row}.period_id AND t.xbrl_tag IN ({_tag_list(tags)})"""
+
+        def matches(tags):
+            return f"{row}.tag_id IN (SELECT id FROM tag_dictionary WHERE xbrl_tag IN ({_tag_list(tags)}))"
+    else:
+        def source(tags):
+            return " UNION ALL ".join(
+                f"SELECT xbrl_tag, value FROM {table} "
+                f"WHERE period_id = {row}.period_id AND xbrl_tag IN ({_tag_list(tags)})"
+                for table in STATEMENT_TABLES
+            )
+
+        def matches(tags):
+            return f"{row}.xbrl_tag IN ({_tag_list(tags)})"
+
+    assignments = []
+    for column in (*FinancialDatabaseSchema.PERIOD_FACT_COLUMNS, "debt"):
+        tags = _column_tags(column)
+        assignments.append(
+            f"{column} = CASE WHEN {matches(tags)} "
+            f"THEN (SELECT {_column_sql(column)} FROM ({source(tags)}) f) ELSE {column} END"
+        )
+    return f"""
+                    UPDATE period_facts SET {", ".join(assignments)}, updated_at = CURRENT_TIMESTAMP
+                    WHERE period_id = {row}.period_id;"""
+
+
+def trigger_statements(compact: bool) -> List[str]:
+    """
+    CREATE TRIGGER statements keeping period_facts current for any writer
+
+    Statement rows (the facts table in compact mode) and shares_outstanding
+    rows update the affected columns of their period's row; financial_periods
+    rows create, move and delete period_facts rows. Writers that refresh
+    period_facts themselves suspend the row triggers with deferred_refresh().
+    """
+    tracked = sorted({tag for column in (*FinancialDatabaseSchema.PERIOD_FACT_COLUMNS, "debt")
+                      for tag in _column_tags(column)})
+    if compact:
+        tables = ["facts"]
+        tag_filter = f"{{row}}.tag_id IN (SELECT id FROM tag_dictionary WHERE xbrl_tag IN ({_tag_list(tracked)}))"
+    else:
+        tables = list(STATEMENT_TABLES)
+        tag_filter = f"{{row}}.xbrl_tag IN ({_tag_list(tracked)})"
+    active = "NOT EXISTS (SELECT 1 FROM period_facts_deferred)"
+
+    statements = []
+    for table in tables:
+        for event, rows in (("INSERT", ("NEW",)), ("DELETE", ("OLD",)), ("UPDATE", ("OLD", "NEW"))):
+            when = " OR ".join(tag_filter.format(row=row) for row in rows)
+            statements.append(f"""
+                CREATE TRIGGER IF NOT EXISTS period_facts_{table}_{event.lower()}
+                AFTER {event} ON {table}
+                WHEN {active} AND ({when})
+                BEGIN{"".join(_period_update_sql(compact, row) for row in rows)}
+                END
+            """)
+
+    for event, rows in (("INSERT", ("NEW",)), ("DELETE", ("OLD",)), ("UPDATE", ("OLD", "NEW"))):
+        updates = "".join(f"""
+                    UPDATE period_facts SET shares = {_shares_sql(f"{row}.period_id")},
+                                            updated_at = CURRENT_TIMESTAMP
+                    WHERE period_id = {row}.period_id;""" for row in rows)
+        statements.append(f"""
+                CREATE TRIGGER IF NOT EXISTS period_facts_shares_outstanding_{event.lower()}
+                AFTER {event} ON shares_outstanding
+                WHEN {active}
+                BEGIN{updates}
+                END
+            """)
+
+    statements += ["""
+                CREATE TRIGGER IF NOT EXISTS period_facts_financial_periods_insert
+                AFTER INSERT ON financial_periods
+                BEGIN
+                    INSERT OR IGNORE INTO period_facts (period_id, company_id, fiscal_year)
+                    VALUES (NEW.id, NEW.company_id, NEW.fiscal_year);
+                END
+            """, """
+                CREATE TRIGGER IF NOT EXISTS period_facts_financial_periods_update
+                AFTER UPDATE OF company_id, fiscal_year ON financial_periods
+                BEGIN
+                    UPDATE period_facts SET company_id = NEW.company_id, fiscal_year = NEW.fiscal_year,
+                                            updated_at = CURRENT_TIMESTAMP
+                    WHERE period_id = NEW.id;
+                END
+            """, """
+                CREATE TRIGGER IF NOT EXISTS period_facts_financial_periods_delete
+                AFTER DELETE ON financial_periods
+                BEGIN
+                    DELETE FROM period_facts WHERE period_id = OLD.id;
+                END
+            """]
+    return statements
+
+
+@contextmanager
+def deferred_refresh(conn: sqlite3.Connection):
+    """
+    Suspend the period_facts row triggers for writes followed by refresh_period_facts()
+
+    Bulk writers (the extractor) rebuild the touched periods once instead of
+    once per row. The marker row lives only inside the open transaction, so
+    other connections' writes still fire the triggers; on an autocommit
+    connection the block runs in its own transaction.
+
+    Usage:
+        with deferred_refresh(conn):
+            conn.executemany("INSERT INTO income_statement ...", rows)
+        refresh_period_facts(conn, period_ids)
+    """
+    owned = conn.isolation_level is None and not conn.in_transaction
+    if owned:
+        conn.execute("BEGIN")
+    conn.execute("INSERT INTO period_facts_deferred (deferred) VALUES (1)")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("DELETE FROM period_facts_deferred")
+        if owned:
+            conn.rollback()
+        raise
+    conn.execute("DELETE FROM period_facts_deferred")
+    if owned:
+        conn.commit()
+
+
+def refresh_period_facts(conn: sqlite3.Connection,
+                         period_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Rebuild period_facts rows from the statement tables
+
+    Runs inside the caller's transaction and does not commit. The rebuilt
+    periods are dropped from the shared component cache.
+
+    Args:
+        conn: Database connection
+        period_ids: Periods to refresh; None rebuilds every period
+
+    Returns:
+        Number of periods refreshed
+    """
+    from database.component_cache import COMPONENT_CACHE
+
+    if period_ids is None:
+        COMPONENT_CACHE.invalidate(conn)
+        return conn.execute(refresh_sql(False)).rowcount
+
+    period_ids = list(period_ids)
+    COMPONENT_CACHE.invalidate(conn, period_ids)
+    refreshed = 0
+    for start in range(0, len(period_ids), _CHUNK):
+        chunk = period_ids[start:start + _CHUNK]
+        placeholders = ", ".join("?" * len(chunk))
+        sql = refresh_sql(True).format(ids=placeholders)
+        refreshed += conn.execute(sql, chunk * (len(STATEMENT_TABLES) + 1)).rowcount
+    return refreshed
+
+
+def get_period_facts(cursor: sqlite3.Cursor, period_id: int) -> Dict[str, float]:
+    """
+    One period's wide row as {column: value}, omitting missing values
+
+    Returns an empty dict when the period has no period_facts row.
+    """
+    columns = (*FinancialDatabaseSchema.PERIOD_FACT_COLUMNS, "debt", "shares")
+    cursor.execute(f"""
+        SELECT {", ".join(columns)} FROM period_facts WHERE period_id = ?
+    """, (period_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return {}
+    return {column: value for column, value in zip(columns, row) if value is not None}
@@ -0,0 +1,140 @@
+"""
+Fundamentals Repository
+Company histories as NumPy column arrays aligned by fiscal year, one SQL statement per call
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import json
+import logging
+import sqlite3
+from typing import Dict, Iterable, Optional, Union
+
+import numpy as np
+
+from database.schema import FinancialDatabaseSchema
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Float columns read from period_facts (NaN where a value is missing)
+FUNDAMENTAL_COLUMNS = (*FinancialDatabaseSchema.PERIOD_FACT_COLUMNS, "debt", "shares")
+
+# Period key columns returned ahead of the fundamentals
+KEY_COLUMNS = ("company_id", "period_id", "fiscal_year", "period_end_date")
+
+
+class FundamentalsRepository:
+    """
+    Read-only access to annual fundamentals for one or many companies
+
+    Histories come back as {column: array} with one entry per period,
+    ordered by company and then fiscal year (oldest first), so they feed
+    straight into vectorized code such as valuation.fcff.fcff_from_arrays.
+    Periods without a period_facts row have NaN fundamentals.
+    """
+
+    # The LIMIT subquery runs once per requested company as an index seek
+    # on idx_financial_periods_company_form_year; no window over all periods
+    HISTORY_SQL = f"""
+        SELECT p.company_id, p.id, p.fiscal_year, p.period_end_date,
+               {", ".join(f"f.{column}" for column in FUNDAMENTAL_COLUMNS)}
+        FROM json_each(?) AS c
+        JOIN financial_periods p ON p.id IN (
+            SELECT id FROM financial_periods
+            WHERE company_id = c.value AND filing_type = ?
+            ORDER BY fiscal_year DESC, period_end_date DESC, id DESC
+            LIMIT ?
+        )
+        LEFT JOIN period_facts f ON f.period_id = p.id
+        ORDER BY p.company_id, p.fiscal_year, p.period_end_date, p.id
+    """
+
+    def __init__(self, db_connection: sqlite3.Connection):
+        self.db = db_connection
+        self.cursor = self.db.cursor()
+
+    def company_history(self, company_ids: Union[int, Iterable[int]],
+                        years: Optional[int] = None,
+                        filing_type: str = "10-K") -> Dict[str, np.ndarray]:
+        """
+        Annual fundamentals for one or many companies
+
+        Args:
+            company_ids: Company ID or IDs
+            years: Most recent N fiscal years per company (default all)
+            filing_type: Filing type of the periods (default 10-K)
+
+        Returns:
+            {column: array}: company_id, period_id and fiscal_year as int64,
+            period_end_date as str, FUNDAMENTAL_COLUMNS as float64
+        """
+        ids = [company_ids] if isinstance(company_ids, (int, np.integer)) else list(company_ids)
+        self.cursor.execute(self.HISTORY_SQL, (
+            json.dumps(sorted({int(company_id) for company_id in ids})),
+            filing_type,
+            years if years is not None else 2 ** 62,
+        ))
+        rows = self.cursor.fetchall()
+        values = list(zip(*rows)) if rows else [()] * (len(KEY_COLUMNS) + len(FUNDAMENTAL_COLUMNS))
+
+        history = {
+            "company_id": np.array(values[0], dtype=np.int64),
+            "period_id": np.array(values[1], dtype=np.int64),
+            "fiscal_year": np.array([year or 0 for year in values[2]], dtype=np.int64),
+            "period_end_date": np.array(values[3], dtype=str),
+        }
+        for column, column_values in zip(FUNDAMENTAL_COLUMNS, values[len(KEY_COLUMNS):]):
+            history[column] = np.array(column_values, dtype=np.float64)  # None -> NaN
+        return history
+
+    def company_history_matrix(self, company_ids: Iterable[int],
+                               years: Optional[int] = None,
+                               filing_type: str = "10-K") -> Dict[str, np.ndarray]:
+        """
+        Fundamentals as (company x fiscal year) matrices
+
+        Rows follow company_ids, columns the union of fiscal years found;
+        missing company-years are NaN. When a company has several periods in
+        one fiscal year the latest one fills the cell.
+
+        Returns:
+            {"company_ids", "fiscal_years", "period_id" (-1 if missing),
+             column: 2-D float64 array for each of FUNDAMENTAL_COLUMNS}
+        """
+        company_ids = np.asarray(list(company_ids), dtype=np.int64)
+        history = self.company_history(company_ids.tolist(), years, filing_type)
+
+        fiscal_years = np.unique(history["fiscal_year"])
+        row_of = {company_id: row for row, company_id in enumerate(company_ids.tolist())}
+        rows = np.array([row_of[company_id] for company_id in history["company_id"].tolist()],
+                        dtype=np.int64)
+        columns = np.searchsorted(fiscal_years, history["fiscal_year"])
+        shape = (len(company_ids), len(fiscal_years))
+
+        # History is ordered oldest first within a company, so later writes win
+        matrix = {"company_ids": company_ids, "fiscal_years": fiscal_years}
+        period_id = np.full(shape, -1, dtype=np.int64)
+        period_id[rows, columns] = history["period_id"]
+        matrix["period_id"] = period_id
+        for column in FUNDAMENTAL_COLUMNS:
+            values = np.full(shape, np.nan)
+            values[rows, columns] = history[column]
+            matrix[column] = values
+        return matrix
+
+    @staticmethod
+    def to_structured(history: Dict[str, np.ndarray]) -> np.ndarray:
+        """company_history() output as one NumPy structured array"""
+        return np.rec.fromarrays(list(history.values()), names=list(history.keys()))
+
+
+if __name__ == "__main__":
+    conn = FinancialDatabaseSchema.get_read_connection()
+    repository = FundamentalsRepository(conn)
+
+    company_ids = [row[0] for row in conn.execute("SELECT id FROM companies LIMIT 5")]
+    history = repository.company_history(company_ids, years=5)
+    print(f"{len(history['period_id'])} periods for {len(company_ids)} companies")
+    for record in repository.to_structured(history)[:10]:
+        print(f"  company {record.company_id} FY{record.fiscal_year}: "
+              f"revenue {record.revenue:,.0f}  EBIT {record.ebit:,.0f}")
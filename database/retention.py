@@ -0,0 +1,230 @@
+"""
+Retention for Append-Only Audit Tables
+Rolls old validation_log / dcf_calculations rows up by day, archives them and trims the hot tables
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import argparse
+import hashlib
+import logging
+import shutil
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from database.snapshot import export_snapshot
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Per-table policy:
+#   time_column     - row timestamp (UTC, as written by CURRENT_TIMESTAMP)
+#   keep_days       - rows older than this leave the hot table
+#   keep_latest_by  - the newest row of each group stays regardless of age
+#   children        - child tables archived and deleted with it: {table: foreign key}
+RETENTION_POLICIES = {
+    "validation_log": {
+        "time_column": "check_date",
+        "keep_days": 90,
+        "keep_latest_by": ("period_id", "check_name"),
+        "children": {},
+    },
+    "dcf_calculations": {
+        "time_column": "calculation_date",
+        "keep_days": 365,
+        "keep_latest_by": ("company_id",),
+        "children": {"dcf_projections": "dcf_calc_id", "fcff_components": "dcf_calc_id"},
+    },
+}
+
+# Merge the selected rows into the daily rollup tables. Validation runs roll
+# up per check across periods; per-period detail stays in the archive and in
+# the latest row per (period, check), which never leaves the hot table.
+ROLLUP_SQL = {
+    "validation_log": """
+        INSERT INTO validation_log_daily
+        (day, check_name, runs, passed_runs, variance_sum,
+         variance_min, variance_max, first_check, last_check)
+        SELECT date(check_date), check_name, COUNT(*), SUM(COALESCE(passed, 0)),
+               SUM(variance), MIN(variance), MAX(variance), MIN(check_date), MAX(check_date)
+        FROM validation_log
+        WHERE id IN (SELECT id FROM temp.retention_ids)
+        GROUP BY date(check_date), check_name
+        ON CONFLICT (day, check_name) DO UPDATE SET
+            runs = runs + excluded.runs,
+            passed_runs = passed_runs + excluded.passed_runs,
+            variance_sum = COALESCE(variance_sum + excluded.variance_sum,
+                                    variance_sum, excluded.variance_sum),
+            variance_min = MIN(COALESCE(variance_min, excluded.variance_min),
+                               COALESCE(excluded.variance_min, variance_min)),
+            variance_max = MAX(COALESCE(variance_max, excluded.variance_max),
+                               COALESCE(excluded.variance_max, variance_max)),
+            first_check = MIN(first_check, excluded.first_check),
+            last_check = MAX(last_check, excluded.last_check)
+    """,
+    "dcf_calculations": """
+        INSERT INTO dcf_calculations_daily
+        (day, company_id, runs, wacc_sum, enterprise_value_sum, enterprise_value_min,
+         enterprise_value_max, price_per_share_sum, price_per_share_min,
+         price_per_share_max, last_calc_id)
+        SELECT date(calculation_date), company_id, COUNT(*), SUM(wacc),
+               SUM(enterprise_value), MIN(enterprise_value), MAX(enterprise_value),
+               SUM(price_per_share), MIN(price_per_share), MAX(price_per_share), MAX(id)
+        FROM dcf_calculations
+        WHERE id IN (SELECT id FROM temp.retention_ids)
+        GROUP BY date(calculation_date), company_id
+        ON CONFLICT (day, company_id) DO UPDATE SET
+            runs = runs + excluded.runs,
+            wacc_sum = COALESCE(wacc_sum + excluded.wacc_sum, wacc_sum, excluded.wacc_sum),
+            enterprise_value_sum = COALESCE(enterprise_value_sum + excluded.enterprise_value_sum,
+                                            enterprise_value_sum, excluded.enterprise_value_sum),
+            enterprise_value_min = MIN(COALESCE(enterprise_value_min, excluded.enterprise_value_min),
+                                       COALESCE(excluded.enterprise_value_min, enterprise_value_min)),
+            enterprise_value_max = MAX(COALESCE(enterprise_value_max, excluded.enterprise_value_max),
+                                       COALESCE(excluded.enterprise_value_max, enterprise_value_max)),
+            price_per_share_sum = COALESCE(price_per_share_sum + excluded.price_per_share_sum,
+                                           price_per_share_sum, excluded.price_per_share_sum),
+            price_per_share_min = MIN(COALESCE(price_per_share_min, excluded.price_per_share_min),
+                                      COALESCE(excluded.price_per_share_min, price_per_share_min)),
+            price_per_share_max = MAX(COALESCE(price_per_share_max, excluded.price_per_share_max),
+                                      COALESCE(excluded.price_per_share_max, price_per_share_max)),
+            last_calc_id = MAX(last_calc_id, excluded.last_calc_id)
+    """,
+}
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def resolve_policies(overrides: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
+    """RETENTION_POLICIES with per-table overrides applied (e.g. {"validation_log": {"keep_days": 30}})"""
+    policies = {table: dict(policy) for table, policy in RETENTION_POLICIES.items()}
+    for table, override in (overrides or {}).items():
+        if table not in policies:
+            raise ValueError(f"No retention policy for table {table!r}")
+        policies[table].update(override)
+    return policies
+
+
+def _select_expired(conn: sqlite3.Connection, table: str, policy: Dict, cutoff: str) -> int:
+    """Fill temp.retention_ids with the rows of table that the policy retires"""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS retention_ids (id INTEGER PRIMARY KEY)")
+    conn.execute("DELETE FROM temp.retention_ids")
+
+    keep_latest = ""
+    if policy.get("keep_latest_by"):
+        group_by = ", ".join(policy["keep_latest_by"])
+        keep_latest = f"AND id NOT IN (SELECT MAX(id) FROM {table} GROUP BY {group_by})"
+
+    conn.execute(f"""
+        INSERT INTO temp.retention_ids (id)
+        SELECT id FROM {table}
+        WHERE {policy['time_column']} < ? {keep_latest}
+    """, (cutoff,))
+    return conn.execute("SELECT COUNT(*) FROM temp.retention_ids").fetchone()[0]
+
+
+def archive_checksum(archive: Union[str, Path]) -> str:
+    """
+    SHA-256 of an archive directory: every file (manifest.json and the .npz
+    data files), each as its name and contents, in name order
+    """
+    digest = hashlib.sha256()
+    for path in sorted(Path(archive).iterdir()):
+        digest.update(path.name.encode() + b"\0")
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def apply_retention(conn: sqlite3.Connection,
+                    policies: Optional[Dict[str, Dict]] = None,
+                    archive_dir: Union[str, Path] = "data/archive",
+                    now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Move expired rows out of the hot audit tables
+
+    For each table, in its own transaction: expired rows are merged into the
+    daily rollup table, exported with their child rows to
+    <archive_dir>/<table>/<cutoff>/ (a snapshot readable with
+    database.snapshot.Snapshot), deleted, and the run recorded in
+    retention_runs with the archive checksum (archive_checksum(), over
+    the manifest and data files). If any step fails the
+    transaction rolls back and the partial archive is removed.
+
+    Args:
+        conn: Database connection
+        policies: Overrides merged into RETENTION_POLICIES
+        archive_dir: Root directory for archived rows
+        now: Reference time, naive UTC or timezone-aware (default current time)
+
+    Returns:
+        {table: rows archived}
+    """
+    # Naive UTC, to compare with timestamps written by CURRENT_TIMESTAMP
+    now = now or datetime.now(timezone.utc)
+    if now.tzinfo is not None:
+        now = now.astimezone(timezone.utc).replace(tzinfo=None)
+    archived = {}
+
+    for table, policy in resolve_policies(policies).items():
+        cutoff = (now - timedelta(days=policy["keep_days"])).strftime(TIMESTAMP_FORMAT)
+        out_dir = Path(archive_dir) / table / f"before_{cutoff.replace(' ', 'T').replace(':', '')}"
+        suffix = 1
+        while out_dir.exists():  # never overwrite an earlier archive
+            out_dir = out_dir.with_name(f"{out_dir.name.split('.')[0]}.{suffix}")
+            suffix += 1
+
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        try:
+            count = _select_expired(conn, table, policy, cutoff)
+            if count:
+                conn.execute(ROLLUP_SQL[table])
+
+                children = policy.get("children", {})
+                where = {table: "id IN (SELECT id FROM temp.retention_ids)"}
+                for child, foreign_key in children.items():
+                    where[child] = f"{foreign_key} IN (SELECT id FROM temp.retention_ids)"
+                export_snapshot(conn, out_dir, tables=(table, *children), where=where)
+                checksum = archive_checksum(out_dir)
+
+                for child, condition in where.items():
+                    if child != table:
+                        conn.execute(f"DELETE FROM {child} WHERE {condition}")
+                conn.execute(f"DELETE FROM {table} WHERE {where[table]}")
+
+                conn.execute("""
+                    INSERT INTO retention_runs
+                    (table_name, cutoff, rows_archived, archive_path, archive_sha256)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (table, cutoff, count, str(out_dir), checksum))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            shutil.rmtree(out_dir, ignore_errors=True)
+            raise
+
+        archived[table] = count
+        logger.info(f"✓ {table}: {count:,} rows before {cutoff} rolled up"
+                    + (f" and archived to {out_dir}" if count else ""))
+
+    return archived
+
+
+if __name__ == "__main__":
+    from database.schema import FinancialDatabaseSchema
+
+    parser = argparse.ArgumentParser(description="Apply retention to the audit tables")
+    parser.add_argument("--archive-dir", default="data/archive")
+    parser.add_argument("--validation-days", type=int,
+                        default=RETENTION_POLICIES["validation_log"]["keep_days"])
+    parser.add_argument("--dcf-days", type=int,
+                        default=RETENTION_POLICIES["dcf_calculations"]["keep_days"])
+    args = parser.parse_args()
+
+    conn = FinancialDatabaseSchema.get_connection()
+    apply_retention(conn, {
+        "validation_log": {"keep_days": args.validation_days},
+        "dcf_calculations": {"keep_days": args.dcf_days},
+    }, archive_dir=args.archive_dir)
+    conn.close()
@@ -4,14 +4,40 @@ Implements normalized relational design for professional DCF analysis
 Prof. V. Ravichandran - The Mountain Path - World of Finance
 """
 
+import os
+import re
 import sqlite3
 from datetime import datetime
 from pathlib import Path
 
+from database.connection import get_manager
+
+
+def _backfill_period_facts(conn: sqlite3.Connection):
+    """Migration step: populate period_facts from the existing statement tables"""
+    from database.period_facts import refresh_period_facts
+    refresh_period_facts(conn)
+
+
+def _create_period_facts_triggers(conn: sqlite3.Connection):
+    """Migration step: triggers keeping period_facts current for every writer"""
+    from database.period_facts import trigger_statements
+    for statement in trigger_statements(FinancialDatabaseSchema.is_compact(conn)):
+        conn.execute(statement)
+
+
 class FinancialDatabaseSchema:
     """Initialize and manage financial data schema"""
     
-    DB_PATH = Path("data/financial_database.db")
+    # Per-process database location: FINANCIAL_DB_PATH, else relative to the working directory
+    DB_PATH = Path(os.environ.get("FINANCIAL_DB_PATH", "data/financial_database.db"))
+    
+    # Database files already brought up to SCHEMA_VERSION in this process
+    _migrated_paths = set()
+    
+    # Hands out get_connection()/get_read_connection() while an
+    # InMemoryDatabase is active (see database/memory.py)
+    _memory_database = None
     
     CREATE_STATEMENTS = {
         "companies": """
@@ -43,6 +69,18 @@ class FinancialDatabaseSchema:
             )
         """,
         
+        "ingested_filings": """
+            CREATE TABLE IF NOT EXISTS ingested_filings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                company_id INTEGER NOT NULL,
+                accession_number TEXT NOT NULL,
+                form TEXT,  -- 10-K, 10-Q
+                loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (company_id) REFERENCES companies(id),
+                UNIQUE(company_id, accession_number)
+            )
+        """,
+        
         "income_statement": """
             CREATE TABLE IF NOT EXISTS income_statement (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -84,6 +122,19 @@ class FinancialDatabaseSchema:
             )
         """,
         
+        "fact_restatements": """
+            CREATE TABLE IF NOT EXISTS fact_restatements (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                period_id INTEGER NOT NULL,
+                xbrl_tag TEXT NOT NULL,
+                value REAL NOT NULL,  -- value as originally reported, superseded by a later filing
+                accession_number TEXT NOT NULL,
+                filed DATE,
+                FOREIGN KEY (period_id) REFERENCES financial_periods(id),
+                UNIQUE(period_id, xbrl_tag, accession_number)
+            )
+        """,
+        
         "shares_outstanding": """
             CREATE TABLE IF NOT EXISTS shares_outstanding (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -121,8 +172,8 @@ class FinancialDatabaseSchema:
                 projection_years INTEGER,
                 wacc REAL NOT NULL,
                 terminal_growth_rate REAL NOT NULL,
-                fcff_year_1 REAL,
-                fcff_year_2 REAL,
+                fcff_year_1 REAL,  -- first five years, kept for older readers;
+                fcff_year_2 REAL,  -- the full horizon is in dcf_projections
                 fcff_year_3 REAL,
                 fcff_year_4 REAL,
                 fcff_year_5 REAL,
@@ -137,6 +188,16 @@ class FinancialDatabaseSchema:
             )
         """,
         
+        "dcf_projections": """
+            CREATE TABLE IF NOT EXISTS dcf_projections (
+                dcf_calc_id INTEGER NOT NULL,
+                year INTEGER NOT NULL,  -- 1..projection_years
+                fcff REAL NOT NULL,
+                PRIMARY KEY (dcf_calc_id, year),
+                FOREIGN KEY (dcf_calc_id) REFERENCES dcf_calculations(id)
+            ) WITHOUT ROWID
+        """,
+        
         "fcff_components": """
             CREATE TABLE IF NOT EXISTS fcff_components (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -152,9 +213,239 @@ class FinancialDatabaseSchema:
                 fcff REAL,
                 FOREIGN KEY (dcf_calc_id) REFERENCES dcf_calculations(id)
             )
+        """,
+        
+        # Materialized one-row-per-period view of the statement tables,
+        # refreshed by the extractor and kept current for any other writer
+        # by triggers (see database/period_facts.py)
+        "period_facts": """
+            CREATE TABLE IF NOT EXISTS period_facts (
+                period_id INTEGER PRIMARY KEY,
+                company_id INTEGER NOT NULL,
+                fiscal_year INTEGER,
+                revenue REAL,
+                ebit REAL,
+                net_income REAL,
+                tax_expense REAL,
+                da REAL,  -- Depreciation & Amortization
+                capex REAL,
+                ocf REAL,  -- Operating Cash Flow
+                total_assets REAL,
+                total_liabilities REAL,
+                total_equity REAL,
+                current_assets REAL,
+                current_liabilities REAL,
+                cash REAL,
+                debt REAL,  -- sum of DEBT_TAGS
+                shares REAL,  -- weighted average, else basic shares outstanding
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (period_id) REFERENCES financial_periods(id),
+                FOREIGN KEY (company_id) REFERENCES companies(id)
+            )
+        """,
+        
+        # A row here suspends the period_facts triggers; only ever present
+        # inside the writing transaction (see period_facts.deferred_refresh)
+        "period_facts_deferred": """
+            CREATE TABLE IF NOT EXISTS period_facts_deferred (
+                deferred INTEGER
+            )
+        """,
+        
+        # Daily rollups of rows aged out of validation_log / dcf_calculations
+        # (see database/retention.py). Sums rather than means, so later runs merge.
+        "validation_log_daily": """
+            CREATE TABLE IF NOT EXISTS validation_log_daily (
+                day DATE NOT NULL,
+                check_name TEXT NOT NULL,
+                runs INTEGER NOT NULL,
+                passed_runs INTEGER NOT NULL,
+                variance_sum REAL,
+                variance_min REAL,
+                variance_max REAL,
+                first_check TIMESTAMP,
+                last_check TIMESTAMP,
+                PRIMARY KEY (day, check_name)
+            ) WITHOUT ROWID
+        """,
+        
+        "dcf_calculations_daily": """
+            CREATE TABLE IF NOT EXISTS dcf_calculations_daily (
+                day DATE NOT NULL,
+                company_id INTEGER NOT NULL,
+                runs INTEGER NOT NULL,
+                wacc_sum REAL,
+                enterprise_value_sum REAL,
+                enterprise_value_min REAL,
+                enterprise_value_max REAL,
+                price_per_share_sum REAL,
+                price_per_share_min REAL,
+                price_per_share_max REAL,
+                last_calc_id INTEGER,
+                PRIMARY KEY (day, company_id)
+            ) WITHOUT ROWID
+        """,
+        
+        # Audit trail of retention runs and where their rows were archived
+        "retention_runs": """
+            CREATE TABLE IF NOT EXISTS retention_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                cutoff TIMESTAMP NOT NULL,
+                rows_archived INTEGER NOT NULL,
+                archive_path TEXT,
+                archive_sha256 TEXT,
+                run_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
         """
     }
     
+    # Secondary indexes for the hot read paths. The statement-table indexes
+    # carry value so per-period lookups are answered from the index alone.
+    CREATE_INDEXES = {
+        "idx_financial_periods_company_form_year": """
+            CREATE INDEX IF NOT EXISTS idx_financial_periods_company_form_year
+            ON financial_periods (company_id, filing_type, fiscal_year, period_end_date)
+        """,
+        "idx_income_statement_period_tag_value": """
+            CREATE INDEX IF NOT EXISTS idx_income_statement_period_tag_value
+            ON income_statement (period_id, xbrl_tag, value)
+        """,
+        "idx_balance_sheet_period_tag_value": """
+            CREATE INDEX IF NOT EXISTS idx_balance_sheet_period_tag_value
+            ON balance_sheet (period_id, xbrl_tag, value)
+        """,
+        "idx_cash_flow_statement_period_tag_value": """
+            CREATE INDEX IF NOT EXISTS idx_cash_flow_statement_period_tag_value
+            ON cash_flow_statement (period_id, xbrl_tag, value)
+        """,
+        "idx_shares_outstanding_period": """
+            CREATE INDEX IF NOT EXISTS idx_shares_outstanding_period
+            ON shares_outstanding (period_id)
+        """,
+        "idx_validation_log_period": """
+            CREATE INDEX IF NOT EXISTS idx_validation_log_period
+            ON validation_log (period_id, check_name)
+        """,
+        "idx_dcf_calculations_company_date": """
+            CREATE INDEX IF NOT EXISTS idx_dcf_calculations_company_date
+            ON dcf_calculations (company_id, calculation_date)
+        """,
+        "idx_validation_log_check_date": """
+            CREATE INDEX IF NOT EXISTS idx_validation_log_check_date
+            ON validation_log (check_date)
+        """,
+        "idx_dcf_calculations_date": """
+            CREATE INDEX IF NOT EXISTS idx_dcf_calculations_date
+            ON dcf_calculations (calculation_date)
+        """,
+        "idx_dcf_calculations_daily_company": """
+            CREATE INDEX IF NOT EXISTS idx_dcf_calculations_daily_company
+            ON dcf_calculations_daily (company_id, day)
+        """,
+        "idx_fcff_components_calc": """
+            CREATE INDEX IF NOT EXISTS idx_fcff_components_calc
+            ON fcff_components (dcf_calc_id, fiscal_year)
+        """,
+        "idx_period_facts_company_year": """
+            CREATE INDEX IF NOT EXISTS idx_period_facts_company_year
+            ON period_facts (company_id, fiscal_year)
+        """,
+    }
+    
+    # Forward migrations: (version, description, statements), applied in order
+    # by migrate(). Version 1 is the table set of CREATE_STATEMENTS. A fresh
+    # database runs every migration against the current CREATE_STATEMENTS, so
+    # later steps must be safe on tables that already have their final shape.
+    MIGRATIONS = [
+        (1, "Base tables", list(CREATE_STATEMENTS.values())),
+        (2, "Covering indexes for hot read paths",
+         [
+             CREATE_INDEXES["idx_financial_periods_company_form_year"],
+             CREATE_INDEXES["idx_income_statement_period_tag_value"],
+             CREATE_INDEXES["idx_balance_sheet_period_tag_value"],
+             CREATE_INDEXES["idx_cash_flow_statement_period_tag_value"],
+             CREATE_INDEXES["idx_shares_outstanding_period"],
+             CREATE_INDEXES["idx_validation_log_period"],
+             CREATE_INDEXES["idx_dcf_calculations_company_date"],
+             CREATE_INDEXES["idx_fcff_components_calc"],
+         ]),
+        (3, "Materialized period_facts table", [
+            CREATE_STATEMENTS["period_facts"],
+            CREATE_INDEXES["idx_period_facts_company_year"],
+            _backfill_period_facts,
+        ]),
+        (4, "Variable-length dcf_projections", [
+            CREATE_STATEMENTS["dcf_projections"],
+            *[f"""
+                INSERT OR IGNORE INTO dcf_projections (dcf_calc_id, year, fcff)
+                SELECT id, {year}, fcff_year_{year} FROM dcf_calculations
+                WHERE projection_years >= {year} AND fcff_year_{year} IS NOT NULL
+            """ for year in range(1, 6)],
+        ]),
+        (5, "Time indexes, daily rollups and retention audit", [
+            CREATE_STATEMENTS["validation_log_daily"],
+            CREATE_STATEMENTS["dcf_calculations_daily"],
+            CREATE_STATEMENTS["retention_runs"],
+            CREATE_INDEXES["idx_validation_log_check_date"],
+            CREATE_INDEXES["idx_dcf_calculations_date"],
+            CREATE_INDEXES["idx_dcf_calculations_daily_company"],
+        ]),
+        (6, "period_facts triggers and zero depreciation fallback", [
+            CREATE_STATEMENTS["period_facts_deferred"],
+            _create_period_facts_triggers,
+            _backfill_period_facts,
+        ]),
+    ]
+    
+    SCHEMA_VERSION = MIGRATIONS[-1][0]
+    
+    # Read paths that must be served by an index: name -> (sql, sample params)
+    HOT_QUERIES = {
+        "historical_periods": ("""
+            SELECT id, period_end_date, fiscal_year FROM financial_periods
+            WHERE company_id = ? AND filing_type = '10-K'
+            ORDER BY fiscal_year DESC LIMIT ?
+        """, (1, 5)),
+        "income_statement_by_period": (
+            "SELECT xbrl_tag, value FROM income_statement WHERE period_id = ?", (1,)),
+        "balance_sheet_by_period": (
+            "SELECT xbrl_tag, value FROM balance_sheet WHERE period_id = ?", (1,)),
+        "cash_flow_by_period": (
+            "SELECT xbrl_tag, value FROM cash_flow_statement WHERE period_id = ?", (1,)),
+        "balance_sheet_by_tag": (
+            "SELECT value FROM balance_sheet WHERE period_id = ? AND xbrl_tag = ?",
+            (1, "Assets")),
+        "balance_sheet_by_tags": ("""
+            SELECT value FROM balance_sheet
+            WHERE period_id = ? AND xbrl_tag IN ('Assets', 'Liabilities', 'StockholdersEquity')
+        """, (1,)),
+        "shares_by_period": (
+            "SELECT weighted_avg_shares FROM shares_outstanding WHERE period_id = ?", (1,)),
+        "period_facts_by_period": (
+            "SELECT ebit, revenue, da, capex FROM period_facts WHERE period_id = ?", (1,)),
+        "period_facts_by_company": ("""
+            SELECT fiscal_year, ebit FROM period_facts
+            WHERE company_id = ? ORDER BY fiscal_year
+        """, (1,)),
+        "dcf_projections_by_calc": (
+            "SELECT year, fcff FROM dcf_projections WHERE dcf_calc_id = ? ORDER BY year", (1,)),
+        "validation_log_by_period": (
+            "SELECT check_name, passed FROM validation_log WHERE period_id = ?", (1,)),
+        "validation_log_since": (
+            "SELECT period_id, check_name, passed FROM validation_log WHERE check_date >= ?",
+            ("2024-01-01",)),
+        "dcf_calculations_since": (
+            "SELECT company_id, enterprise_value FROM dcf_calculations WHERE calculation_date >= ?",
+            ("2024-01-01",)),
+        "validation_log_daily_since": (
+            "SELECT day, check_name, runs, passed_runs FROM validation_log_daily WHERE day >= ?",
+            ("2024-01-01",)),
+        "dcf_calculations_daily_by_company": (
+            "SELECT day, runs, enterprise_value_sum FROM dcf_calculations_daily WHERE company_id = ?",
+            (1,)),
+    }
+    
     # Mapping of common XBRL tags to standardized line items
     XBRL_TAG_MAPPING = {
         # Income Statement
@@ -171,7 +462,7 @@ class FinancialDatabaseSchema:
         # Balance Sheet - Assets
         "Cash": ["Cash", "CashAndCashEquivalents"],
         "AccountsReceivable": ["AccountsReceivable", "AccountsReceivableNetCurrent"],
-        "Inventory": ["InventoryNetCurrent"],
+        "Inventory": ["InventoryNetCurrent", "Inventory"],
         "CurrentAssets": ["AssetsCurrent"],
         "LongTermAssets": ["AssetsNonCurrent"],
         "PPE": ["PropertyPlantAndEquipmentGross", "PropertyPlantAndEquipmentNet"],
@@ -193,21 +484,265 @@ class FinancialDatabaseSchema:
         "DepreciationAndAmortization": ["DepreciationAndAmortization"],
     }
     
+    # Financial statement of each standardized line item in XBRL_TAG_MAPPING
+    XBRL_STATEMENT_TYPES = {
+        **dict.fromkeys([
+            "Revenues", "CostOfRevenue", "GrossProfit", "OperatingExpenses",
+            "OperatingIncome", "InterestExpense", "OtherIncome",
+            "IncomeTaxProvision", "NetIncome",
+        ], "INCOME"),
+        **dict.fromkeys([
+            "Cash", "AccountsReceivable", "Inventory", "CurrentAssets",
+            "LongTermAssets", "PPE", "Goodwill", "IntangibleAssets", "TotalAssets",
+            "AccountsPayable", "CurrentLiabilities", "LongTermDebt",
+            "TotalLiabilities", "TotalStockholdersEquity",
+        ], "BALANCE_SHEET"),
+        **dict.fromkeys([
+            "OperatingCashFlow", "CapitalExpenditure", "Depreciation",
+            "DepreciationAndAmortization",
+        ], "CASH_FLOW"),
+    }
+    
+    # period_facts column -> standardized line items supplying it, in preference order
+    PERIOD_FACT_COLUMNS = {
+        "revenue": ("Revenues",),
+        "ebit": ("OperatingIncome",),
+        "net_income": ("NetIncome",),
+        "tax_expense": ("IncomeTaxProvision",),
+        "da": ("Depreciation", "DepreciationAndAmortization"),
+        "capex": ("CapitalExpenditure",),
+        "ocf": ("OperatingCashFlow",),
+        "total_assets": ("TotalAssets",),
+        "total_liabilities": ("TotalLiabilities",),
+        "total_equity": ("TotalStockholdersEquity",),
+        "current_assets": ("CurrentAssets",),
+        "current_liabilities": ("CurrentLiabilities",),
+        "cash": ("Cash",),
+    }
+    
+    # Columns where a reported 0 counts as missing, so the next line item is
+    # used (a zero DepreciationDepletionAndAmortization falls back to
+    # DepreciationAndAmortization, as the original validator did)
+    ZERO_FALLBACK_COLUMNS = ("da",)
+    
+    # Balance sheet tags summed into period_facts.debt
+    DEBT_TAGS = ("LongTermBorrowings", "LongTermDebt", "CurrentPortionOfLongTermDebt")
+    
+    # Compact storage mode: the statement tables become views over one
+    # dictionary-encoded facts table. view -> (statement_type, extra column)
+    COMPACT_VIEWS = {
+        "income_statement": ("INCOME", None),
+        "balance_sheet": ("BALANCE_SHEET", "side"),
+        "cash_flow_statement": ("CASH_FLOW", "section"),
+    }
+    
+    COMPACT_TABLES = {
+        "tag_dictionary": """
+            CREATE TABLE IF NOT EXISTS tag_dictionary (
+                id INTEGER PRIMARY KEY,
+                xbrl_tag TEXT UNIQUE NOT NULL,
+                line_item TEXT NOT NULL,
+                statement_type TEXT NOT NULL  -- INCOME, BALANCE_SHEET, CASH_FLOW
+            )
+        """,
+        
+        "facts": """
+            CREATE TABLE IF NOT EXISTS facts (
+                period_id INTEGER NOT NULL,
+                tag_id INTEGER NOT NULL,
+                value REAL NOT NULL,  -- unit is always USD
+                PRIMARY KEY (period_id, tag_id),
+                FOREIGN KEY (period_id) REFERENCES financial_periods(id),
+                FOREIGN KEY (tag_id) REFERENCES tag_dictionary(id)
+            ) WITHOUT ROWID
+        """,
+    }
+    
     @classmethod
-    def initialize_database(cls):
-        """Create database and all tables"""
-        cls.DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    def compact_statements(cls) -> list:
+        """
+        DDL of the compact mode: facts tables, compatibility views, and
+        INSTEAD OF triggers so writes to the views land in facts
         
-        conn = sqlite3.connect(cls.DB_PATH)
-        cursor = conn.cursor()
+        Views keep the statement tables' columns; id, side and section read
+        as NULL and unit as 'USD'.
+        """
+        statements = list(cls.COMPACT_TABLES.values())
+        for view, (statement_type, extra_column) in cls.COMPACT_VIEWS.items():
+            extra = f", NULL AS {extra_column}" if extra_column else ""
+            statements += [f"""
+                CREATE VIEW IF NOT EXISTS {view} AS
+                SELECT NULL AS id, f.period_id, t.line_item, t.xbrl_tag, f.value,
+                       'USD' AS unit{extra}
+                FROM facts f JOIN tag_dictionary t ON t.id = f.tag_id
+                WHERE t.statement_type = '{statement_type}'
+            """, f"""
+                CREATE TRIGGER IF NOT EXISTS {view}_insert
+                INSTEAD OF INSERT ON {view}
+                BEGIN
+                    INSERT INTO tag_dictionary (xbrl_tag, line_item, statement_type)
+                    SELECT NEW.xbrl_tag, NEW.line_item, '{statement_type}'
+                    WHERE NOT EXISTS (SELECT 1 FROM tag_dictionary WHERE xbrl_tag = NEW.xbrl_tag);
+                    INSERT INTO facts (period_id, tag_id, value)
+                    SELECT NEW.period_id, id, NEW.value FROM tag_dictionary WHERE xbrl_tag = NEW.xbrl_tag;
+                END
+            """, f"""
+                CREATE TRIGGER IF NOT EXISTS {view}_update
+                INSTEAD OF UPDATE OF value ON {view}
+                BEGIN
+                    UPDATE facts SET value = NEW.value
+                    WHERE period_id = OLD.period_id
+                      AND tag_id = (SELECT id FROM tag_dictionary WHERE xbrl_tag = OLD.xbrl_tag);
+                END
+            """, f"""
+                CREATE TRIGGER IF NOT EXISTS {view}_delete
+                INSTEAD OF DELETE ON {view}
+                BEGIN
+                    DELETE FROM facts
+                    WHERE period_id = OLD.period_id
+                      AND tag_id = (SELECT id FROM tag_dictionary WHERE xbrl_tag = OLD.xbrl_tag);
+                END
+            """]
+        return statements
+    
+    @classmethod
+    def is_compact(cls, conn: sqlite3.Connection) -> bool:
+        """True when the statement tables are views over the facts table"""
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'facts'"
+        ).fetchone() is not None
+    
+    @classmethod
+    def _create_compact_storage(cls, conn: sqlite3.Connection):
+        """Create the compact tables and views, seeding the tag dictionary"""
+        for statement in cls.compact_statements():
+            conn.execute(statement)
+        
+        # A tag listed under two line items keeps its first one, as in the classifier
+        conn.executemany("""
+            INSERT OR IGNORE INTO tag_dictionary (xbrl_tag, line_item, statement_type)
+            VALUES (?, ?, ?)
+        """, [
+            (tag, line_item, cls.XBRL_STATEMENT_TYPES[line_item])
+            for line_item, tags in cls.XBRL_TAG_MAPPING.items() for tag in tags
+        ])
+        conn.commit()
+    
+    @classmethod
+    def _skipped_in_compact_mode(cls, statement: str) -> bool:
+        """Indexes on the statement tables cannot be built on their compatibility views"""
+        match = re.search(r"\bCREATE INDEX IF NOT EXISTS \w+\s+ON\s+(\w+)", statement)
+        return bool(match) and match.group(1) in cls.COMPACT_VIEWS
+    
+    @classmethod
+    def create_schema(cls, conn: sqlite3.Connection, compact: bool = False):
+        """
+        Create (or upgrade) the schema on an existing connection (e.g. ':memory:')
+        
+        Args:
+            conn: Database connection
+            compact: Store statement facts in the dictionary-encoded facts
+                     table behind compatibility views (new databases only)
+        """
+        if compact and cls.get_schema_version(conn) == 0:
+            cls._create_compact_storage(conn)
+        cls.migrate(conn)
+    
+    @classmethod
+    def get_schema_version(cls, conn: sqlite3.Connection) -> int:
+        """Highest applied migration, 0 for a database that predates schema_version"""
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+        return row[0] or 0
+    
+    @classmethod
+    def migrate(cls, conn: sqlite3.Connection) -> list:
+        """
+        Apply pending MIGRATIONS in order, each in its own transaction
+        
+        Databases created before schema_version existed start at version 0;
+        version 1 only uses CREATE TABLE IF NOT EXISTS, so they are upgraded
+        in place without touching their data. In compact mode indexes on the
+        statement tables are skipped; the facts primary key serves them.
+        
+        Returns:
+            Versions applied by this call
+        """
+        conn.commit()
+        current = cls.get_schema_version(conn)
+        compact = cls.is_compact(conn)
+        conn.commit()
+        
+        applied = []
+        for version, description, statements in cls.MIGRATIONS:
+            if version <= current:
+                continue
+            
+            try:
+                conn.execute("BEGIN")
+                for statement in statements:
+                    if callable(statement):
+                        statement(conn)
+                    elif not (compact and cls._skipped_in_compact_mode(statement)):
+                        conn.execute(statement)
+                conn.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                    (version, description)
+                )
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+            applied.append(version)
+        
+        return applied
+    
+    @classmethod
+    def check_query_plans(cls, conn: sqlite3.Connection) -> dict:
+        """
+        EXPLAIN QUERY PLAN every HOT_QUERIES entry and report regressions
+        
+        A query regresses when any step scans a table or index instead of
+        searching it, or sorts through a temporary B-tree.
+        
+        Returns:
+            {query_name: [offending plan steps]} - empty when all use indexes
+        """
+        problems = {}
+        for name, (sql, params) in cls.HOT_QUERIES.items():
+            plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+            bad = [step for step in plan
+                   if step.startswith("SCAN") or "TEMP B-TREE" in step]
+            if bad:
+                problems[name] = bad
+        return problems
+    
+    @classmethod
+    def initialize_database(cls, compact: bool = False):
+        """
+        Create database and all tables, upgrading an existing one in place
+        
+        Args:
+            compact: Create a new database in compact storage mode
+        """
+        conn = get_manager(cls.DB_PATH).connection()
         
         try:
-            for table_name, create_statement in cls.CREATE_STATEMENTS.items():
-                cursor.execute(create_statement)
-                print(f"✓ Created table: {table_name}")
+            if compact and cls.get_schema_version(conn) == 0:
+                cls._create_compact_storage(conn)
+            applied = cls.migrate(conn)
+            for version, description, _ in cls.MIGRATIONS:
+                if version in applied:
+                    print(f"✓ Applied migration {version}: {description}")
             
-            conn.commit()
-            print("\n✓ Database initialized successfully")
+            cls._migrated_paths.add(cls.DB_PATH.resolve())
+            print(f"\n✓ Database initialized successfully (schema version {cls.SCHEMA_VERSION})")
         except sqlite3.Error as e:
             print(f"✗ Database initialization error: {e}")
         finally:
@@ -215,12 +750,41 @@ class FinancialDatabaseSchema:
     
     @classmethod
     def get_connection(cls):
-        """Get database connection"""
-        cls.DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-        conn = sqlite3.connect(cls.DB_PATH)
-        conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+        """
+        Get this thread's pooled read-write connection
+        
+        The connection is tuned (WAL, page cache, mmap) and reused across
+        calls; close() returns it to the pool instead of closing it.
+        """
+        if cls._memory_database is not None:
+            return cls._memory_database.connection()
+        
+        conn = get_manager(cls.DB_PATH).connection()
+        cls._ensure_migrated(conn)
         return conn
     
+    @classmethod
+    def get_read_connection(cls):
+        """Get this thread's pooled read-only connection, for valuation readers"""
+        if cls._memory_database is not None:
+            return cls._memory_database.read_connection()
+        
+        cls.get_connection()
+        return get_manager(cls.DB_PATH).read_connection()
+    
+    @classmethod
+    def set_db_path(cls, db_path):
+        """Point this process at another database file (e.g. per batch or test run)"""
+        cls.DB_PATH = Path(db_path)
+    
+    @classmethod
+    def _ensure_migrated(cls, conn: sqlite3.Connection):
+        """Upgrade a database file once per process on first connection"""
+        key = cls.DB_PATH.resolve()
+        if key not in cls._migrated_paths:
+            cls.migrate(conn)
+            cls._migrated_paths.add(key)
+    
     @classmethod
     def drop_all_tables(cls):
         """WARNING: Drop all tables (for testing/reset only)"""
@@ -228,13 +792,20 @@ class FinancialDatabaseSchema:
         cursor = conn.cursor()
         
         tables = [
-            "fcff_components", "dcf_calculations", "validation_log",
-            "shares_outstanding", "cash_flow_statement", "balance_sheet",
-            "income_statement", "financial_periods", "companies"
+            "retention_runs", "dcf_calculations_daily", "validation_log_daily",
+            "period_facts_deferred", "period_facts", "fcff_components", "dcf_projections", "dcf_calculations",
+            "validation_log",
+            "shares_outstanding", "fact_restatements", "cash_flow_statement",
+            "balance_sheet", "income_statement", "ingested_filings",
+            "facts", "tag_dictionary", "financial_periods", "companies",
+            "schema_version"
         ]
         
         for table in tables:
-            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            kind = cursor.execute(
+                "SELECT type FROM sqlite_master WHERE name = ?", (table,)
+            ).fetchone()
+            cursor.execute(f"DROP {'VIEW' if kind and kind[0] == 'view' else 'TABLE'} IF EXISTS {table}")
         
         conn.commit()
         conn.close()
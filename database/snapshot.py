@@ -0,0 +1,262 @@
+"""
+Columnar Analytical Snapshots
+Exports the database to compressed NumPy column files for offline cross-universe queries
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from valuation.fcff import fcff_from_arrays
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tables exported by default (statement tables may be compact-mode views)
+SNAPSHOT_TABLES = (
+    "companies", "financial_periods", "income_statement", "balance_sheet",
+    "cash_flow_statement", "period_facts", "dcf_calculations", "dcf_projections",
+)
+
+FETCH_SIZE = 50000
+
+
+# Declared types stored as strings even when every value is NULL
+_TEXT_TYPES = ("CHAR", "TEXT", "CLOB", "DATE", "TIME")
+
+
+def _to_column(values: List, declared_type: str = "") -> Tuple[str, Dict[str, np.ndarray]]:
+    """
+    Encode one column of SQLite values
+
+    Returns:
+        (kind, arrays): "int" (int64, no NULLs), "float" (float64, NULL as
+        NaN) or "str" (int32 codes into a value table, NULL as -1)
+    """
+    kinds = {type(value) for value in values if value is not None}
+    textual = any(name in declared_type.upper() for name in _TEXT_TYPES)
+    if kinds <= {int, float, bool} and not (textual and not kinds):
+        if kinds <= {int, bool} and kinds and None not in values:
+            return "int", {"": np.array(values, dtype=np.int64)}
+        return "float", {"": np.array([np.nan if v is None else v for v in values], dtype=np.float64)}
+
+    strings = np.array(["" if v is None else str(v) for v in values], dtype=str)
+    uniques, codes = np.unique(strings, return_inverse=True)
+    codes = codes.astype(np.int32)
+    codes[np.array([v is None for v in values], dtype=bool)] = -1
+    return "str", {"__codes": codes, "__values": uniques}
+
+
+def export_snapshot(conn: sqlite3.Connection, out_dir: Union[str, Path],
+                    tables: Iterable[str] = SNAPSHOT_TABLES,
+                    where: Optional[Dict[str, str]] = None) -> Dict:
+    """
+    Write every table to <out_dir>/<table>.npz plus manifest.json
+
+    Every table is read inside one read transaction (opened here unless
+    the caller has one), so the files form a consistent snapshot even with
+    concurrent writers. The snapshot is assembled in a sibling directory and
+    swapped in by renames: the old directory is moved aside, the new one
+    moved in, and only then the old one is deleted. out_dir never holds a
+    half-written snapshot; between the two renames it is briefly absent.
+
+    Args:
+        conn: Database connection
+        out_dir: Snapshot directory (replaced if it exists)
+        tables: Tables to export
+        where: Optional SQL condition per table, e.g. for archival exports
+
+    Returns:
+        The manifest
+    """
+    out_dir = Path(out_dir)
+    staging = out_dir.with_name(out_dir.name + ".tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    owned = not conn.in_transaction
+    if owned:
+        conn.execute("BEGIN")
+    try:
+        existing = {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'view')"
+        )}
+        version = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] \
+            if "schema_version" in existing else 0
+
+        manifest = {
+            "created_at": datetime.now().isoformat(),
+            "schema_version": version,
+            "tables": {},
+        }
+
+        start = time.perf_counter()
+        for table in tables:
+            if table not in existing:
+                continue
+
+            declared = {row[1]: row[2] or "" for row in conn.execute(f"PRAGMA table_info({table})")}
+            condition = (where or {}).get(table)
+            cursor = conn.execute(f"SELECT * FROM {table}" + (f" WHERE {condition}" if condition else ""))
+            names = [d[0] for d in cursor.description]
+            columns: List[List] = [[] for _ in names]
+            while True:
+                rows = cursor.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                for column, values in zip(columns, zip(*rows)):
+                    column.extend(values)
+
+            arrays, kinds = {}, {}
+            for name, values in zip(names, columns):
+                kinds[name], encoded = _to_column(values, declared.get(name, ""))
+                for suffix, array in encoded.items():
+                    arrays[name + suffix] = array
+
+            path = staging / f"{table}.npz"
+            np.savez_compressed(path, **arrays)
+            manifest["tables"][table] = {
+                "file": path.name,
+                "rows": len(columns[0]) if columns else 0,
+                "columns": kinds,
+                "where": condition,
+                "sha256": hashlib.sha256(path.read_bytes()).hexdigest(),
+            }
+    finally:
+        if owned:
+            conn.commit()
+
+    (staging / "manifest.json").write_text(json.dumps(manifest, indent=2))
+
+    previous = out_dir.with_name(out_dir.name + ".old")
+    shutil.rmtree(previous, ignore_errors=True)
+    if out_dir.exists():
+        out_dir.rename(previous)
+    staging.rename(out_dir)
+    shutil.rmtree(previous, ignore_errors=True)
+
+    logger.info(f"✓ Snapshot of {len(manifest['tables'])} tables written to {out_dir} "
+                f"in {time.perf_counter() - start:.1f}s")
+    return manifest
+
+
+class Snapshot:
+    """
+    Read API over an exported snapshot; never opens the SQLite database
+
+    Columns load lazily per table and are cached. String columns decode to
+    object arrays with None for NULL.
+    """
+
+    def __init__(self, snapshot_dir: Union[str, Path]):
+        self.snapshot_dir = Path(snapshot_dir)
+        self.manifest = json.loads((self.snapshot_dir / "manifest.json").read_text())
+        self._tables: Dict[str, Dict[str, np.ndarray]] = {}
+
+    @property
+    def tables(self) -> List[str]:
+        return list(self.manifest["tables"])
+
+    def table(self, name: str) -> Dict[str, np.ndarray]:
+        """All columns of a table as {column: array}"""
+        if name not in self._tables:
+            info = self.manifest["tables"][name]
+            columns = {}
+            with np.load(self.snapshot_dir / info["file"], allow_pickle=False) as data:
+                for column, kind in info["columns"].items():
+                    if kind == "str":
+                        codes = data[column + "__codes"]
+                        values = data[column + "__values"].astype(object)
+                        decoded = values[np.maximum(codes, 0)] if len(values) else \
+                            np.full(len(codes), None, dtype=object)
+                        decoded[codes < 0] = None
+                        columns[column] = decoded
+                    else:
+                        columns[column] = data[column]
+            self._tables[name] = columns
+        return self._tables[name]
+
+    def column(self, table: str, column: str) -> np.ndarray:
+        return self.table(table)[column]
+
+    @staticmethod
+    def group_stats(keys: np.ndarray, values: np.ndarray) -> Dict:
+        """
+        Per-key count, mean and quartiles of values (NaN values dropped)
+
+        Returns:
+            {key: {"count", "mean", "p25", "median", "p75"}}
+        """
+        keep = ~np.isnan(values)
+        keys, values = keys[keep], values[keep]
+        if not len(keys):
+            return {}
+
+        order = np.lexsort((values, keys))
+        keys, values = keys[order], values[order]
+        boundaries = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+
+        stats = {}
+        for group_keys, group in zip(np.split(keys, boundaries), np.split(values, boundaries)):
+            p25, median, p75 = np.percentile(group, [25, 50, 75])
+            key = group_keys[0]
+            stats[key.item() if isinstance(key, np.generic) else key] = {
+                "count": len(group), "mean": float(group.mean()),
+                "p25": float(p25), "median": float(median), "p75": float(p75),
+            }
+        return stats
+
+    def fcff_margin_by_sector(self, fiscal_year: Optional[int] = None) -> Dict:
+        """
+        Distribution of FCFF / revenue by company sector
+
+        FCFF follows FCFFCalculator.calculate_fcff. Periods without positive
+        revenue are skipped; companies without a sector group as "Unknown".
+
+        Args:
+            fiscal_year: Restrict to one fiscal year (default all years)
+
+        Returns:
+            {sector: {"count", "mean", "p25", "median", "p75"}}
+        """
+        facts = self.table("period_facts")
+        companies = self.table("companies")
+
+        fcff = fcff_from_arrays(facts)["fcff"]
+        revenue = np.nan_to_num(facts["revenue"].astype(float))
+        keep = revenue > 0
+        if fiscal_year is not None:
+            keep &= facts["fiscal_year"] == fiscal_year
+
+        sector_by_id = dict(zip(companies["id"].tolist(), companies["sector"].tolist()))
+        sectors = np.array(
+            [sector_by_id.get(cid) or "Unknown" for cid in facts["company_id"][keep].tolist()],
+            dtype=object
+        )
+        margin = fcff[keep] / revenue[keep]
+        return self.group_stats(sectors.astype(str), margin)
+
+
+if __name__ == "__main__":
+    from database.schema import FinancialDatabaseSchema
+
+    parser = argparse.ArgumentParser(description="Export a columnar snapshot of the database")
+    parser.add_argument("--out", default="data/snapshot")
+    args = parser.parse_args()
+
+    conn = FinancialDatabaseSchema.get_read_connection()
+    export_snapshot(conn, args.out)
+    conn.close()
+
+    for sector, stats in Snapshot(args.out).fcff_margin_by_sector().items():
+        print(f"{sector:30s} n={stats['count']:6d}  median FCFF margin {stats['median'] * 100:6.1f}%")
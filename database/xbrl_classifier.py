@@ -0,0 +1,82 @@
+"""
+Compiled XBRL Tag Classifier
+Resolves XBRL tags and their synonyms to standardized line items in O(1)
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from database.schema import FinancialDatabaseSchema
+
+
+class XBRLTagClassifier:
+    """
+    Immutable lookup tables compiled from FinancialDatabaseSchema.XBRL_TAG_MAPPING
+
+    Every synonym maps to (statement_type, standardized_line_item). The
+    first tag listed for a line item is its canonical tag - the one the
+    valuation and validation code reads - and later synonyms rank behind it.
+    Unknown tags classify as ("OTHER", tag).
+    """
+
+    __slots__ = ("_classification", "_canonical", "_rank", "_tags_by_line_item")
+
+    def __init__(self, tag_mapping: Mapping[str, List[str]],
+                 statement_types: Mapping[str, str]):
+        classification: Dict[str, Tuple[str, str]] = {}
+        canonical: Dict[str, str] = {}
+        rank: Dict[str, int] = {}
+        tags_by_line_item: Dict[str, Tuple[str, ...]] = {}
+
+        for line_item, tags in tag_mapping.items():
+            statement_type = statement_types[line_item]
+            tags_by_line_item[line_item] = tuple(tags)
+            for position, tag in enumerate(tags):
+                # A tag listed under two line items keeps its first one
+                if tag in classification:
+                    continue
+                classification[tag] = (statement_type, line_item)
+                canonical[tag] = tags[0]
+                rank[tag] = position
+
+        self._classification = MappingProxyType(classification)
+        self._canonical = MappingProxyType(canonical)
+        self._rank = MappingProxyType(rank)
+        self._tags_by_line_item = MappingProxyType(tags_by_line_item)
+
+    def classify(self, xbrl_tag: str) -> Tuple[str, str]:
+        """(statement_type, standardized_line_item); ("OTHER", tag) if unmapped"""
+        return self._classification.get(xbrl_tag) or ("OTHER", xbrl_tag)
+
+    def line_item(self, xbrl_tag: str) -> Optional[str]:
+        """Standardized line item of a tag, or None if unmapped"""
+        classification = self._classification.get(xbrl_tag)
+        return classification[1] if classification else None
+
+    def canonical_tag(self, xbrl_tag: str) -> str:
+        """Primary tag of the tag's line item (the tag itself if unmapped)"""
+        return self._canonical.get(xbrl_tag, xbrl_tag)
+
+    def rank(self, xbrl_tag: str) -> int:
+        """Synonym preference: 0 for the canonical tag, higher for later synonyms"""
+        return self._rank.get(xbrl_tag, len(self._rank))
+
+    def tags_for(self, line_item: str) -> Tuple[str, ...]:
+        """All tags of a standardized line item, canonical first"""
+        return self._tags_by_line_item.get(line_item, ())
+
+    @property
+    def tags(self) -> Mapping[str, Tuple[str, str]]:
+        """Read-only view of the full tag table"""
+        return self._classification
+
+
+@lru_cache(maxsize=None)
+def get_tag_classifier() -> XBRLTagClassifier:
+    """Process-wide classifier, compiled on first use"""
+    return XBRLTagClassifier(
+        FinancialDatabaseSchema.XBRL_TAG_MAPPING,
+        FinancialDatabaseSchema.XBRL_STATEMENT_TYPES
+    )
@@ -0,0 +1,203 @@
+"""
+Bulk Ingestion from the SEC companyfacts.zip Archive
+Streams archive members, parses them in a process pool and writes in batches
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+from extraction.sec_extractor import SECEDGARExtractor, extract_10k_periods
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MEMBER_PATTERN = re.compile(r"CIK(\d{10})\.json$")
+
+
+def parse_companyfacts_member(name: str, raw: bytes) -> Optional[Dict]:
+    """
+    Parse one archive member into company info plus 10-K periods
+
+    Module-level so it can be shipped to worker processes. Any error in a
+    member (bad JSON, bad encoding, an unexpected layout) skips that member
+    only.
+
+    Returns:
+        {"cik", "company_name", "periods"} or None if the member is unusable
+    """
+    try:
+        facts_json = json.loads(raw)
+        match = MEMBER_PATTERN.search(name)
+        cik = match.group(1) if match else str(facts_json.get("cik", "")).zfill(10)
+
+        return {
+            "cik": cik,
+            "company_name": facts_json.get("entityName", "Unknown"),
+            "periods": extract_10k_periods(facts_json)
+        }
+    except Exception as e:
+        logger.error(f"Skipping malformed member {name}: {e.__class__.__name__}: {e}")
+        return None
+
+
+class CompanyFactsZipLoader:
+    """
+    Loads the whole SEC bulk archive (companyfacts.zip) into the database
+
+    Members are read straight out of the zip into memory - nothing is
+    extracted to disk. Parsing runs in a process pool with a bounded number
+    of members in flight; every parsed company is written by a single
+    SECEDGARExtractor in this process, committing once per batch of
+    batch_size companies.
+    """
+
+    def __init__(self, db_connection: sqlite3.Connection,
+                 zip_path: str,
+                 tickers: Optional[Dict[str, str]] = None,
+                 max_workers: Optional[int] = None,
+                 batch_size: int = 100):
+        """
+        Args:
+            db_connection: Target database
+            zip_path: Locally downloaded companyfacts.zip
+            tickers: Optional {10-digit CIK: ticker}; companies without a
+                     ticker are stored as 'CIK##########'
+            max_workers: Parser processes (None = CPU count, 0 = parse inline)
+            batch_size: Companies written per commit
+        """
+        self.db = db_connection
+        self.zip_path = Path(zip_path)
+        self.tickers = tickers or {}
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.extractor = SECEDGARExtractor(db_connection, commit_interval=batch_size)
+
+        # Members that could not be parsed, by the last iter_parsed() run
+        self.skipped = 0
+
+    def iter_members(self, limit: Optional[int] = None) -> Iterator[Tuple[str, bytes]]:
+        """Yield (member name, raw JSON bytes) for each company in the archive"""
+        with zipfile.ZipFile(self.zip_path) as archive:
+            count = 0
+            for info in archive.infolist():
+                if info.is_dir() or not info.filename.endswith(".json"):
+                    continue
+                if limit is not None and count >= limit:
+                    break
+
+                yield info.filename, archive.read(info)
+                count += 1
+
+    def _result(self, name: str, future) -> Optional[Dict]:
+        """A worker's parse of one member; None (and counted as skipped) if it failed"""
+        try:
+            parsed = future.result()
+        except BrokenExecutor:
+            raise  # the pool is gone, not just this member
+        except Exception as e:
+            logger.error(f"Skipping member {name}: {e.__class__.__name__}: {e}")
+            parsed = None
+        if parsed is None:
+            self.skipped += 1
+        return parsed
+
+    def iter_parsed(self, limit: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Parse members, in the pool unless max_workers == 0, preserving archive order
+
+        Unusable members are logged and counted in self.skipped.
+        """
+        members = self.iter_members(limit)
+        self.skipped = 0
+
+        if self.max_workers == 0:
+            for name, raw in members:
+                parsed = parse_companyfacts_member(name, raw)
+                if parsed:
+                    yield parsed
+                else:
+                    self.skipped += 1
+            return
+
+        workers = self.max_workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Bound the number of raw payloads held in memory at once
+            window = workers * 4
+            in_flight = deque()
+
+            for name, raw in members:
+                in_flight.append((name, pool.submit(parse_companyfacts_member, name, raw)))
+                if len(in_flight) >= window:
+                    parsed = self._result(*in_flight.popleft())
+                    if parsed:
+                        yield parsed
+
+            while in_flight:
+                parsed = self._result(*in_flight.popleft())
+                if parsed:
+                    yield parsed
+
+    def load(self, limit: Optional[int] = None) -> Dict:
+        """
+        Run the bulk load
+
+        Args:
+            limit: Stop after this many archive members (for trial runs)
+
+        Returns:
+            Statistics: companies, periods, facts (statement rows stored;
+            unclassified tags and skipped periods do not count), skipped
+            (unparseable members), seconds, facts_per_sec
+        """
+        stats = {"companies": 0, "periods": 0, "facts": 0}
+        start = time.perf_counter()
+        facts_before = self.extractor.facts_written
+
+        for parsed in self.iter_parsed(limit):
+            cik = parsed["cik"]
+            ticker = self.tickers.get(cik, f"CIK{cik}")
+
+            written = self.extractor.load_company_periods(
+                ticker, cik, parsed["company_name"], parsed["periods"]
+            )
+            if written is None:
+                continue
+
+            stats["companies"] += 1
+            stats["periods"] += written
+
+        self.extractor.flush()
+        stats["facts"] = self.extractor.facts_written - facts_before
+        stats["skipped"] = self.skipped
+
+        elapsed = time.perf_counter() - start
+        stats["seconds"] = elapsed
+        stats["facts_per_sec"] = stats["facts"] / elapsed if elapsed > 0 else 0.0
+
+        logger.info(f"✓ Bulk load: {stats['companies']} companies, "
+                    f"{stats['periods']} periods, {stats['facts']:,} facts, "
+                    f"{stats['skipped']} members skipped in {elapsed:.1f}s ({stats['facts_per_sec']:,.0f} facts/sec)")
+        return stats
+
+
+if __name__ == "__main__":
+    import sys
+    from database.schema import FinancialDatabaseSchema
+
+    FinancialDatabaseSchema.initialize_database()
+    conn = FinancialDatabaseSchema.get_connection()
+
+    loader = CompanyFactsZipLoader(conn, sys.argv[1] if len(sys.argv) > 1 else "data/companyfacts.zip")
+    loader.load()
+
+    conn.close()
@@ -0,0 +1,204 @@
+"""
+On-Disk HTTP Cache for SEC EDGAR Company Facts
+Stores gzip-compressed payloads per CIK with ETag/Last-Modified validators
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class CompanyFactsCache:
+    """
+    Persistent response cache keyed by CIK
+
+    Each CIK is stored as two files:
+        CIK##########.json.gz    compressed response body
+        CIK##########.meta.json  validators, fetch timestamp and body size
+
+    Both are written to a temporary file and renamed into place, so a crash
+    never leaves a partial file. The body is replaced first; metadata whose
+    recorded size does not match the body (a crash between the two renames)
+    is treated as a miss.
+
+    Entries younger than ttl_seconds are served without touching the
+    network. Older entries are revalidated with If-None-Match /
+    If-Modified-Since, so an unchanged payload costs a 304 instead of a
+    multi-MB download. When the cache grows past max_bytes the least
+    recently used entries are evicted. In offline mode every cached entry is
+    served regardless of age and misses never reach the network.
+    """
+
+    def __init__(self, cache_dir: str = "data/http_cache",
+                 ttl_seconds: float = 24 * 3600,
+                 max_bytes: int = 2 * 1024 ** 3,
+                 offline: bool = False):
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._evict_lock = threading.Lock()
+
+    def _body_path(self, cik: str) -> Path:
+        return self.cache_dir / f"CIK{str(cik).zfill(10)}.json.gz"
+
+    def _meta_path(self, cik: str) -> Path:
+        return self.cache_dir / f"CIK{str(cik).zfill(10)}.meta.json"
+
+    def lookup(self, cik: str) -> Optional[Dict]:
+        """Return cache metadata for a CIK, or None if not cached"""
+        meta_path = self._meta_path(cik)
+        if not meta_path.exists() or not self._body_path(cik).exists():
+            return None
+
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            body_bytes = self._body_path(cik).stat().st_size
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable cache metadata for CIK {cik}: {e}")
+            return None
+
+        if meta.get("body_bytes", body_bytes) != body_bytes:
+            logger.warning(f"Cache metadata for CIK {cik} does not match its body; refetching")
+            return None
+        return meta
+
+    def is_fresh(self, meta: Dict) -> bool:
+        """True if the entry is within its TTL"""
+        return time.time() - meta.get("fetched_at", 0) < self.ttl_seconds
+
+    def conditional_headers(self, meta: Optional[Dict]) -> Dict[str, str]:
+        """Build revalidation headers from stored validators"""
+        if not meta:
+            return {}
+
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def load(self, cik: str) -> Optional[Dict]:
+        """Decompress and decode a cached payload"""
+        body_path = self._body_path(cik)
+        try:
+            with gzip.open(body_path, "rb") as f:
+                payload = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding corrupt cache entry for CIK {cik}: {e}")
+            self.remove(cik)
+            return None
+
+        # mtime doubles as last-access time for LRU eviction
+        os.utime(body_path, None)
+        return payload
+
+    def open(self, cik: str) -> Optional[BinaryIO]:
+        """Open a cached payload as a decompressing binary stream"""
+        body_path = self._body_path(cik)
+        try:
+            stream = gzip.open(body_path, "rb")
+        except OSError as e:
+            logger.warning(f"Cannot open cache entry for CIK {cik}: {e}")
+            return None
+
+        os.utime(body_path, None)
+        return stream
+
+    def store(self, cik: str, body: bytes, headers: Dict[str, str]):
+        """Write a fresh response body and its validators"""
+        self.store_stream(cik, [body], headers)
+
+    def store_stream(self, cik: str, chunks: Iterable[bytes], headers: Dict[str, str]):
+        """Write a response body chunk by chunk, never holding it whole"""
+        body_path = self._body_path(cik)
+        tmp_path = body_path.with_suffix(f".{threading.get_ident()}.tmp")
+
+        try:
+            with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp_path, body_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+        self._write_meta(cik, headers)
+        self.evict()
+
+    def mark_revalidated(self, cik: str, headers: Dict[str, str]):
+        """Record a 304 Not Modified: restart the TTL, keep the body"""
+        meta = self.lookup(cik) or {}
+        self._write_meta(cik, {
+            "ETag": headers.get("ETag") or meta.get("etag"),
+            "Last-Modified": headers.get("Last-Modified") or meta.get("last_modified"),
+        })
+
+    def _write_meta(self, cik: str, headers: Dict[str, str]):
+        meta = {
+            "cik": str(cik).zfill(10),
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+            "body_bytes": self._body_path(cik).stat().st_size,
+        }
+        meta_path = self._meta_path(cik)
+        tmp_path = meta_path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, meta_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+    def remove(self, cik: str):
+        """Delete a cached entry"""
+        for path in (self._body_path(cik), self._meta_path(cik)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def evict(self) -> int:
+        """
+        Evict least recently used entries until the cache fits in max_bytes
+
+        Returns:
+            Number of entries removed
+        """
+        with self._evict_lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith(".json.gz"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.name))
+                    total += stat.st_size
+
+            removed = 0
+            for _mtime, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self.remove(name[len("CIK"):-len(".json.gz")])
+                total -= size
+                removed += 1
+
+        if removed:
+            logger.info(f"Evicted {removed} cached company facts payloads")
+        return removed
@@ -0,0 +1,57 @@
+"""
+Request Rate Limiting and Retry Backoff for SEC EDGAR
+SEC fair-access policy allows at most 10 requests per second per client
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket
+
+    Tokens refill continuously at `rate` per second up to `capacity`;
+    acquire() blocks until a token is available. With capacity 1 requests
+    are spaced evenly; a larger capacity allows short bursts while keeping
+    the long-run average at `rate`.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError("Rate must be > 0")
+
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        """Block until `tokens` are available, then consume them"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity,
+                                   self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+
+                wait = (tokens - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+    """
+    Exponential backoff with full jitter
+
+    Returns a random delay in [0, min(cap, base * 2**attempt)] so that
+    concurrent workers retrying the same outage do not hit SEC in lockstep.
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
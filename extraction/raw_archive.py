@@ -0,0 +1,233 @@
+"""
+Raw Facts Archive - Columnar Storage of Normalized SEC Facts
+Persists extracted facts as compressed NumPy .npz files so the database can
+be re-derived after classification or FCFF changes without refetching SEC
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from extraction.sec_extractor import SECEDGARExtractor, extract_10k_periods_from_entries
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Dictionary-encoded string columns: stored as int32 codes plus a value table
+STRING_COLUMNS = ("cik", "taxonomy", "tag", "unit", "end", "form", "filed", "accession")
+
+
+class FactColumns:
+    """
+    Column accumulator for (taxonomy, xbrl_tag, unit, entry) records
+
+    Appending keeps only primitive values, never the entry dicts, so a
+    company can be collected while it streams through the extractor.
+    """
+
+    def __init__(self):
+        self.columns: Dict[str, list] = {name: [] for name in STRING_COLUMNS}
+        self.columns["fy"] = []
+        self.columns["value"] = []
+        self.companies: Dict[str, Tuple[str, str]] = {}
+
+    def add_company(self, cik: str, ticker: str, company_name: str):
+        self.companies[str(cik).zfill(10)] = (ticker, company_name)
+
+    def append(self, cik: str, taxonomy: str, xbrl_tag: str, unit: Optional[str], entry: Dict):
+        columns = self.columns
+        columns["cik"].append(str(cik).zfill(10))
+        columns["taxonomy"].append(taxonomy)
+        columns["tag"].append(xbrl_tag)
+        columns["unit"].append(unit or "USD")
+        columns["end"].append(entry.get("end", ""))
+        columns["form"].append(entry.get("form", ""))
+        columns["filed"].append(entry.get("filed", ""))
+        columns["accession"].append(entry.get("accession") or entry.get("accn", ""))
+        columns["fy"].append(entry.get("fy") or 0)
+        columns["value"].append(entry.get("val", 0))
+
+    def collect(self, cik: str, records: Iterable[Tuple]) -> Iterator[Tuple]:
+        """Pass records through unchanged while appending them"""
+        for record in records:
+            self.append(cik, *record)
+            yield record
+
+    def __len__(self) -> int:
+        return len(self.columns["value"])
+
+
+class RawFactsArchive:
+    """
+    Directory of compressed .npz archives, one per company or per batch
+
+    Each file holds the normalized facts (cik, taxonomy, tag, unit, end, fy,
+    form, filed, accession, value) as columns, with string columns
+    dictionary-encoded, plus a small company table (cik, ticker, name).
+    Archives written from a streamed payload hold only 10-K/10-Q entries.
+    """
+
+    # Taxonomies archived from each payload (dei carries shares outstanding)
+    TAXONOMIES = ("us-gaap", "dei")
+
+    def __init__(self, archive_dir: str = "data/raw_facts"):
+        self.archive_dir = Path(archive_dir)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+
+    def write(self, name: str, facts: FactColumns) -> Path:
+        """Write collected columns to <archive_dir>/<name>.npz"""
+        arrays = {}
+        for column in STRING_COLUMNS:
+            values, codes = np.unique(np.array(facts.columns[column], dtype=str),
+                                      return_inverse=True)
+            arrays[f"{column}_values"] = values
+            arrays[f"{column}_codes"] = codes.astype(np.int32)
+
+        arrays["fy"] = np.array(facts.columns["fy"], dtype=np.int32)
+        arrays["value"] = np.array(facts.columns["value"], dtype=np.float64)
+
+        ciks = sorted(facts.companies)
+        arrays["company_cik"] = np.array(ciks, dtype=str)
+        arrays["company_ticker"] = np.array([facts.companies[c][0] for c in ciks], dtype=str)
+        arrays["company_name"] = np.array([facts.companies[c][1] for c in ciks], dtype=str)
+
+        path = self.archive_dir / f"{name}.npz"
+        tmp_path = self.archive_dir / f"{name}.tmp.npz"
+        np.savez_compressed(tmp_path, **arrays)
+        tmp_path.replace(path)
+        return path
+
+    def write_company(self, cik: str, facts: FactColumns) -> Path:
+        """Write one company's archive as CIK##########.npz"""
+        return self.write(f"CIK{str(cik).zfill(10)}", facts)
+
+    @staticmethod
+    def load(path: Path) -> Dict[str, np.ndarray]:
+        """Load an archive as decoded columns plus company_* arrays"""
+        with np.load(path, allow_pickle=False) as data:
+            columns = {
+                column: data[f"{column}_values"][data[f"{column}_codes"]]
+                for column in STRING_COLUMNS
+            }
+            for key in ("fy", "value", "company_cik", "company_ticker", "company_name"):
+                columns[key] = data[key]
+        return columns
+
+    def paths(self) -> List[Path]:
+        return sorted(p for p in self.archive_dir.glob("*.npz") if not p.name.endswith(".tmp.npz"))
+
+    def iter_companies(self, path: Path, forms: Optional[Iterable[str]] = None,
+                       taxonomies: Optional[Iterable[str]] = None,
+                       tags: Optional[Iterable[str]] = None
+                       ) -> Iterator[Tuple[str, str, str, List[Tuple]]]:
+        """
+        Yield (cik, ticker, company_name, records) for each company in a file
+
+        Records are rebuilt in the (taxonomy, xbrl_tag, unit, entry) shape
+        the extractor consumes.
+
+        Args:
+            path: Archive file
+            forms: Keep only these forms (None keeps every row)
+            taxonomies: Keep only these taxonomies (None keeps every row)
+            tags: Keep only these XBRL tags (None keeps every row)
+        """
+        columns = self.load(path)
+        ciks = columns["cik"]
+        keep = np.ones(len(ciks), dtype=bool)
+        if forms is not None:
+            keep &= np.isin(columns["form"], list(forms))
+        if taxonomies is not None:
+            keep &= np.isin(columns["taxonomy"], list(taxonomies))
+        if tags is not None:
+            keep &= np.isin(columns["tag"], list(tags))
+        order = np.flatnonzero(keep)
+        order = order[np.argsort(ciks[order], kind="stable")]
+        boundaries = np.flatnonzero(ciks[order][1:] != ciks[order][:-1]) + 1
+
+        names = dict(zip(columns["company_cik"],
+                         zip(columns["company_ticker"], columns["company_name"])))
+
+        for rows in np.split(order, boundaries):
+            if len(rows) == 0:
+                continue
+            cik = str(ciks[rows[0]])
+            ticker, company_name = names.get(cik, (f"CIK{cik}", "Unknown"))
+
+            records = [
+                (taxonomy, tag, unit, {
+                    "end": end, "val": value, "accn": accession,
+                    "fy": int(fy), "form": form, "filed": filed
+                })
+                for taxonomy, tag, unit, end, form, filed, accession, fy, value in zip(
+                    columns["taxonomy"][rows].tolist(), columns["tag"][rows].tolist(),
+                    columns["unit"][rows].tolist(), columns["end"][rows].tolist(),
+                    columns["form"][rows].tolist(), columns["filed"][rows].tolist(),
+                    columns["accession"][rows].tolist(), columns["fy"][rows].tolist(),
+                    columns["value"][rows].tolist()
+                )
+            ]
+            yield cik, str(ticker), str(company_name), records
+
+    def rebuild_database(self, db_connection: sqlite3.Connection,
+                         paths: Optional[Iterable[Path]] = None,
+                         commit_interval: int = 100) -> Dict:
+        """
+        Re-derive the statement tables from archived facts
+
+        Runs current extraction and classification logic over the archive
+        with incremental mode off, so every archived period is rewritten.
+        Each company's existing statement rows are deleted first, so facts
+        whose tags are no longer mapped (or moved to another statement) do
+        not survive the rebuild. Only us-gaap 10-K rows of mapped tags are
+        decoded - the only rows the extractor stores.
+
+        Returns:
+            Statistics: companies, periods, archived_facts (rows decoded from
+            the archive), facts (statement rows stored), seconds
+        """
+        extractor = SECEDGARExtractor(db_connection, commit_interval=commit_interval,
+                                      incremental=False)
+        stats = {"companies": 0, "periods": 0, "archived_facts": 0}
+        start = time.perf_counter()
+        facts_before = extractor.facts_written
+
+        for path in (paths or self.paths()):
+            for cik, ticker, company_name, records in self.iter_companies(
+                    path, forms=("10-K",), taxonomies=("us-gaap",),
+                    tags=extractor.classifier.tags):
+                periods = extract_10k_periods_from_entries(records)
+                company_id = extractor.get_company_id(ticker)
+                if company_id is not None:
+                    extractor.clear_company_facts(company_id)
+                written = extractor.load_company_periods(ticker, cik, company_name, periods)
+                if written is None:
+                    continue
+                stats["companies"] += 1
+                stats["periods"] += written
+                stats["archived_facts"] += len(records)
+
+        extractor.flush()
+        stats["facts"] = extractor.facts_written - facts_before
+        stats["seconds"] = time.perf_counter() - start
+
+        logger.info(f"✓ Rebuilt {stats['companies']} companies, {stats['periods']} periods, "
+                    f"{stats['facts']:,} facts from {stats['archived_facts']:,} archived rows "
+                    f"in {stats['seconds']:.1f}s")
+        return stats
+
+
+if __name__ == "__main__":
+    from database.schema import FinancialDatabaseSchema
+
+    FinancialDatabaseSchema.initialize_database()
+    conn = FinancialDatabaseSchema.get_connection()
+
+    RawFactsArchive().rebuild_database(conn)
+
+    conn.close()
@@ -6,16 +6,204 @@ Prof. V. Ravichandran - The Mountain Path - World of Finance
 
 import requests
 import json
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional
+from typing import BinaryIO, Dict, List, Set, Tuple, Optional, Iterator, Iterable
 import sqlite3
 import logging
 from pathlib import Path
 
+from requests.adapters import HTTPAdapter
+
+from database.period_facts import deferred_refresh, refresh_period_facts
+from database.schema import FinancialDatabaseSchema
+from database.xbrl_classifier import get_tag_classifier
+from extraction.http_cache import CompanyFactsCache
+from extraction.rate_limit import TokenBucket, backoff_delay
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _iter_tag_entries(tag_data) -> Iterator[Tuple[Optional[str], Dict]]:
+    """
+    Yield (unit, entry) pairs for a single XBRL tag
+    
+    Accepts both the flat list layout documented in
+    get_financial_facts_for_period and the SEC layout where entries are
+    grouped under {"units": {"USD": [...]}}. Flat lists carry no unit.
+    """
+    if isinstance(tag_data, list):
+        for entry in tag_data:
+            yield None, entry
+    elif isinstance(tag_data, dict):
+        for unit, entries in tag_data.get("units", {}).items():
+            if not isinstance(entries, list):
+                continue
+            for entry in entries:
+                yield unit, entry
+
+
+def iter_fact_entries(facts_json: Dict,
+                      taxonomies: Iterable[str] = ("us-gaap",)) -> Iterator[Tuple[str, str, Optional[str], Dict]]:
+    """Yield (taxonomy, xbrl_tag, unit, entry) for every entry of a decoded payload"""
+    facts_structure = facts_json.get("facts", {})
+    for taxonomy in taxonomies:
+        for xbrl_tag, tag_data in facts_structure.get(taxonomy, {}).items():
+            for unit, entry in _iter_tag_entries(tag_data):
+                yield taxonomy, xbrl_tag, unit, entry
+
+
+def _fact_from_entry(entry: Dict) -> Dict:
+    """Normalise a raw entry into the fact record stored per tag"""
+    return {
+        "value": entry.get("val", 0),
+        "accession": entry.get("accession") or entry.get("accn", ""),
+        "filed": entry.get("filed", ""),
+        "fy": entry.get("fy", 0)
+    }
+
+
+def _filing_order(fact: Dict) -> Tuple[str, str]:
+    """Sort key for competing facts: filing date, then accession for ties"""
+    return fact["filed"], fact["accession"]
+
+
+def build_facts_index(facts_json: Dict) -> Dict[Tuple[str, str], Dict[str, Dict]]:
+    """
+    Build a lookup of us-gaap facts keyed by (form, period end) and XBRL tag
+    
+    The Company Facts JSON is walked exactly once. When several filings
+    report the same tag for the same form and period end (prior-year
+    comparatives), the latest filed one is kept. SEC payloads name the
+    accession number "accn"; both spellings are accepted.
+    
+    Returns:
+        {(form, period_end): {xbrl_tag: {"value", "accession", "filed", "fy"}}}
+    """
+    index: Dict[Tuple[str, str], Dict[str, Dict]] = {}
+    for _taxonomy, xbrl_tag, _unit, entry in iter_fact_entries(facts_json):
+        period_facts = index.setdefault((entry.get("form", ""), entry.get("end", "")), {})
+        fact = _fact_from_entry(entry)
+        current = period_facts.get(xbrl_tag)
+        if current is None or _filing_order(fact) > _filing_order(current):
+            period_facts[xbrl_tag] = fact
+    
+    return index
+
+
+def _period_fiscal_year(end: str, original: Dict, filing_end: str) -> int:
+    """
+    Fiscal year of a period from the filing that first reported it
+    
+    SEC's "fy" is the fiscal year of the filing, so a comparative period
+    reported in a later 10-K is shifted back by the gap between the filing's
+    own period end and this one.
+    """
+    try:
+        return original["fy"] - (int(filing_end[:4]) - int(end[:4]))
+    except ValueError:
+        return original["fy"]
+
+
+def extract_10k_periods_from_entries(entries: Iterable[Tuple[str, str, Optional[str], Dict]]) -> List[Dict]:
+    """
+    Extract every annual period and its canonical facts from fact entries
+    
+    Consumes (taxonomy, xbrl_tag, unit, entry) records - from
+    iter_fact_entries(), the streaming parser or a raw facts archive - in a
+    single pass. Only us-gaap records are used.
+    Periods are discovered from the 10-K entries of NetIncomeLoss and
+    deduplicated, so each period end appears once however many 10-Ks
+    repeat it as a comparative.
+    
+    Canonical selection:
+        - Each tag's value is taken from the latest filed 10-K (ties broken
+          by accession number), so restated comparatives win
+        - Earlier filings that reported a different value are returned as
+          restatements
+        - The period's fiscal year and accession come from the filing that
+          first reported it; accession is None when that filing's own
+          period is a later one (comparatives in a company's first XBRL 10-K)
+    
+    Returns:
+        [{"period_end", "fiscal_year", "accession", "facts", "restatements"}, ...]
+        sorted by period end
+    """
+    candidates: Dict[str, Dict[str, List[Dict]]] = {}
+    net_income_facts: Dict[str, List[Dict]] = {}
+    filing_end: Dict[str, str] = {}
+    
+    for taxonomy, xbrl_tag, _unit, entry in entries:
+        period_end = entry.get("end", "")
+        if taxonomy != "us-gaap" or entry.get("form") != "10-K" or not period_end:
+            continue
+        
+        fact = _fact_from_entry(entry)
+        candidates.setdefault(period_end, {}).setdefault(xbrl_tag, []).append(fact)
+        
+        # Use a known tag to extract all available 10-K periods
+        if xbrl_tag == "NetIncomeLoss" and fact["fy"]:
+            net_income_facts.setdefault(period_end, []).append(fact)
+            # A filing's own period is the latest one it reports
+            accession = fact["accession"]
+            filing_end[accession] = max(filing_end.get(accession, period_end), period_end)
+    
+    periods = []
+    for period_end in sorted(net_income_facts):
+        original = min(net_income_facts[period_end], key=_filing_order)
+        own_end = filing_end.get(original["accession"], period_end)
+        
+        facts = {}
+        restatements = []
+        for xbrl_tag, tag_facts in candidates[period_end].items():
+            canonical = max(tag_facts, key=_filing_order)
+            facts[xbrl_tag] = canonical
+            
+            superseded = set()
+            for fact in tag_facts:
+                if fact["value"] != canonical["value"] and fact["accession"] not in superseded:
+                    superseded.add(fact["accession"])
+                    restatements.append({"xbrl_tag": xbrl_tag, **fact})
+        
+        periods.append({
+            "period_end": period_end,
+            "fiscal_year": _period_fiscal_year(period_end, original, own_end),
+            "accession": original["accession"] if own_end == period_end else None,
+            "facts": facts,
+            "restatements": restatements
+        })
+    
+    return periods
+
+
+def filing_accessions(facts_json: Dict) -> Set[str]:
+    """
+    Accession numbers of the 10-K filings that define periods in a payload
+    
+    Cheap to compute (one tag), so callers can decide whether a payload holds
+    anything new before extracting it.
+    """
+    us_gaap = facts_json.get("facts", {}).get("us-gaap", {})
+    return {
+        entry.get("accession") or entry.get("accn", "")
+        for _unit, entry in _iter_tag_entries(us_gaap.get("NetIncomeLoss", []))
+        if entry.get("form") == "10-K"
+    }
+
+
+def extract_10k_periods(facts_json: Dict) -> List[Dict]:
+    """
+    Extract every annual period and its facts from a Company Facts payload
+    
+    A pure function of the payload, so it can run in worker processes.
+    See extract_10k_periods_from_entries() for the record layout.
+    """
+    return extract_10k_periods_from_entries(iter_fact_entries(facts_json))
+
+
 class SECEDGARExtractor:
     """
     Fetches and processes SEC EDGAR Company Facts JSON
@@ -30,9 +218,153 @@ class SECEDGARExtractor:
         "User-Agent": "Financial Education Platform (contact: ravichandran@financialmodeling.edu)"
     }
     
-    def __init__(self, db_connection: sqlite3.Connection):
+    # SEC fair-access policy: at most 10 requests per second
+    MAX_REQUESTS_PER_SECOND = 10
+    MAX_RETRIES = 4
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+    
+    # Parameterised upsert per statement table, keyed by classify_line_item type
+    FACT_INSERT_SQL = {
+        "INCOME": """
+            INSERT OR REPLACE INTO income_statement
+            (period_id, line_item, xbrl_tag, value, unit)
+            VALUES (?, ?, ?, ?, 'USD')
+        """,
+        "BALANCE_SHEET": """
+            INSERT OR REPLACE INTO balance_sheet
+            (period_id, line_item, xbrl_tag, value, unit)
+            VALUES (?, ?, ?, ?, 'USD')
+        """,
+        "CASH_FLOW": """
+            INSERT OR REPLACE INTO cash_flow_statement
+            (period_id, line_item, xbrl_tag, value, unit, section)
+            VALUES (?, ?, ?, ?, 'USD', 'OPERATING')
+        """,
+    }
+    
+    def __init__(self, db_connection: sqlite3.Connection,
+                 cache: Optional[CompanyFactsCache] = None,
+                 base_url: Optional[str] = None,
+                 requests_per_second: Optional[float] = None,
+                 pool_size: int = 16,
+                 track_memory: bool = False,
+                 commit_interval: int = 1,
+                 incremental: bool = True,
+                 archive=None):
         self.db = db_connection
         self.cursor = self.db.cursor()
+        self.cache = cache
+        
+        # Optional RawFactsArchive: normalized facts are written per company
+        self.archive = archive
+        
+        # Skip filings already recorded in ingested_filings
+        self.incremental = incremental
+        
+        # Companies written per transaction (see load_company_periods)
+        self.commit_interval = max(1, commit_interval)
+        self._pending_companies = 0
+        self.classifier = get_tag_classifier()
+        
+        # Statement (or compact facts) rows stored so far, for throughput stats
+        self.facts_written = 0
+        
+        # Compact storage mode: xbrl_tag -> tag_dictionary id, else None
+        self._tag_ids = None
+        if FinancialDatabaseSchema.is_compact(self.db):
+            self._tag_ids = dict(self.db.execute("SELECT xbrl_tag, id FROM tag_dictionary"))
+        
+        # Peak traced Python memory per processed ticker, for sizing workers
+        self.track_memory = track_memory
+        self.memory_stats: Dict[str, int] = {}
+        
+        if base_url:
+            self.BASE_URL = base_url
+        
+        # One pooled keep-alive session shared by every fetch (and thread)
+        self.session = requests.Session()
+        self.session.headers.update(self.HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        
+        self.rate_limiter = TokenBucket(requests_per_second or self.MAX_REQUESTS_PER_SECOND)
+    
+    def _get(self, url: str, headers: Dict[str, str], stream: bool = False) -> requests.Response:
+        """
+        Rate-limited GET with retries on connection errors, 429 and 5xx
+        
+        Retries back off exponentially with full jitter, or wait for the
+        server's Retry-After when one is given.
+        """
+        for attempt in range(self.MAX_RETRIES + 1):
+            self.rate_limiter.acquire()
+            try:
+                response = self.session.get(url, headers=headers, timeout=30, stream=stream)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == self.MAX_RETRIES:
+                    raise
+                delay = backoff_delay(attempt)
+                logger.warning(f"{e.__class__.__name__} for {url}; retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            
+            if response.status_code not in self.RETRY_STATUS_CODES or attempt == self.MAX_RETRIES:
+                return response
+            
+            retry_after = response.headers.get("Retry-After", "")
+            delay = float(retry_after) if retry_after.isdigit() else backoff_delay(attempt)
+            logger.warning(f"HTTP {response.status_code} for {url}; retrying in {delay:.1f}s")
+            time.sleep(delay)
+        
+        return response
+    
+    def _request_company_facts(self, cik_formatted: str,
+                               stream: bool = False) -> Tuple[Optional[str], Optional[requests.Response]]:
+        """
+        Decide where a company's facts come from, hitting SEC only if needed
+        
+        With a CompanyFactsCache attached, fresh entries are served from disk,
+        stale entries are revalidated with a conditional request, and offline
+        mode never touches the network.
+        
+        Returns:
+            ("cache", None) to read the cached body, ("network", response) for
+            a 200 response, or (None, None) if the facts are unavailable
+        """
+        url = f"{self.BASE_URL}{self.COMPANY_FACTS_ENDPOINT}".format(cik=cik_formatted)
+        
+        cached = self.cache.lookup(cik_formatted) if self.cache else None
+        if cached and (self.cache.offline or self.cache.is_fresh(cached)):
+            logger.info(f"Using cached company facts for CIK: {cik_formatted}")
+            return "cache", None
+        
+        if self.cache and self.cache.offline:
+            logger.error(f"Offline mode: no cached company facts for CIK {cik_formatted}")
+            return None, None
+        
+        logger.info(f"Fetching company facts for CIK: {cik_formatted}")
+        
+        headers = {}
+        if self.cache:
+            headers.update(self.cache.conditional_headers(cached))
+        
+        try:
+            response = self._get(url, headers, stream=stream)
+            
+            if response.status_code == 304 and cached:
+                logger.info(f"Company facts unchanged for CIK: {cik_formatted}")
+                self.cache.mark_revalidated(cik_formatted, response.headers)
+                return "cache", None
+            
+            response.raise_for_status()
+            return "network", response
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Failed to fetch data from SEC: {e}")
+            if cached:
+                logger.warning(f"Serving stale cached company facts for CIK {cik_formatted}")
+                return "cache", None
+            return None, None
     
     def fetch_company_facts(self, cik: str) -> Dict:
         """
@@ -46,17 +378,99 @@ class SECEDGARExtractor:
         """
         # Format CIK with leading zeros
         cik_formatted = str(cik).zfill(10)
-        url = f"{self.BASE_URL}{self.COMPANY_FACTS_ENDPOINT}".format(cik=cik_formatted)
         
-        logger.info(f"Fetching company facts for CIK: {cik_formatted}")
+        source, response = self._request_company_facts(cik_formatted)
+        if source == "cache":
+            payload = self.cache.load(cik_formatted)
+            if payload is not None:
+                return payload
+            # Corrupt entry was discarded; fetch it again
+            source, response = self._request_company_facts(cik_formatted)
         
-        try:
-            response = requests.get(url, headers=self.HEADERS, timeout=30)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Failed to fetch data from SEC: {e}")
+        if source != "network":
             return None
+        
+        if self.cache:
+            self.cache.store(cik_formatted, response.content, response.headers)
+        return response.json()
+    
+    def open_company_facts_stream(self, cik: str) -> Optional[BinaryIO]:
+        """
+        Open Company Facts JSON as a binary stream instead of decoding it
+        
+        Without a cache the HTTP body is read straight off the socket. With a
+        cache the body is first streamed to disk in chunks, so neither path
+        holds the whole payload in memory. The caller closes the stream.
+        """
+        cik_formatted = str(cik).zfill(10)
+        
+        source, response = self._request_company_facts(cik_formatted, stream=True)
+        if source == "network" and self.cache:
+            self.cache.store_stream(cik_formatted, response.iter_content(1 << 16),
+                                    response.headers)
+            source = "cache"
+        
+        if source == "cache":
+            return self.cache.open(cik_formatted)
+        if source == "network":
+            response.raw.decode_content = True
+            return response.raw
+        return None
+    
+    def fetch_many(self, ciks: Iterable[str], max_workers: int = 8) -> Dict[str, Optional[Dict]]:
+        """
+        Fetch Company Facts for many CIKs concurrently
+        
+        Requests share the pooled session and the extractor's token bucket,
+        so the aggregate rate never exceeds MAX_REQUESTS_PER_SECOND however
+        many workers are used.
+        
+        Returns:
+            {cik: facts_json or None on failure}, keyed by the CIKs given
+        """
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(self.fetch_company_facts, cik): cik for cik in ciks}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        
+        return results
+    
+    def process_companies(self, companies: Iterable[Tuple[str, str, str]],
+                          max_workers: int = 8) -> Dict[str, bool]:
+        """
+        Fetch many companies concurrently and load each as it arrives
+        
+        Fetching runs in worker threads; parsing and database writes stay on
+        the calling thread, which owns the SQLite connection.
+        
+        Args:
+            companies: Iterable of (ticker, cik, company_name)
+            max_workers: Concurrent HTTP requests
+        
+        Returns:
+            {ticker: success}
+        """
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(self.fetch_company_facts, cik): (ticker, cik, name)
+                for ticker, cik, name in companies
+            }
+            for future in as_completed(futures):
+                ticker, cik, name = futures[future]
+                facts_json = future.result()
+                if not facts_json:
+                    logger.error(f"Failed to fetch facts for {ticker}")
+                    results[ticker] = False
+                    continue
+                
+                periods = extract_10k_periods(facts_json)
+                written = self.load_company_periods(ticker, cik, name, periods)
+                results[ticker] = bool(written)
+        
+        self.flush()
+        return results
     
     def extract_company_info(self, facts_json: Dict) -> Tuple[str, str, str]:
         """Extract company identifier information"""
@@ -67,10 +481,14 @@ class SECEDGARExtractor:
     
     def get_financial_facts_for_period(self, facts_json: Dict, 
                                        period_end: str, 
-                                       filing_type: str = "10-K") -> Dict[str, float]:
+                                       filing_type: str = "10-K",
+                                       facts_index: Optional[Dict] = None) -> Dict[str, float]:
         """
         Extract financial facts for a specific period
         
+        Pass a facts_index from build_facts_index() when looking up many
+        periods of the same company; otherwise the index is rebuilt per call.
+        
         The Company Facts JSON structure is:
         {
             "facts": {
@@ -90,37 +508,10 @@ class SECEDGARExtractor:
             }
         }
         """
-        financial_facts = {}
+        if facts_index is None:
+            facts_index = build_facts_index(facts_json)
         
-        facts_structure = facts_json.get("facts", {})
-        us_gaap = facts_structure.get("us-gaap", {})
-        
-        # Iterate through all XBRL tags
-        for xbrl_tag, values_list in us_gaap.items():
-            if not isinstance(values_list, list):
-                continue
-            
-            # Find the entry matching our period and filing type
-            for entry in values_list:
-                entry_date = entry.get("end", "")
-                entry_form = entry.get("form", "")
-                entry_fy = entry.get("fy", 0)
-                
-                # Match by period end date and form type
-                if entry_date == period_end and entry_form == filing_type:
-                    value = entry.get("val", 0)
-                    accession = entry.get("accession", "")
-                    filed_date = entry.get("filed", "")
-                    
-                    financial_facts[xbrl_tag] = {
-                        "value": value,
-                        "accession": accession,
-                        "filed": filed_date,
-                        "fy": entry_fy
-                    }
-                    break
-        
-        return financial_facts
+        return dict(facts_index.get((filing_type, period_end), {}))
     
     def insert_company(self, ticker: str, cik: str, company_name: str) -> int:
         """Insert or get company ID"""
@@ -159,149 +550,375 @@ class SECEDGARExtractor:
         """
         Classify XBRL tag into statement type and standardized line item
         
+        Synonyms from FinancialDatabaseSchema.XBRL_TAG_MAPPING resolve to the
+        same line item (e.g. NetRevenues -> Revenues).
+        
         Returns:
             (statement_type, standardized_line_item)
-            statement_type: 'INCOME', 'BALANCE_SHEET', 'CASH_FLOW'
+            statement_type: 'INCOME', 'BALANCE_SHEET', 'CASH_FLOW', 'OTHER'
         """
-        # Income statement tags
-        income_tags = [
-            "Revenues", "CostOfRevenue", "GrossProfit", "OperatingExpenses",
-            "OperatingIncomeLoss", "InterestExpense", "OtherIncomeExpenseNet",
-            "IncomeTaxExpenseBenefit", "NetIncomeLoss"
-        ]
-        
-        # Balance sheet tags
-        balance_tags = [
-            "Assets", "AssetsCurrent", "AssetsNonCurrent", "Cash",
-            "AccountsReceivable", "Inventory", "PropertyPlantAndEquipmentNet",
-            "Goodwill", "IntangibleAssetsNetOtherThanGoodwill",
-            "Liabilities", "LiabilitiesCurrent", "AccountsPayable",
-            "LongTermBorrowings", "StockholdersEquity"
-        ]
-        
-        # Cash flow tags
-        cashflow_tags = [
-            "NetCashProvidedByUsedInOperatingActivities",
-            "PaymentsForAcquisitionsOfProductiveAssets",
-            "DepreciationDepletionAndAmortization", "DepreciationAndAmortization"
-        ]
-        
-        if xbrl_tag in income_tags:
-            return "INCOME", xbrl_tag
-        elif xbrl_tag in balance_tags:
-            return "BALANCE_SHEET", xbrl_tag
-        elif xbrl_tag in cashflow_tags:
-            return "CASH_FLOW", xbrl_tag
-        else:
-            return "OTHER", xbrl_tag
-    
-    def insert_financial_facts(self, period_id: int, facts: Dict):
-        """Insert extracted financial facts into appropriate tables"""
+        return self.classifier.classify(xbrl_tag)
+    
+    def _collect_fact_rows(self, period_id: int, facts: Dict,
+                           rows: Dict[str, List[Tuple]],
+                           stored: Optional[Dict[Tuple[int, str], float]] = None):
+        """
+        Append a period's classified facts to per-statement row batches
         
+        Facts whose value already matches `stored` are skipped.
+        """
         for xbrl_tag, fact_data in facts.items():
-            value = fact_data.get("value", 0)
+            statement_type, line_item = self.classifier.classify(xbrl_tag)
+            if statement_type not in self.FACT_INSERT_SQL:
+                continue
             
-            statement_type, line_item = self.classify_line_item(xbrl_tag)
+            value = fact_data.get("value", 0)
+            if stored is not None and stored.get((period_id, xbrl_tag)) == value:
+                continue
             
+            rows.setdefault(statement_type, []).append(
+                (period_id, line_item, xbrl_tag, value)
+            )
+    
+    def _tag_id(self, xbrl_tag: str, line_item: str, statement_type: str) -> int:
+        """tag_dictionary id of a tag, adding the tag on first sight"""
+        tag_id = self._tag_ids.get(xbrl_tag)
+        if tag_id is None:
+            self.cursor.execute("""
+                INSERT OR IGNORE INTO tag_dictionary (xbrl_tag, line_item, statement_type)
+                VALUES (?, ?, ?)
+            """, (xbrl_tag, line_item, statement_type))
+            self.cursor.execute("SELECT id FROM tag_dictionary WHERE xbrl_tag = ?", (xbrl_tag,))
+            tag_id = self._tag_ids[xbrl_tag] = self.cursor.fetchone()[0]
+        return tag_id
+    
+    def _write_fact_rows(self, rows: Dict[str, List[Tuple]]):
+        """
+        One executemany per target table (a single one in compact mode)
+        
+        The period_facts triggers are suspended; callers refresh the
+        touched periods once afterwards.
+        """
+        with deferred_refresh(self.db):
+            self._execute_fact_rows(rows)
+    
+    def _execute_fact_rows(self, rows: Dict[str, List[Tuple]]):
+        """The executemany calls of _write_fact_rows()"""
+        if self._tag_ids is not None:
+            batch = [
+                (period_id, self._tag_id(xbrl_tag, line_item, statement_type), value)
+                for statement_type, statement_rows in rows.items()
+                for period_id, line_item, xbrl_tag, value in statement_rows
+            ]
             try:
-                if statement_type == "INCOME":
-                    self.cursor.execute("""
-                        INSERT OR REPLACE INTO income_statement
-                        (period_id, line_item, xbrl_tag, value, unit)
-                        VALUES (?, ?, ?, ?, 'USD')
-                    """, (period_id, line_item, xbrl_tag, value))
-                
-                elif statement_type == "BALANCE_SHEET":
-                    self.cursor.execute("""
-                        INSERT OR REPLACE INTO balance_sheet
-                        (period_id, line_item, xbrl_tag, value, unit)
-                        VALUES (?, ?, ?, ?, 'USD')
-                    """, (period_id, line_item, xbrl_tag, value))
-                
-                elif statement_type == "CASH_FLOW":
-                    self.cursor.execute("""
-                        INSERT OR REPLACE INTO cash_flow_statement
-                        (period_id, line_item, xbrl_tag, value, unit, section)
-                        VALUES (?, ?, ?, ?, 'USD', 'OPERATING')
-                    """, (period_id, line_item, xbrl_tag, value))
-            
+                self.cursor.executemany(
+                    "INSERT OR REPLACE INTO facts (period_id, tag_id, value) VALUES (?, ?, ?)", batch
+                )
+                self.facts_written += self.cursor.rowcount
+            except sqlite3.Error as e:
+                logger.error(f"Error inserting {len(batch)} facts: {e}")
+            return
+        
+        for statement_type, batch in rows.items():
+            try:
+                self.cursor.executemany(self.FACT_INSERT_SQL[statement_type], batch)
+                self.facts_written += self.cursor.rowcount
             except sqlite3.Error as e:
-                logger.error(f"Error inserting {xbrl_tag}: {e}")
+                logger.error(f"Error inserting {len(batch)} {statement_type} facts: {e}")
+    
+    def insert_financial_facts(self, period_id: int, facts: Dict, commit: bool = True):
+        """Insert extracted financial facts into appropriate tables"""
+        rows: Dict[str, List[Tuple]] = {}
+        self._collect_fact_rows(period_id, facts, rows)
+        self._write_fact_rows(rows)
+        refresh_period_facts(self.db, [period_id])
         
-        self.db.commit()
+        if commit:
+            self.db.commit()
+    
+    def get_company_id(self, ticker: str) -> Optional[int]:
+        """Look up an existing company without inserting it"""
+        self.cursor.execute("SELECT id FROM companies WHERE ticker = ?", (ticker,))
+        result = self.cursor.fetchone()
+        return result[0] if result else None
+    
+    def get_loaded_accessions(self, company_id: int) -> Set[str]:
+        """Accession numbers already ingested for a company (the watermark)"""
+        self.cursor.execute("""
+            SELECT accession_number FROM ingested_filings WHERE company_id = ?
+        """, (company_id,))
+        return {row[0] for row in self.cursor.fetchall()}
+    
+    def record_filings(self, company_id: int, accessions: Iterable[str]):
+        """Advance the watermark: mark filings as ingested"""
+        self.cursor.executemany("""
+            INSERT OR IGNORE INTO ingested_filings (company_id, accession_number, form)
+            VALUES (?, ?, '10-K')
+        """, [(company_id, accession) for accession in accessions if accession])
     
-    def process_company_10k(self, ticker: str, cik: str, company_name: str) -> bool:
+    def get_stored_values(self, period_ids: List[int]) -> Dict[Tuple[int, str], float]:
+        """Current statement values for the given periods, keyed by (period_id, tag)"""
+        stored = {}
+        for start in range(0, len(period_ids), 500):
+            chunk = period_ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            self.cursor.execute(f"""
+                SELECT period_id, xbrl_tag, value FROM income_statement WHERE period_id IN ({placeholders})
+                UNION ALL
+                SELECT period_id, xbrl_tag, value FROM balance_sheet WHERE period_id IN ({placeholders})
+                UNION ALL
+                SELECT period_id, xbrl_tag, value FROM cash_flow_statement WHERE period_id IN ({placeholders})
+            """, chunk * 3)
+            for period_id, xbrl_tag, value in self.cursor.fetchall():
+                stored[(period_id, xbrl_tag)] = value
+        return stored
+    
+    def is_up_to_date(self, ticker: str, accessions: Set[str]) -> bool:
+        """True if every given filing is already ingested for this company"""
+        if not self.incremental:
+            return False
+        company_id = self.get_company_id(ticker)
+        return company_id is not None and accessions <= self.get_loaded_accessions(company_id)
+    
+    def insert_restatements(self, rows: List[Tuple]):
         """
-        Complete pipeline: fetch 10-K data and insert into database
+        Keep superseded values reported by earlier filings
+        
+        Args:
+            rows: (period_id, xbrl_tag, value, accession_number, filed)
+        """
+        if not rows:
+            return
+        try:
+            self.cursor.executemany("""
+                INSERT OR IGNORE INTO fact_restatements
+                (period_id, xbrl_tag, value, accession_number, filed)
+                VALUES (?, ?, ?, ?, ?)
+            """, rows)
+        except sqlite3.Error as e:
+            logger.error(f"Error inserting {len(rows)} restatements: {e}")
+    
+    def clear_company_facts(self, company_id: int) -> int:
+        """
+        Delete a company's statement rows and restatements, keeping its periods
+        
+        Used before re-deriving a company (e.g. RawFactsArchive rebuilds), so
+        tags that are no longer mapped, or now map to another statement,
+        leave no stale rows. period_facts is refreshed for every period of
+        the company. Runs in the open transaction without committing.
+        
+        Returns:
+            Number of rows deleted
+        """
+        period_filter = "period_id IN (SELECT id FROM financial_periods WHERE company_id = ?)"
+        tables = ["facts"] if self._tag_ids is not None \
+            else ["income_statement", "balance_sheet", "cash_flow_statement"]
+        deleted = 0
+        with deferred_refresh(self.db):
+            for table in (*tables, "fact_restatements"):
+                deleted += self.cursor.execute(
+                    f"DELETE FROM {table} WHERE {period_filter}", (company_id,)
+                ).rowcount
+        
+        self.cursor.execute("SELECT id FROM financial_periods WHERE company_id = ?", (company_id,))
+        refresh_period_facts(self.db, [row[0] for row in self.cursor.fetchall()])
+        return deleted
+    
+    def flush(self):
+        """Commit companies still pending under commit_interval"""
+        if self._pending_companies:
+            self.db.commit()
+            self._pending_companies = 0
+    
+    def load_company_periods(self, ticker: str, cik: str, company_name: str,
+                             periods: List[Dict], commit: bool = True) -> int:
+        """
+        Write a company and its extracted 10-K periods to the database
+        
+        All of the company's facts are grouped per statement table and
+        written with executemany in the open transaction, and the touched
+        periods' period_facts rows are refreshed in the same transaction. The transaction is
+        committed every commit_interval companies; call flush() after the
+        last one.
+        
+        In incremental mode the company's ingested_filings watermark is
+        consulted first: a company with no new filings is skipped, only
+        periods touched by a new filing are processed, and facts whose stored
+        value is unchanged are not rewritten.
         
         Args:
             ticker: Stock ticker (e.g., 'AAPL')
             cik: Central Index Key
             company_name: Official company name
+            periods: Records from extract_10k_periods(), one per period end
+            commit: Apply the commit interval after this company; pass False
+                    to leave the transaction entirely to the caller
         
         Returns:
-            Success/failure boolean
+            Number of periods written, or None if the company insert failed
         """
-        # Fetch data from SEC
-        facts_json = self.fetch_company_facts(cik)
-        if not facts_json:
-            logger.error(f"Failed to fetch facts for {ticker}")
-            return False
-        
-        # Insert company
         company_id = self.insert_company(ticker, cik, company_name)
         if not company_id:
             logger.error(f"Failed to insert company {ticker}")
-            return False
+            return None
         
         logger.info(f"✓ Inserted/found company: {company_name} (ID: {company_id})")
         
-        # Extract all 10-K periods
-        us_gaap = facts_json.get("facts", {}).get("us-gaap", {})
+        filings = {period["accession"] for period in periods if period["accession"]}
+        stored = None
+        if self.incremental:
+            loaded = self.get_loaded_accessions(company_id)
+            new_filings = filings - loaded
+            if not new_filings:
+                logger.info(f"  {ticker} is up to date ({len(loaded)} filings loaded)")
+                return 0
+            
+            # Only periods reported (or restated) by a new filing need work
+            periods = [
+                period for period in periods
+                if period["accession"] in new_filings
+                or any(fact.get("accession") in new_filings for fact in period["facts"].values())
+            ]
+        
+        period_ids = []
+        for period in periods:
+            # Insert period
+            period_id = self.insert_financial_period(
+                company_id, period["period_end"], period["fiscal_year"],
+                "10-K", period["accession"]
+            )
+            period_ids.append(period_id)
         
-        # Use a known tag to extract all available 10-K periods
-        net_income_data = us_gaap.get("NetIncomeLoss", [])
+        if self.incremental:
+            stored = self.get_stored_values([pid for pid in period_ids if pid])
         
+        rows: Dict[str, List[Tuple]] = {}
+        restatement_rows = []
         periods_inserted = 0
-        for entry in net_income_data:
-            if entry.get("form") == "10-K":
-                period_end = entry.get("end", "")
-                fiscal_year = entry.get("fy", 0)
-                accession = entry.get("accession", "")
-                
-                if not period_end or not fiscal_year:
-                    continue
-                
-                # Insert period
-                period_id = self.insert_financial_period(
-                    company_id, period_end, fiscal_year, "10-K", accession
+        for period, period_id in zip(periods, period_ids):
+            if period_id:
+                self._collect_fact_rows(period_id, period["facts"], rows, stored)
+                restatement_rows.extend(
+                    (period_id, r["xbrl_tag"], r["value"], r["accession"], r["filed"])
+                    for r in period.get("restatements", [])
+                    if self.classifier.classify(r["xbrl_tag"])[0] in self.FACT_INSERT_SQL
                 )
+                periods_inserted += 1
+                
+                logger.info(f"  ✓ Period {period['period_end']}: "
+                            f"{len(period['facts'])} financial facts loaded")
+        
+        # Insert facts
+        self._write_fact_rows(rows)
+        self.insert_restatements(restatement_rows)
+        refresh_period_facts(self.db, [pid for pid in period_ids if pid])
+        self.record_filings(company_id, filings)
+        
+        if commit:
+            self._pending_companies += 1
+            if self._pending_companies >= self.commit_interval:
+                self.flush()
+        
+        return periods_inserted
+    
+    def process_company_10k(self, ticker: str, cik: str, company_name: str,
+                            streaming: bool = False) -> bool:
+        """
+        Complete pipeline: fetch 10-K data and insert into database
+        
+        Args:
+            ticker: Stock ticker (e.g., 'AAPL')
+            cik: Central Index Key
+            company_name: Official company name
+            streaming: Parse the payload tag by tag instead of decoding it
+                       whole; only 10-K/10-Q entries are kept in memory
+        
+        Returns:
+            Success/failure boolean
+        """
+        started_tracing = self.track_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if self.track_memory:
+            tracemalloc.reset_peak()
+        
+        try:
+            # Fetch data from SEC
+            if streaming:
+                periods = self._extract_10k_periods_streaming(ticker, cik, company_name)
+            else:
+                facts_json = self.fetch_company_facts(cik)
+                if facts_json and self.is_up_to_date(ticker, filing_accessions(facts_json)):
+                    logger.info(f"✓ {ticker}: no new filings, nothing to do\n")
+                    return True
                 
-                if period_id:
-                    # Extract all facts for this period
-                    facts = self.get_financial_facts_for_period(
-                        facts_json, period_end, "10-K"
-                    )
-                    
-                    # Insert facts
-                    self.insert_financial_facts(period_id, facts)
-                    periods_inserted += 1
-                    
-                    logger.info(f"  ✓ Period {period_end}: {len(facts)} financial facts loaded")
-        
-        logger.info(f"✓ Completed: {periods_inserted} 10-K periods processed\n")
-        return periods_inserted > 0
+                if facts_json and self.archive is not None:
+                    periods = self._extract_and_archive(
+                        ticker, cik, company_name,
+                        iter_fact_entries(facts_json, self.archive.TAXONOMIES))
+                else:
+                    periods = extract_10k_periods(facts_json) if facts_json else None
+                # Release the decoded payload before writing
+                facts_json = None
+            
+            if periods is None:
+                logger.error(f"Failed to fetch facts for {ticker}")
+                return False
+            
+            periods_inserted = self.load_company_periods(ticker, cik, company_name, periods)
+            if periods_inserted is None:
+                return False
+            
+            logger.info(f"✓ Completed: {periods_inserted} 10-K periods processed\n")
+            return bool(periods)
+        finally:
+            if self.track_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                self.memory_stats[ticker] = peak
+                logger.info(f"  Peak memory for {ticker}: {peak / 1e6:.1f} MB")
+            if started_tracing:
+                tracemalloc.stop()
+    
+    def _extract_10k_periods_streaming(self, ticker: str, cik: str,
+                                       company_name: str) -> Optional[List[Dict]]:
+        """Stream the payload through CompanyFactsStreamParser into 10-K periods"""
+        from extraction.streaming import CompanyFactsStreamParser
+        
+        stream = self.open_company_facts_stream(cik)
+        if stream is None:
+            return None
+        
+        try:
+            if self.archive is not None:
+                parser = CompanyFactsStreamParser(stream, taxonomies=self.archive.TAXONOMIES)
+                return self._extract_and_archive(ticker, cik, company_name, parser)
+            return extract_10k_periods_from_entries(CompanyFactsStreamParser(stream))
+        except ValueError as e:
+            logger.error(f"Failed to parse streamed company facts for CIK {cik}: {e}")
+            return None
+        finally:
+            stream.close()
 
+    def _extract_and_archive(self, ticker: str, cik: str, company_name: str,
+                             entries: Iterable[Tuple[str, str, Optional[str], Dict]]) -> List[Dict]:
+        """Extract 10-K periods while collecting the same entries into the archive"""
+        from extraction.raw_archive import FactColumns
+        
+        facts = FactColumns()
+        facts.add_company(cik, ticker, company_name)
+        periods = extract_10k_periods_from_entries(facts.collect(cik, entries))
+        
+        path = self.archive.write_company(cik, facts)
+        logger.info(f"  Archived {len(facts):,} raw facts to {path}")
+        return periods
 
 if __name__ == "__main__":
-    from database.schema import FinancialDatabaseSchema
-    
     # Initialize database
     FinancialDatabaseSchema.initialize_database()
     
     # Example: Extract Apple's 10-K data
     conn = FinancialDatabaseSchema.get_connection()
-    extractor = SECEDGARExtractor(conn)
+    extractor = SECEDGARExtractor(conn, cache=CompanyFactsCache())
     
     extractor.process_company_10k("AAPL", "0000320193", "Apple Inc.")
     
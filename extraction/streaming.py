@@ -0,0 +1,149 @@
+"""
+Streaming Parser for SEC EDGAR Company Facts Payloads
+Walks the JSON one XBRL tag at a time instead of decoding the whole document
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import codecs
+import json
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional, Tuple
+
+from extraction.sec_extractor import _iter_tag_entries
+
+# Entries kept by default: annual and quarterly reports
+DEFAULT_FORMS = ("10-K", "10-Q")
+
+_WHITESPACE = " \t\n\r"
+
+
+class CompanyFactsStreamParser:
+    """
+    Incremental parser for the Company Facts layout
+
+        {"cik": ..., "entityName": ...,
+         "facts": {"us-gaap": {"Tag": {...}, ...}, "dei": {...}}}
+
+    Top-level scalars are collected into `meta`. Inside "facts" each tag
+    object is decoded on its own, filtered, and released before the next tag
+    is read, so peak memory is bounded by the largest single tag rather than
+    the whole payload. Iterating yields (taxonomy, xbrl_tag, unit, entry) for
+    every kept entry - the same records iter_fact_entries() produces from a
+    fully decoded payload.
+    """
+
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, stream: BinaryIO,
+                 forms: Optional[Iterable[str]] = DEFAULT_FORMS,
+                 taxonomies: Iterable[str] = ("us-gaap",)):
+        """
+        Args:
+            stream: Binary file-like object with the UTF-8 JSON payload
+            forms: Forms to keep (None keeps every entry)
+            taxonomies: Taxonomies to yield; others are walked and dropped
+        """
+        self.stream = stream
+        self.forms = set(forms) if forms is not None else None
+        self.taxonomies = set(taxonomies)
+        self.meta: Dict = {}
+
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    # ----- buffer management -----
+
+    def _fill(self, size: Optional[int] = None) -> bool:
+        """Read another chunk (CHUNK_SIZE bytes by default); False at end of stream"""
+        if self._eof:
+            return False
+
+        chunk = self.stream.read(size or self.CHUNK_SIZE)
+        if not chunk:
+            self._eof = True
+            self._buf += self._text_decoder.decode(b"", final=True)
+            return False
+
+        # Drop the consumed prefix so the buffer never grows with the payload
+        self._buf = self._buf[self._pos:] + self._text_decoder.decode(chunk)
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """Next non-whitespace character without consuming it ('' at EOF)"""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char: str):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Malformed company facts JSON: expected '{char}', found '{found}'")
+        self._pos += 1
+
+    def _read_value(self):
+        """Decode one complete JSON value at the cursor"""
+        self._peek()
+        # Grow reads geometrically so a large tag is re-scanned O(log n) times
+        size = self.CHUNK_SIZE
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._fill(size):
+                    size *= 2
+                    continue
+                raise
+
+            # A number ending exactly at the buffer edge may be truncated
+            if end == len(self._buf) and not self._eof and self._fill(size):
+                continue
+
+            self._pos = end
+            return value
+
+    def _iter_object_keys(self) -> Iterator[str]:
+        """Yield keys of the object at the cursor, leaving it positioned on each value"""
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+
+        while True:
+            key = self._read_value()
+            self._expect(":")
+            yield key
+
+            separator = self._peek()
+            self._pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"Malformed company facts JSON: unexpected '{separator}'")
+
+    # ----- payload walk -----
+
+    def __iter__(self) -> Iterator[Tuple[str, str, Optional[str], Dict]]:
+        for key in self._iter_object_keys():
+            if key == "facts" and self._peek() == "{":
+                yield from self._walk_facts()
+            else:
+                self.meta[key] = self._read_value()
+
+    def _walk_facts(self):
+        for taxonomy in self._iter_object_keys():
+            wanted = taxonomy in self.taxonomies
+            for xbrl_tag in self._iter_object_keys():
+                tag_data = self._read_value()
+                if not wanted:
+                    continue
+
+                for unit, entry in _iter_tag_entries(tag_data):
+                    if self.forms is None or entry.get("form") in self.forms:
+                        yield taxonomy, xbrl_tag, unit, entry
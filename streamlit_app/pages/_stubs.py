@@ -22,7 +22,7 @@ def render():
     Displays key metrics and summaries for all loaded companies and valuations.
     """)
     
-    conn = FinancialDatabaseSchema.get_connection()
+    conn = FinancialDatabaseSchema.get_read_connection()
     cursor = conn.cursor()
     
     # Key metrics
@@ -0,0 +1 @@
+# Test suite: run `python -m pytest` from the repository root
@@ -0,0 +1,42 @@
+"""
+Shared fixtures: an in-memory database with the full schema
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import logging
+import sqlite3
+
+import pytest
+
+from database.schema import FinancialDatabaseSchema
+from extraction.sec_extractor import SECEDGARExtractor
+
+
+@pytest.fixture(autouse=True)
+def quiet_logs():
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.fixture
+def db():
+    conn = sqlite3.connect(":memory:")
+    FinancialDatabaseSchema.create_schema(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def extractor(db):
+    return SECEDGARExtractor(db)
+
+
+def add_period(extractor: SECEDGARExtractor, company_id: int, period_end: str,
+               fiscal_year: int, facts: dict, filing_type: str = "10-K") -> int:
+    """One period with {xbrl_tag: value} facts, written through the extractor"""
+    period_id = extractor.insert_financial_period(
+        company_id, period_end, fiscal_year, filing_type, f"{company_id}-{period_end}-{filing_type}"
+    )
+    extractor.insert_financial_facts(period_id, {tag: {"value": value} for tag, value in facts.items()})
+    return period_id
@@ -0,0 +1,88 @@
+"""
+Batch FCFF: inline and process-pool results match calculate_fcff() per company
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import sqlite3
+
+import numpy as np
+import pytest
+
+from database.schema import FinancialDatabaseSchema
+from extraction.sec_extractor import SECEDGARExtractor
+from tests.conftest import add_period
+from tests.test_fcff import add_universe, balance, historical_fcff_per_period
+from valuation.batch_fcff import BATCH_COLUMNS, BATCH_FLAGS, BatchFCFFEngine
+from valuation.fcff import FCFFCalculator
+
+COMPARED = ("revenue", "ebit", "tax_rate", "nopat", "da", "capex", "change_nwc", "fcff")
+
+
+@pytest.fixture(scope="module")
+def universe(tmp_path_factory):
+    """A database file with random companies plus one zero-DDA company"""
+    path = tmp_path_factory.mktemp("batch") / "universe.db"
+    conn = sqlite3.connect(path)
+    FinancialDatabaseSchema.create_schema(conn)
+    extractor = SECEDGARExtractor(conn)
+    add_universe(extractor, companies=9, years=6, seed=3)
+
+    # DDA reported as 0 falls back to DepreciationAndAmortization; FY2021 is missing,
+    # so FY2022 has no balance-sheet lag either
+    company_id = extractor.insert_company("ZDA", "9", "Zero DDA Inc")
+    for year in (2019, 2020, 2022):
+        add_period(extractor, company_id, f"{year}-12-31", year, {
+            **balance(1000, 400, 50, 200), "DepreciationDepletionAndAmortization": 0.0,
+            "DepreciationAndAmortization": 30.0, "IncomeTaxExpenseBenefit": 40.0, "NetIncomeLoss": 120.0,
+        })
+    conn.close()
+
+    conn = sqlite3.connect(path)
+    yield conn, company_id
+    conn.close()
+
+
+def expected_by_company(conn: sqlite3.Connection, years) -> dict:
+    calculator = FCFFCalculator(conn)
+    company_ids = [row[0] for row in conn.execute("SELECT id FROM companies ORDER BY id")]
+    return {company_id: historical_fcff_per_period(calculator, company_id, years or 100)
+            for company_id in company_ids}
+
+
+@pytest.mark.parametrize("max_workers", [0, 2], ids=["inline", "process-pool"])
+@pytest.mark.parametrize("years", [None, 3])
+def test_batch_matches_per_company(universe, max_workers, years):
+    conn, zero_dda = universe
+    result = BatchFCFFEngine(conn, chunk_size=3, max_workers=max_workers).compute(years=years)
+    assert set(result) == set(BATCH_COLUMNS) | set(BATCH_FLAGS)
+
+    groups = BatchFCFFEngine.by_company(result)
+    expected = expected_by_company(conn, years)
+    assert set(groups) == {company_id for company_id, records in expected.items() if records}
+    for company_id, rows in groups.items():
+        records = expected[company_id]
+        assert rows["period_id"].tolist() == [record["period_id"] for record in records]
+        assert rows["fiscal_year"].tolist() == [record["fiscal_year"] for record in records]
+        assert rows["nwc_fallback"].tolist() == [record["nwc_fallback"] for record in records]
+        for column in COMPARED:
+            assert rows[column] == pytest.approx([record[column] for record in records]), (company_id, column)
+
+    assert result["nwc_fallback"].any() and not result["nwc_fallback"].all()
+    assert result["default_tax_rate"].any()
+    fallback = groups[zero_dda]
+    assert fallback["da"].tolist() == [30.0] * len(fallback["da"])
+    assert fallback["nwc_fallback"].tolist() == [True, False, True]
+
+
+def test_process_pool_equals_inline(universe):
+    conn, _ = universe
+    inline = BatchFCFFEngine(conn, chunk_size=4, max_workers=0).compute()
+    pooled = BatchFCFFEngine(conn, chunk_size=4, max_workers=2).compute()
+    for column, values in inline.items():
+        assert np.array_equal(values, pooled[column]), column
+
+
+def test_unknown_companies_give_empty_result(universe):
+    conn, _ = universe
+    result = BatchFCFFEngine(conn).compute(company_ids=[10_000])
+    assert all(len(values) == 0 for values in result.values())
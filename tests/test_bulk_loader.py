@@ -0,0 +1,57 @@
+"""
+Bulk load from a companyfacts.zip archive
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import json
+import zipfile
+
+import pytest
+
+from benchmarks.synthetic import make_company_facts
+from extraction.bulk_loader import CompanyFactsZipLoader
+
+
+def write_zip(path, companies: int, years: int):
+    with zipfile.ZipFile(path, "w") as archive:
+        for cik in range(1, companies + 1):
+            payload = make_company_facts(cik, years=years, extra_tags=20)
+            archive.writestr(f"CIK{cik:010d}.json", json.dumps(payload))
+
+
+def statement_rows(db) -> int:
+    return sum(db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+               for table in ("income_statement", "balance_sheet", "cash_flow_statement"))
+
+
+def test_load_counts_stored_facts(db, tmp_path):
+    write_zip(tmp_path / "companyfacts.zip", companies=3, years=4)
+    stats = CompanyFactsZipLoader(db, tmp_path / "companyfacts.zip", max_workers=0).load()
+
+    assert stats["companies"] == 3
+    assert stats["periods"] == db.execute("SELECT COUNT(*) FROM financial_periods").fetchone()[0] == 12
+    # Only classified facts are stored; the extra tags are not counted
+    assert stats["facts"] == statement_rows(db) > 0
+    assert stats["facts_per_sec"] > 0
+
+
+def test_reload_counts_only_new_rows(db, tmp_path):
+    write_zip(tmp_path / "companyfacts.zip", companies=2, years=3)
+    CompanyFactsZipLoader(db, tmp_path / "companyfacts.zip", max_workers=0).load()
+    stats = CompanyFactsZipLoader(db, tmp_path / "companyfacts.zip", max_workers=0).load()
+    assert stats["facts"] == 0  # incremental: nothing new to write
+
+
+@pytest.mark.parametrize("max_workers", [0, 2], ids=["inline", "process-pool"])
+def test_bad_members_are_skipped(db, tmp_path, max_workers):
+    path = tmp_path / "companyfacts.zip"
+    write_zip(path, companies=3, years=2)
+    with zipfile.ZipFile(path, "a") as archive:
+        archive.writestr("CIK0000000100.json", b'{"cik": 100, "facts": ')           # truncated JSON
+        archive.writestr("CIK0000000101.json", b'{"entityName": "\xff\xfe"}')       # not UTF-8
+        archive.writestr("CIK0000000102.json", json.dumps({"facts": []}))           # wrong layout
+        archive.writestr("CIK0000000103.json", json.dumps([1, 2]))
+
+    stats = CompanyFactsZipLoader(db, path, max_workers=max_workers).load()
+    assert stats["companies"] == 3 and stats["skipped"] == 4
+    assert stats["periods"] == db.execute("SELECT COUNT(*) FROM financial_periods").fetchone()[0] == 6
@@ -0,0 +1,127 @@
+"""
+Compact storage: writes through the compatibility views read back as in normal mode
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import random
+import sqlite3
+
+import pytest
+
+from database.schema import FinancialDatabaseSchema
+from database.xbrl_classifier import get_tag_classifier
+from extraction.sec_extractor import SECEDGARExtractor
+from tests.conftest import add_period
+
+STATEMENT_TABLES = ("income_statement", "balance_sheet", "cash_flow_statement")
+TABLE_FOR = {"INCOME": "income_statement", "BALANCE_SHEET": "balance_sheet",
+             "CASH_FLOW": "cash_flow_statement"}
+
+
+def new_database(compact: bool) -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    FinancialDatabaseSchema.create_schema(conn, compact=compact)
+    conn.execute("INSERT INTO companies (ticker, cik, company_name) VALUES ('T', '1', 'T Inc')")
+    conn.executemany("""
+        INSERT INTO financial_periods (company_id, period_end_date, fiscal_year, filing_type, filing_date)
+        VALUES (1, ?, ?, '10-K', ?)
+    """, [(f"{year}-12-31", year, f"{year + 1}-02-15") for year in range(2019, 2024)])
+    conn.commit()
+    return conn
+
+
+@pytest.fixture
+def pair():
+    normal, compact = new_database(False), new_database(True)
+    assert not FinancialDatabaseSchema.is_compact(normal) and FinancialDatabaseSchema.is_compact(compact)
+    yield normal, compact
+    normal.close()
+    compact.close()
+
+
+def statements(conn) -> dict:
+    """Statement rows as the compatibility views expose them (id, side and section differ)"""
+    return {table: conn.execute(f"""
+        SELECT period_id, line_item, xbrl_tag, value, unit FROM {table} ORDER BY period_id, xbrl_tag
+    """).fetchall() for table in STATEMENT_TABLES}
+
+
+def period_facts(conn) -> list:
+    return [row[:-1] for row in conn.execute("SELECT * FROM period_facts ORDER BY period_id")]
+
+
+def both(pair, sql: str, params=()):
+    for conn in pair:
+        conn.execute(sql, params)
+        conn.commit()
+
+
+def insert_fact(pair, period_id: int, tag: str, value: float):
+    """One statement row through the table (normal) or its view (compact)"""
+    statement_type, line_item = get_tag_classifier().classify(tag)
+    both(pair, f"INSERT INTO {TABLE_FOR[statement_type]} (period_id, line_item, xbrl_tag, value) "
+               "VALUES (?, ?, ?, ?)", (period_id, line_item, tag, value))
+
+
+def test_view_writes_read_back_as_normal_mode(pair):
+    tags = sorted(get_tag_classifier().tags)
+    rng = random.Random(7)
+    for period_id in range(1, 6):
+        for tag in rng.sample(tags, len(tags) // 2):
+            insert_fact(pair, period_id, tag, rng.uniform(-1e9, 1e9))
+        both(pair, "INSERT INTO shares_outstanding (period_id, shares_outstanding) VALUES (?, ?)",
+             (period_id, rng.uniform(1e6, 1e9)))
+
+    normal, compact = pair
+    assert statements(compact) == statements(normal)
+    assert all(statements(normal).values())
+    assert period_facts(compact) == period_facts(normal)
+
+
+def test_view_updates_and_deletes(pair):
+    for period_id in (1, 2):
+        insert_fact(pair, period_id, "Revenues", 100.0)
+        insert_fact(pair, period_id, "Assets", 500.0)
+    both(pair, "UPDATE income_statement SET value = 150.0 WHERE period_id = 1 AND xbrl_tag = 'Revenues'")
+    both(pair, "DELETE FROM balance_sheet WHERE period_id = 2")
+
+    normal, compact = pair
+    assert statements(compact) == statements(normal)
+    assert [row[0] for row in statements(compact)["balance_sheet"]] == [1]
+    assert period_facts(compact) == period_facts(normal)
+    assert compact.execute("SELECT revenue FROM period_facts WHERE period_id = 1").fetchone()[0] == 150.0
+
+
+def test_unknown_tag_is_added_to_the_dictionary(pair):
+    both(pair, "INSERT INTO cash_flow_statement (period_id, line_item, xbrl_tag, value) "
+               "VALUES (3, 'CustomItem', 'CustomCashTag', 9.0)")
+    normal, compact = pair
+    assert statements(compact) == statements(normal)
+    assert compact.execute("SELECT line_item, statement_type FROM tag_dictionary WHERE xbrl_tag = ?",
+                           ("CustomCashTag",)).fetchone() == ("CustomItem", "CASH_FLOW")
+
+
+def test_duplicate_view_insert_is_rejected(pair):
+    insert_fact(pair, 1, "Revenues", 1.0)
+    for conn in pair:
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("INSERT INTO income_statement (period_id, line_item, xbrl_tag, value) "
+                         "VALUES (1, 'Revenue', 'Revenues', 2.0)")
+
+
+def test_extractor_writes_match(pair):
+    facts = {"Revenues": 1000.0, "OperatingIncomeLoss": 200.0, "IncomeTaxExpenseBenefit": 40.0,
+             "NetIncomeLoss": 160.0, "Assets": 900.0, "LiabilitiesCurrent": 50.0,
+             "DepreciationDepletionAndAmortization": 0.0, "DepreciationAndAmortization": 30.0,
+             "NetCashProvidedByUsedInOperatingActivities": 250.0}
+    for conn in pair:
+        extractor = SECEDGARExtractor(conn)
+        company_id = extractor.insert_company("EXT", "2", "Extracted Inc")
+        period_id = add_period(extractor, company_id, "2023-12-31", 2023, facts)
+        # A restated value replaces the stored one
+        extractor.insert_financial_facts(period_id, {"Revenues": {"value": 1100.0}})
+
+    normal, compact = pair
+    assert statements(compact) == statements(normal)
+    assert period_facts(compact) == period_facts(normal)
+    assert compact.execute("SELECT revenue, da FROM period_facts WHERE period_id = 6").fetchone() == (1100.0, 30.0)
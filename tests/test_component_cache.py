@@ -0,0 +1,112 @@
+"""
+Component cache: never stale across connections, commits and rollbacks
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import sqlite3
+
+import pytest
+
+from database.component_cache import ComponentCache
+from database.period_facts import refresh_period_facts
+from database.schema import FinancialDatabaseSchema
+from extraction.sec_extractor import SECEDGARExtractor
+from tests.conftest import add_period
+
+
+@pytest.fixture
+def database(tmp_path):
+    """A WAL database with one period whose revenue is 100"""
+    path = tmp_path / "cache.db"
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    FinancialDatabaseSchema.create_schema(conn)
+    extractor = SECEDGARExtractor(conn)
+    company_id = extractor.insert_company("CCH", "1", "Cache Co")
+    period_id = add_period(extractor, company_id, "2023-12-31", 2023, {"Revenues": 100.0})
+    conn.close()
+
+    writer, reader = sqlite3.connect(path), sqlite3.connect(path)
+    yield writer, reader, period_id
+    writer.close()
+    reader.close()
+
+
+def revenue(cache: ComponentCache, conn: sqlite3.Connection, period_id: int) -> float:
+    return cache.get_period_facts(conn.cursor(), period_id)["revenue"]
+
+
+def stored_revenue(conn: sqlite3.Connection, period_id: int) -> float:
+    return conn.execute("SELECT revenue FROM period_facts WHERE period_id = ?", (period_id,)).fetchone()[0]
+
+
+def write_revenue(cache: ComponentCache, conn: sqlite3.Connection, period_id: int, value: float):
+    """An uncommitted statement write and period_facts refresh, as the extractor does"""
+    conn.execute("UPDATE income_statement SET value = ? WHERE period_id = ? AND xbrl_tag = 'Revenues'",
+                  (value, period_id))
+    refresh_period_facts(conn, [period_id])
+    cache.invalidate(conn, [period_id])
+
+
+def test_row_cached_by_another_connection_before_commit_is_dropped(database):
+    writer, reader, period_id = database
+    cache = ComponentCache()
+    assert revenue(cache, writer, period_id) == 100.0
+
+    write_revenue(cache, writer, period_id, 200.0)
+    # The reader still sees the committed 100 and caches it
+    assert revenue(cache, reader, period_id) == 100.0
+    writer.commit()
+
+    assert stored_revenue(writer, period_id) == 200.0
+    assert revenue(cache, writer, period_id) == 200.0
+    assert revenue(cache, reader, period_id) == 200.0
+
+
+def test_rows_read_inside_a_transaction_are_not_cached(database):
+    writer, reader, period_id = database
+    cache = ComponentCache()
+
+    write_revenue(cache, writer, period_id, 200.0)
+    assert revenue(cache, writer, period_id) == 200.0
+    assert cache.stats()["size"] == 0
+    writer.rollback()
+
+    assert revenue(cache, writer, period_id) == 100.0
+    assert revenue(cache, reader, period_id) == 100.0
+
+
+def test_whole_database_invalidation_waits_for_commit(database):
+    writer, reader, period_id = database
+    cache = ComponentCache()
+
+    writer.execute("UPDATE income_statement SET value = 300.0 WHERE period_id = ?", (period_id,))
+    refresh_period_facts(writer)
+    cache.invalidate(writer)
+    assert revenue(cache, reader, period_id) == 100.0
+    writer.commit()
+
+    assert revenue(cache, writer, period_id) == 300.0
+
+
+def test_other_connections_commit_flushes_reader(database):
+    writer, reader, period_id = database
+    cache = ComponentCache()
+    assert revenue(cache, reader, period_id) == 100.0
+
+    writer.execute("UPDATE income_statement SET value = 400.0 WHERE period_id = ?", (period_id,))
+    writer.commit()  # period_facts follows through its triggers; no invalidate() call
+
+    assert revenue(cache, reader, period_id) == 400.0
+    assert cache.stats()["flushes"] == 1
+
+
+def test_hits_and_eviction(database):
+    _, reader, period_id = database
+    cache = ComponentCache(maxsize=1)
+    for _ in range(3):
+        revenue(cache, reader, period_id)
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (2, 1)
+
+    cache.get_period_facts(reader.cursor(), period_id + 1)
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,117 @@
+"""
+Connection manager: reader/writer split, pooled close semantics, per-thread lifetime
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import gc
+import sqlite3
+import threading
+import weakref
+
+import pytest
+
+from database.connection import ConnectionManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = ConnectionManager(tmp_path / "data" / "pool.db")
+    yield manager
+    manager.close_all()
+
+
+def in_thread(target):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(target()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_reader_sees_committed_writes_only(manager):
+    writer = manager.connection()
+    writer.execute("CREATE TABLE t (x INTEGER)")
+    writer.commit()
+    assert writer.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    reader = manager.read_connection()
+    assert reader is not writer
+    writer.execute("INSERT INTO t VALUES (1)")
+    assert reader.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    writer.commit()
+    assert reader.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
+
+
+def test_reader_is_read_only(manager):
+    manager.connection().execute("CREATE TABLE t (x INTEGER)")
+    manager.connection().commit()
+    reader = manager.read_connection()
+    with pytest.raises(sqlite3.OperationalError):
+        reader.execute("INSERT INTO t VALUES (1)")
+    with pytest.raises(sqlite3.OperationalError):
+        reader.execute("PRAGMA query_only = OFF")
+        reader.execute("INSERT INTO t VALUES (1)")  # mode=ro still refuses
+
+
+def test_read_connection_creates_missing_file(manager):
+    assert not manager.db_path.exists()
+    manager.read_connection()
+    assert manager.db_path.exists()
+
+
+def test_same_thread_reuses_other_threads_do_not(manager):
+    writer = manager.connection()
+    assert manager.connection() is writer and manager.read_connection() is manager.read_connection()
+    assert in_thread(manager.connection) is not writer
+
+
+def test_close_is_a_no_op_release_closes(manager):
+    writer = manager.connection()
+    writer.execute("CREATE TABLE t (x INTEGER)")
+    writer.execute("INSERT INTO t VALUES (1)")
+    writer.close()
+    assert writer.is_open and writer.in_transaction  # another caller's transaction survives
+    writer.commit()
+
+    writer.release()
+    assert not writer.is_open
+    replacement = manager.connection()
+    assert replacement is not writer and replacement.execute("SELECT x FROM t").fetchone()[0] == 1
+
+
+def test_row_factory_set_by_caller_is_kept(manager):
+    conn = manager.connection()
+    assert conn.row_factory is sqlite3.Row
+    conn.row_factory = None
+    assert manager.connection().execute("SELECT 1").fetchone() == (1,)
+
+
+def test_exited_thread_connections_are_released(manager):
+    def open_both():
+        return [weakref.ref(manager.connection()), weakref.ref(manager.read_connection())]
+
+    refs = [ref for _ in range(3) for ref in in_thread(open_both)]
+    # Closed as each thread exits; the manager's weak references do not keep them alive
+    assert not any(ref() is not None and ref().is_open for ref in refs)
+    gc.collect()
+    assert all(ref() is None for ref in refs) and len(manager._connections) == 0
+
+
+def test_close_all_closes_every_thread(manager):
+    held = threading.Event()
+    done = threading.Event()
+    handles = []
+
+    def hold():
+        handles.append(manager.connection())
+        held.set()
+        done.wait()
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    held.wait()
+    main = manager.connection()
+    manager.close_all()
+    assert not main.is_open and not handles[0].is_open
+    done.set()
+    thread.join()
@@ -0,0 +1,131 @@
+"""
+DCF results: projection horizons of any length round-trip through dcf_projections
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import sqlite3
+import threading
+
+import numpy as np
+import pytest
+
+from database.schema import FinancialDatabaseSchema
+from extraction.sec_extractor import SECEDGARExtractor
+from tests.conftest import add_period
+from valuation.dcf import DCFValuationEngine
+
+LEGACY_COLUMNS = "fcff_year_1, fcff_year_2, fcff_year_3, fcff_year_4, fcff_year_5"
+
+
+def dcf_result(company_id: int, period_id: int, projections) -> dict:
+    """The fields save_dcf_results_many() reads from a perform_dcf_valuation() result"""
+    return {"company_id": company_id, "base_period_id": period_id, "fcff_projections": projections,
+            "wacc": 0.09, "terminal_growth_rate": 0.025, "terminal_value": 5000.0,
+            "enterprise_value": 4000.0, "equity_value": 3500.0, "intrinsic_value_per_share": 35.0}
+
+
+@pytest.fixture
+def base_period(extractor):
+    company_id = extractor.insert_company("DCF", "7", "Discounted Inc")
+    return company_id, add_period(extractor, company_id, "2023-12-31", 2023, {"Revenues": 1000.0})
+
+
+@pytest.mark.parametrize("horizon", [3, 5, 10, 25])
+def test_horizon_round_trips(db, base_period, horizon):
+    engine = DCFValuationEngine(db)
+    projections = [100.0 * 1.05 ** year for year in range(horizon)]
+    dcf_calc_id = engine.save_dcf_results(dcf_result(*base_period, projections))
+
+    assert engine.get_projections(dcf_calc_id).tolist() == projections
+    assert db.execute("SELECT projection_years FROM dcf_calculations WHERE id = ?",
+                      (dcf_calc_id,)).fetchone()[0] == horizon
+    # The legacy columns hold the first five years, zero-padded
+    legacy = db.execute(f"SELECT {LEGACY_COLUMNS} FROM dcf_calculations WHERE id = ?",
+                        (dcf_calc_id,)).fetchone()
+    assert list(legacy) == (projections + [0.0] * 5)[:5]
+
+
+def test_projection_matrix_pads_mixed_horizons(db, base_period):
+    engine = DCFValuationEngine(db)
+    horizons = [5, 12, 1, 7]
+    results = [dcf_result(*base_period, [float(h * 100 + year) for year in range(1, h + 1)])
+               for h in horizons]
+    ids = engine.save_dcf_results_many(results)
+
+    # Unordered, repeated and unknown ids
+    requested = [ids[2], ids[1], ids[0], ids[1], 10_000, ids[3]]
+    matrix = engine.get_projection_matrix(requested)
+    assert matrix.shape == (len(requested), 12)
+    for row, dcf_calc_id in zip(matrix, requested):
+        expected = engine.get_projections(dcf_calc_id)
+        assert row[:len(expected)].tolist() == expected.tolist()
+        assert np.isnan(row[len(expected):]).all()
+
+    assert engine.get_projection_matrix([]).shape == (0, 0)
+
+
+def test_ids_are_preassigned_in_input_order(db, base_period):
+    engine = DCFValuationEngine(db)
+    first = engine.save_dcf_results_many([dcf_result(*base_period, [1.0] * 6) for _ in range(3)])
+    assert first == [1, 2, 3]
+
+    # AUTOINCREMENT never hands out an id again, even after the newest row is deleted
+    db.execute("DELETE FROM dcf_projections WHERE dcf_calc_id = 3")
+    db.execute("DELETE FROM dcf_calculations WHERE id = 3")
+    db.commit()
+    second = engine.save_dcf_results_many([dcf_result(*base_period, [2.0] * 8) for _ in range(2)])
+    assert second == [4, 5]
+    assert engine.save_dcf_results(dcf_result(*base_period, [3.0])) == 6
+    assert db.execute("SELECT COUNT(*) FROM dcf_projections").fetchone()[0] == 2 * 6 + 2 * 8 + 1
+
+
+def test_open_transaction_is_left_to_the_caller(db, base_period):
+    engine = DCFValuationEngine(db)
+    db.execute("BEGIN")
+    ids = engine.save_dcf_results_many([dcf_result(*base_period, [1.0] * 9)], commit=False)
+    assert db.in_transaction
+    db.rollback()
+    assert engine.get_projections(ids[0]).size == 0
+    assert engine.save_dcf_results_many([dcf_result(*base_period, [1.0])]) == ids
+
+
+def test_concurrent_writers_get_disjoint_ids(tmp_path):
+    path = tmp_path / "dcf.db"
+    conn = sqlite3.connect(path)
+    FinancialDatabaseSchema.create_schema(conn)
+    extractor = SECEDGARExtractor(conn)
+    company_id = extractor.insert_company("DCF", "7", "Discounted Inc")
+    period_id = add_period(extractor, company_id, "2023-12-31", 2023, {"Revenues": 1000.0})
+    conn.close()
+
+    writers, batches, batch_size = 4, 25, 5
+    start = threading.Barrier(writers)
+    saved, errors = [], []
+
+    def write(writer: int):
+        engine = DCFValuationEngine(sqlite3.connect(path, timeout=5))
+        try:
+            start.wait(timeout=30)
+            for batch in range(batches):
+                horizon = 6 + writer
+                saved.extend(engine.save_dcf_results_many(
+                    [dcf_result(company_id, period_id, [float(writer)] * horizon)] * batch_size))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            engine.db.close()
+
+    threads = [threading.Thread(target=write, args=(writer,)) for writer in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=60)
+
+    assert errors == []
+    assert sorted(saved) == list(range(1, writers * batches * batch_size + 1))
+    conn = sqlite3.connect(path)
+    matrix = DCFValuationEngine(conn).get_projection_matrix(saved)
+    conn.close()
+    # Each valuation kept its own writer's projections
+    horizons = (~np.isnan(matrix)).sum(axis=1)
+    assert (horizons == matrix[:, 0] + 6).all()
@@ -0,0 +1,155 @@
+"""
+Extractor: canonical fact selection, restatements and incremental re-ingest
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import pytest
+
+from extraction.sec_extractor import (build_facts_index, extract_10k_periods,
+                                      filing_accessions)
+
+FY22 = "0000000001-23-000001"   # FY2022 10-K: reports 2022 and the 2021 comparative
+FY23 = "0000000001-24-000001"   # FY2023 10-K: reports 2023 and restates 2022 revenue
+Q1 = "0000000001-23-000100"
+
+
+def entry(end: str, value: float, accession: str, filed: str, fy: int, form: str = "10-K") -> dict:
+    # SEC payloads spell the accession number "accn"
+    return {"end": end, "val": value, "accn": accession, "filed": filed, "fy": fy, "form": form}
+
+
+def payload(*accessions: str) -> dict:
+    """Company facts with two 10-Ks disagreeing on 2022 revenue, limited to the given filings"""
+    tags = {
+        "Revenues": [
+            entry("2021-12-31", 900.0, FY22, "2023-02-10", 2022),
+            entry("2022-12-31", 1000.0, FY22, "2023-02-10", 2022),
+            entry("2022-12-31", 1050.0, FY23, "2024-02-12", 2023),
+            entry("2023-12-31", 1200.0, FY23, "2024-02-12", 2023),
+            entry("2023-03-31", 260.0, Q1, "2023-05-01", 2023, form="10-Q"),
+        ],
+        "NetIncomeLoss": [
+            entry("2021-12-31", 90.0, FY22, "2023-02-10", 2022),
+            entry("2022-12-31", 100.0, FY22, "2023-02-10", 2022),
+            entry("2022-12-31", 100.0, FY23, "2024-02-12", 2023),
+            entry("2023-12-31", 130.0, FY23, "2024-02-12", 2023),
+        ],
+        "Assets": [
+            entry("2022-12-31", 5000.0, FY22, "2023-02-10", 2022),
+            entry("2023-12-31", 5500.0, FY23, "2024-02-12", 2023),
+        ],
+    }
+    if accessions:
+        tags = {tag: [e for e in entries if e["accn"] in accessions] for tag, entries in tags.items()}
+    return {"cik": 1, "entityName": "Restating Inc", "facts": {"us-gaap": {
+        tag: {"units": {"USD": entries}} for tag, entries in tags.items()}}}
+
+
+def load(extractor, facts: dict) -> int:
+    return extractor.load_company_periods("RST", "1", "Restating Inc", extract_10k_periods(facts))
+
+
+def stored(db, period_end: str, table: str = "income_statement") -> dict:
+    return dict(db.execute(f"""
+        SELECT s.xbrl_tag, s.value FROM {table} s JOIN financial_periods p ON p.id = s.period_id
+        WHERE p.period_end_date = ?
+    """, (period_end,)))
+
+
+def restatements(db) -> list:
+    return db.execute("""
+        SELECT p.period_end_date, r.xbrl_tag, r.value, r.accession_number, r.filed
+        FROM fact_restatements r JOIN financial_periods p ON p.id = r.period_id
+        ORDER BY p.period_end_date, r.xbrl_tag
+    """).fetchall()
+
+
+def ingested(db) -> set:
+    return {row[0] for row in db.execute("SELECT accession_number FROM ingested_filings")}
+
+
+def test_facts_index_keeps_latest_filed():
+    index = build_facts_index(payload())
+    fact = index[("10-K", "2022-12-31")]["Revenues"]
+    assert (fact["value"], fact["accession"], fact["fy"]) == (1050.0, FY23, 2023)
+    assert index[("10-K", "2021-12-31")]["Revenues"]["value"] == 900.0
+    assert index[("10-Q", "2023-03-31")]["Revenues"]["accession"] == Q1
+
+
+@pytest.mark.parametrize("order", [1, -1], ids=["filed-order", "reversed"])
+def test_canonical_selection_ignores_entry_order(order):
+    facts = payload()
+    for tag_data in facts["facts"]["us-gaap"].values():
+        tag_data["units"]["USD"] = tag_data["units"]["USD"][::order]
+
+    periods = {period["period_end"]: period for period in extract_10k_periods(facts)}
+    assert list(periods) == ["2021-12-31", "2022-12-31", "2023-12-31"]
+
+    fy2022 = periods["2022-12-31"]
+    assert fy2022["facts"]["Revenues"]["value"] == 1050.0
+    assert fy2022["facts"]["NetIncomeLoss"]["accession"] == FY23
+    # Fiscal year and accession come from the filing that first reported the period
+    assert (fy2022["fiscal_year"], fy2022["accession"]) == (2022, FY22)
+    assert fy2022["restatements"] == [
+        {"xbrl_tag": "Revenues", "value": 1000.0, "accession": FY22, "filed": "2023-02-10", "fy": 2022}
+    ]
+
+    # A comparative first seen in a later period's filing has no accession of its own
+    assert (periods["2021-12-31"]["fiscal_year"], periods["2021-12-31"]["accession"]) == (2021, None)
+    assert periods["2023-12-31"]["restatements"] == []
+    assert filing_accessions(facts) == {FY22, FY23}
+
+
+def test_restated_value_is_stored_and_superseded_value_kept(db, extractor):
+    assert load(extractor, payload()) == 3
+    assert stored(db, "2022-12-31") == {"Revenues": 1050.0, "NetIncomeLoss": 100.0}
+    assert stored(db, "2022-12-31", "balance_sheet") == {"Assets": 5000.0}
+    assert restatements(db) == [("2022-12-31", "Revenues", 1000.0, FY22, "2023-02-10")]
+    assert db.execute("SELECT revenue FROM period_facts ORDER BY period_id").fetchall() == \
+        [(900.0,), (1050.0,), (1200.0,)]
+    assert ingested(db) == {FY22, FY23}
+
+
+def test_incremental_skip_and_restatement_reingest(db, extractor):
+    assert load(extractor, payload(FY22)) == 2
+    assert stored(db, "2022-12-31") == {"Revenues": 1000.0, "NetIncomeLoss": 100.0}
+    assert ingested(db) == {FY22}
+    assert extractor.is_up_to_date("RST", filing_accessions(payload(FY22)))
+    assert not extractor.is_up_to_date("RST", filing_accessions(payload()))
+
+    # The FY2023 10-K adds 2023 and restates 2022; 2021 is not touched
+    written = extractor.facts_written
+    assert load(extractor, payload()) == 2
+    assert stored(db, "2022-12-31") == {"Revenues": 1050.0, "NetIncomeLoss": 100.0}
+    assert stored(db, "2023-12-31") == {"Revenues": 1200.0, "NetIncomeLoss": 130.0}
+    assert restatements(db) == [("2022-12-31", "Revenues", 1000.0, FY22, "2023-02-10")]
+    assert ingested(db) == {FY22, FY23}
+    # Unchanged 2022 values are not rewritten: restated revenue plus three 2023 facts
+    assert extractor.facts_written - written == 4
+
+    # Nothing new: skipped without writing
+    written = extractor.facts_written
+    assert load(extractor, payload()) == 0
+    assert extractor.facts_written == written
+    assert db.execute("SELECT COUNT(*) FROM financial_periods").fetchone()[0] == 3
+
+
+def test_process_company_skips_payload_with_no_new_filings(db, extractor, monkeypatch):
+    monkeypatch.setattr(extractor, "fetch_company_facts", lambda cik: payload())
+    assert extractor.process_company_10k("RST", "1", "Restating Inc")
+    assert ingested(db) == {FY22, FY23}
+
+    def fail(*args, **kwargs):
+        raise AssertionError("an up-to-date company was reloaded")
+
+    monkeypatch.setattr(extractor, "load_company_periods", fail)
+    assert extractor.process_company_10k("RST", "1", "Restating Inc")
+
+
+def test_full_reload_rewrites_every_fact(db, extractor):
+    load(extractor, payload())
+    extractor.incremental = False
+    written = extractor.facts_written
+    assert load(extractor, payload()) == 3
+    assert extractor.facts_written - written == 8
+    assert restatements(db) == [("2022-12-31", "Revenues", 1000.0, FY22, "2023-02-10")]
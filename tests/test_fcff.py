@@ -0,0 +1,113 @@
+"""
+FCFF: set-based and per-period paths agree
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import numpy as np
+import pytest
+
+from database import instrumentation
+from database.schema import FinancialDatabaseSchema
+from extraction.sec_extractor import SECEDGARExtractor
+from tests.conftest import add_period
+from valuation.fcff import FCFFCalculator, nwc_change_from_arrays
+
+
+def balance(revenue, current_assets, cash, current_liabilities):
+    return {"Revenues": revenue, "OperatingIncomeLoss": revenue * 0.2,
+            "AssetsCurrent": current_assets, "CashAndCashEquivalents": cash,
+            "LiabilitiesCurrent": current_liabilities}
+
+
+@pytest.fixture
+def duplicate_fiscal_year(db, extractor):
+    """FY2020 has two 10-Ks; the later period_end_date gets the lower id"""
+    company_id = extractor.insert_company("DUP", "1", "Duplicate FY Inc")
+    add_period(extractor, company_id, "2019-12-31", 2019, balance(900, 400, 50, 200))
+    add_period(extractor, company_id, "2020-12-31", 2020, balance(1000, 500, 60, 250))
+    add_period(extractor, company_id, "2020-06-30", 2020, balance(950, 300, 40, 280))
+    add_period(extractor, company_id, "2021-12-31", 2021, balance(1100, 650, 70, 260))
+    return company_id
+
+
+def test_nwc_lag_matches_sql_with_duplicate_fiscal_year(db, duplicate_fiscal_year):
+    calculator = FCFFCalculator(db)
+    history = calculator.repository.company_history([duplicate_fiscal_year])
+    expected = [calculator.nwc_change(period_id) for period_id in history["period_id"].tolist()]
+
+    # Any row order gives the lag NWC_LAG_SQL picks
+    for order in (np.arange(len(expected)), np.arange(len(expected))[::-1]):
+        change, fallback = nwc_change_from_arrays({name: values[order] for name, values in history.items()})
+        assert change.tolist() == [expected[i][0] for i in order]
+        assert fallback.tolist() == [expected[i][1] for i in order]
+
+    fy2021 = history["fiscal_year"].tolist().index(2021)
+    assert expected[fy2021] == ((650 - 70 - 260) - (500 - 60 - 250), False)
+
+
+def test_historical_fcff_matches_per_period(db, duplicate_fiscal_year):
+    calculator = FCFFCalculator(db)
+    records = calculator.calculate_historical_fcff(duplicate_fiscal_year, years=4)
+    for record in records:
+        components = calculator.extract_fcff_components(record["period_id"])
+        expected = calculator.calculate_fcff(record["period_id"], components)
+        for name in ("tax_rate", "nopat", "change_nwc", "nwc_fallback", "fcff"):
+            assert record[name] == pytest.approx(expected[name]), name
+
+
+# Tags feeding FCFF; each is dropped at random so every fallback is exercised
+FCFF_TAGS = ("Revenues", "OperatingIncomeLoss", "IncomeTaxExpenseBenefit", "NetIncomeLoss",
+             "DepreciationDepletionAndAmortization", "DepreciationAndAmortization",
+             "PaymentsForAcquisitionsOfProductiveAssets", "AssetsCurrent",
+             "CashAndCashEquivalents", "LiabilitiesCurrent")
+
+
+def add_universe(extractor, companies: int, years: int, seed: int = 0) -> list:
+    """Companies with random statements, gaps and missing tags, written through the extractor"""
+    rng = np.random.default_rng(seed)
+    company_ids = []
+    for c in range(companies):
+        company_id = extractor.insert_company(f"U{c}", str(100 + c), f"Universe {c}")
+        for year in range(2024 - years, 2024):
+            if rng.random() < 0.1:
+                continue  # missing fiscal year
+            facts = {tag: float(rng.uniform(-50, 1000)) for tag in FCFF_TAGS if rng.random() < 0.85}
+            add_period(extractor, company_id, f"{year}-12-31", year, facts)
+        company_ids.append(company_id)
+    return company_ids
+
+
+def historical_fcff_per_period(calculator: FCFFCalculator, company_id: int, years: int) -> list:
+    """The per-period implementation calculate_historical_fcff replaced"""
+    records = []
+    for period in calculator.get_historical_periods(company_id, years):
+        components = calculator.extract_fcff_components(period["period_id"])
+        records.append({**period, **calculator.calculate_fcff(period["period_id"], components)})
+    return records
+
+
+@pytest.mark.parametrize("years", [1, 3, 8])
+def test_set_based_historical_fcff_equals_per_period(db, extractor, years):
+    company_ids = add_universe(extractor, companies=8, years=8)
+    calculator = FCFFCalculator(db)
+
+    expected = [historical_fcff_per_period(calculator, c, years) for c in company_ids]
+    assert [calculator.calculate_historical_fcff(c, years) for c in company_ids] == expected
+
+    arrays = calculator.historical_fcff_arrays(company_ids, years)
+    assert arrays["fcff"].tolist() == [record["fcff"] for records in expected for record in records]
+
+
+def test_set_based_historical_fcff_query_count_is_constant(tmp_path):
+    conn = instrumentation.connect(tmp_path / "fcff.db")
+    FinancialDatabaseSchema.create_schema(conn)
+    company_ids = add_universe(SECEDGARExtractor(conn), companies=3, years=10)
+    calculator = FCFFCalculator(conn)
+
+    counts = []
+    for years in (2, 10):
+        instrumentation.STATS.reset()
+        calculator.calculate_historical_fcff(company_ids[0], years)
+        counts.append(sum(entry["count"] for entry in instrumentation.STATS.summary()))
+    conn.close()
+    assert counts == [1, 1]  # one repository query whatever the number of years
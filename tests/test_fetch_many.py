@@ -0,0 +1,110 @@
+"""
+Concurrent fetching: rate limit, retries and results against a local stand-in for SEC
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from extraction.rate_limit import TokenBucket, backoff_delay
+from extraction.sec_extractor import SECEDGARExtractor
+
+
+class StandInSEC(BaseHTTPRequestHandler):
+    """Serves /companyfacts/CIK##########.json; every fail_every-th request gets a 503"""
+
+    protocol_version = "HTTP/1.1"
+    latency = 0.02
+    fail_every = 0
+    request_times = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            self.request_times.append(time.monotonic())
+            n = len(self.request_times)
+        time.sleep(self.latency)
+
+        if self.fail_every and n % self.fail_every == 0:
+            self.send_response(503)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        cik = self.path.rsplit("CIK", 1)[-1].split(".")[0]
+        body = json.dumps({"cik": cik}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def sec():
+    StandInSEC.request_times = []
+    StandInSEC.fail_every = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInSEC)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def max_requests_in_window(times, window: float = 1.0) -> int:
+    times = sorted(times)
+    best, lo = 0, 0
+    for hi, t in enumerate(times):
+        while t - times[lo] >= window:
+            lo += 1
+        best = max(best, hi - lo + 1)
+    return best
+
+
+def test_fetch_many_returns_every_cik(db, sec):
+    extractor = SECEDGARExtractor(db, base_url=sec, requests_per_second=200)
+    ciks = [str(cik) for cik in range(1, 31)]
+    results = extractor.fetch_many(ciks, max_workers=8)
+    assert results == {cik: {"cik": cik.zfill(10)} for cik in ciks}
+
+
+def test_fetch_many_respects_rate_limit(db, sec):
+    rate = 20
+    extractor = SECEDGARExtractor(db, base_url=sec, requests_per_second=rate)
+    extractor.fetch_many([str(cik) for cik in range(1, 41)], max_workers=16)
+    # +1: a window can hold the bucket's initial token plus a full second of refill
+    assert max_requests_in_window(StandInSEC.request_times) <= rate + 1
+
+
+def test_fetch_many_retries_server_errors(db, sec):
+    StandInSEC.fail_every = 3
+    extractor = SECEDGARExtractor(db, base_url=sec, requests_per_second=200)
+    ciks = [str(cik) for cik in range(1, 21)]
+    results = extractor.fetch_many(ciks, max_workers=4)
+    assert all(results[cik] == {"cik": cik.zfill(10)} for cik in ciks)
+    assert len(StandInSEC.request_times) > len(ciks)
+
+
+def test_token_bucket_spaces_requests():
+    bucket = TokenBucket(rate=50)
+    start = time.monotonic()
+    for _ in range(11):
+        bucket.acquire()
+    # The first token is available immediately, the next ten take 1/50 s each
+    assert time.monotonic() - start >= 10 / 50 * 0.95
+
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_backoff_delay_is_capped():
+    assert all(0 <= backoff_delay(attempt, base=0.5, cap=2.0) <= min(2.0, 0.5 * 2 ** attempt)
+               for attempt in range(10) for _ in range(20))
@@ -0,0 +1,81 @@
+"""
+Growth analysis: single-company path and one-pass estimates agree
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from tests.conftest import add_period
+from valuation.fcff import FCFFCalculator
+from valuation.growth import DISPERSION_COLUMNS, GROWTH_METHODS, GrowthAnalyzer
+
+
+@pytest.fixture
+def grower(extractor):
+    """Revenue, EBIT and FCFF growing 10% a year"""
+    company_id = extractor.insert_company("GRW", "7", "Grower Inc")
+    for i, year in enumerate(range(2019, 2024)):
+        scale = 1.1 ** i
+        add_period(extractor, company_id, f"{year}-12-31", year, {
+            "Revenues": 1000 * scale, "OperatingIncomeLoss": 200 * scale,
+            "IncomeTaxExpenseBenefit": 40 * scale, "NetIncomeLoss": 160 * scale,
+            "AssetsCurrent": 100 * scale, "CashAndCashEquivalents": 10 * scale,
+            "LiabilitiesCurrent": 50 * scale,
+        })
+    return company_id
+
+
+def test_historical_records_carry_revenue(db, grower):
+    records = FCFFCalculator(db).calculate_historical_fcff(grower, years=5)
+    assert [record["revenue"] for record in records] == pytest.approx([1000 * 1.1 ** i for i in range(5)])
+
+
+def test_single_company_estimates_match_one_pass(db, grower):
+    calculator = FCFFCalculator(db)
+    analysis = calculator.calculate_fcff_growth_rate(calculator.calculate_historical_fcff(grower, years=5))
+    assert analysis["estimates"]["revenue_cagr"] == pytest.approx(0.10)
+    assert analysis["dispersion"]["methods"] == len(GROWTH_METHODS)
+
+    results = GrowthAnalyzer(db).analyze([grower], years=5)
+    for method in GROWTH_METHODS:
+        assert analysis["estimates"][method] == pytest.approx(results[method][0]), method
+
+
+@pytest.mark.parametrize("fcff, method", [
+    ([], "default"),
+    ([100.0], "default"),
+    ([-5.0, 10.0, -3.0], "default"),
+    ([100.0, 110.0, 121.0], "historical_cagr"),
+])
+def test_growth_rate_returns_the_same_keys_on_every_path(db, fcff, method):
+    records = [{"fiscal_year": 2020 + i, "fcff": value} for i, value in enumerate(fcff)]
+    analysis = FCFFCalculator(db).calculate_fcff_growth_rate(records)
+
+    assert analysis["method"] == method
+    assert set(analysis) == {"growth_rate", "method", "years_analyzed", "cagr", "fcff_values",
+                             "estimates", "dispersion"}
+    assert set(analysis["estimates"]) == set(GROWTH_METHODS)
+    assert set(analysis["dispersion"]) == set(DISPERSION_COLUMNS)
+    if method == "default":
+        assert math.isnan(analysis["estimates"]["cagr"]) and math.isnan(analysis["dispersion"]["spread"])
+    else:
+        assert analysis["cagr"] == pytest.approx(0.10)
+        assert np.isnan(analysis["estimates"]["revenue_cagr"])  # records without revenue
+
+
+@pytest.mark.parametrize("records, years", [
+    ([(2019, 100.0), (2020, 110.0), (2023, 146.41)], 4),             # missing fiscal years
+    ([(2019, -5.0), (2020, 100.0), (2021, -3.0), (2022, 121.0)], 2),  # non-positive ends and middle
+    ([(2020, 100.0), (2021, -1.0)], 0),
+])
+def test_years_analyzed_is_the_cagr_span(db, records, years):
+    analysis = FCFFCalculator(db).calculate_fcff_growth_rate(
+        [{"fiscal_year": year, "fcff": value} for year, value in records]
+    )
+    assert analysis["years_analyzed"] == years
+    if years:
+        positive = [value for _, value in records if value > 0]
+        assert analysis["cagr"] == pytest.approx((positive[-1] / positive[0]) ** (1 / years) - 1)
@@ -0,0 +1,177 @@
+"""
+Company facts cache: TTL, 304 revalidation, offline mode, LRU eviction, crash safety
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import gzip
+import json
+import os
+
+import pytest
+import requests
+
+from extraction.http_cache import CompanyFactsCache
+from extraction.sec_extractor import SECEDGARExtractor
+
+CIK = "0000000042"
+
+
+class StubResponse:
+    def __init__(self, status_code: int, payload=None, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = json.dumps(payload).encode() if payload is not None else b""
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, size):
+        for start in range(0, len(self.content), size):
+            yield self.content[start:start + size]
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"HTTP {self.status_code}")
+
+
+class StubSession:
+    """Answers GETs from a queue of responses and records the request headers"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None, stream=False):
+        self.requests.append(dict(headers or {}))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CompanyFactsCache(tmp_path / "cache", ttl_seconds=3600)
+
+
+def extractor_with(db, cache, *responses) -> SECEDGARExtractor:
+    extractor = SECEDGARExtractor(db, cache=cache, requests_per_second=1000)
+    extractor.session = StubSession(*responses)
+    return extractor
+
+
+def expire(cache, cik=CIK):
+    meta_path = cache._meta_path(cik)
+    meta = json.loads(meta_path.read_text())
+    meta["fetched_at"] -= cache.ttl_seconds + 1
+    meta_path.write_text(json.dumps(meta))
+
+
+def test_fresh_entry_is_served_without_a_request(db, cache):
+    extractor = extractor_with(db, cache, StubResponse(200, {"v": 1}, {"ETag": '"a"'}))
+    assert extractor.fetch_company_facts(CIK) == {"v": 1}
+    assert extractor.fetch_company_facts(CIK) == {"v": 1}
+    assert len(extractor.session.requests) == 1
+    assert cache.lookup(CIK)["etag"] == '"a"'
+
+
+def test_expired_entry_is_revalidated_with_a_304(db, cache):
+    extractor = extractor_with(db, cache,
+                               StubResponse(200, {"v": 1}, {"ETag": '"a"', "Last-Modified": "Mon"}),
+                               StubResponse(304))
+    extractor.fetch_company_facts(CIK)
+    expire(cache)
+    assert not cache.is_fresh(cache.lookup(CIK))
+
+    assert extractor.fetch_company_facts(CIK) == {"v": 1}
+    assert extractor.session.requests[1] == {"If-None-Match": '"a"', "If-Modified-Since": "Mon"}
+    meta = cache.lookup(CIK)
+    assert cache.is_fresh(meta) and meta["etag"] == '"a"' and meta["last_modified"] == "Mon"
+
+
+def test_expired_entry_is_replaced_on_a_200(db, cache):
+    extractor = extractor_with(db, cache, StubResponse(200, {"v": 1}, {"ETag": '"a"'}),
+                               StubResponse(200, {"v": 2}, {"ETag": '"b"'}))
+    extractor.fetch_company_facts(CIK)
+    expire(cache)
+    assert extractor.fetch_company_facts(CIK) == {"v": 2}
+    assert cache.load(CIK) == {"v": 2} and cache.lookup(CIK)["etag"] == '"b"'
+
+
+def test_stale_entry_is_served_when_the_network_fails(db, cache):
+    extractor = extractor_with(db, cache, StubResponse(200, {"v": 1}),
+                               requests.exceptions.ConnectionError("down"))
+    extractor.MAX_RETRIES = 0
+    extractor.fetch_company_facts(CIK)
+    expire(cache)
+    assert extractor.fetch_company_facts(CIK) == {"v": 1}
+
+
+def test_offline_mode_serves_stale_entries_and_never_requests(db, cache, tmp_path):
+    cache.store(CIK, b'{"v": 1}', {})
+    expire(cache)
+    offline = CompanyFactsCache(cache.cache_dir, ttl_seconds=3600, offline=True)
+    extractor = extractor_with(db, offline)
+
+    assert extractor.fetch_company_facts(CIK) == {"v": 1}
+    assert extractor.fetch_company_facts("7") is None
+    assert extractor.session.requests == []
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    body = os.urandom(4000)  # incompressible
+    for cik in ("1", "2", "3"):
+        cache.store(cik, body, {})
+    for age, cik in ((300, "1"), (200, "2"), (100, "3")):
+        path = cache._body_path(cik)
+        os.utime(path, (path.stat().st_atime - age, path.stat().st_mtime - age))
+    cache.open("1").close()  # reading refreshes the access time
+
+    size = cache._body_path("1").stat().st_size
+    cache.max_bytes = 3 * size
+    cache.store("4", body, {})
+    assert [cache.lookup(cik) is not None for cik in ("1", "2", "3", "4")] == [True, False, True, True]
+    assert not cache._meta_path("2").exists()
+
+
+def test_failed_stream_leaves_no_temporary_file_and_keeps_the_old_entry(cache):
+    cache.store(CIK, b'{"v": 1}', {"ETag": '"a"'})
+
+    def chunks():
+        yield b'{"v": '
+        raise ConnectionError("connection reset")
+
+    with pytest.raises(ConnectionError):
+        cache.store_stream(CIK, chunks(), {"ETag": '"b"'})
+    assert sorted(p.name for p in cache.cache_dir.iterdir()) == [f"CIK{CIK}.json.gz", f"CIK{CIK}.meta.json"]
+    assert cache.load(CIK) == {"v": 1} and cache.lookup(CIK)["etag"] == '"a"'
+
+
+def test_failed_metadata_write_keeps_the_old_metadata(cache, monkeypatch):
+    cache.store(CIK, b'{"v": 1}', {"ETag": '"a"'})
+
+    def crash(meta, f):
+        f.write('{"cik": "00')
+        raise OSError("disk full")
+
+    monkeypatch.setattr("extraction.http_cache.json.dump", crash)
+    with pytest.raises(OSError):
+        cache.mark_revalidated(CIK, {"ETag": '"b"'})
+    monkeypatch.undo()
+    assert cache.lookup(CIK)["etag"] == '"a"'
+    assert not [p for p in cache.cache_dir.iterdir() if p.suffix == ".tmp"]
+
+
+def test_body_without_matching_metadata_is_a_miss(cache):
+    cache.store(CIK, b'{"v": 1}', {"ETag": '"a"'})
+    # A crash after the new body was renamed in, before its metadata
+    with gzip.open(cache._body_path(CIK), "wb") as f:
+        f.write(b'{"v": 2, "padding": "' + b"x" * 1000 + b'"}')
+    assert cache.lookup(CIK) is None
+
+
+def test_corrupt_body_is_discarded(cache):
+    cache.store(CIK, b'{"v": 1}', {})
+    cache._body_path(CIK).write_bytes(b"not gzip")
+    assert cache.load(CIK) is None
+    assert not cache._body_path(CIK).exists() and not cache._meta_path(CIK).exists()
@@ -0,0 +1,106 @@
+"""
+Query instrumentation: counts, bounded percentiles and slow-plan capture
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import numpy as np
+import pytest
+
+from database import instrumentation
+from database.instrumentation import QueryStats, normalize_sql
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    """The process-wide STATS, empty and restored afterwards"""
+    instrumentation.STATS.reset()
+    monkeypatch.setattr(instrumentation.STATS, "slow_ms", 1e9)
+    yield instrumentation.STATS
+    instrumentation.STATS.reset()
+
+
+@pytest.fixture
+def conn(stats):
+    conn = instrumentation.connect(":memory:")
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, x REAL)")
+    conn.executemany("INSERT INTO t (x) VALUES (?)", [(float(i),) for i in range(100)])
+    stats.reset()
+    yield conn
+    conn.close()
+
+
+def by_sql(stats) -> dict:
+    return {entry["sql"]: entry for entry in stats.summary()}
+
+
+def test_normalize_sql_folds_whitespace_and_placeholder_lists():
+    assert normalize_sql("SELECT *\n  FROM t WHERE id IN (?, ?,?)") == "SELECT * FROM t WHERE id IN (?, ...)"
+
+
+def test_counts_and_rows_per_statement(conn, stats):
+    for i in range(5):
+        conn.execute("SELECT x FROM t WHERE id <= ?", (10,)).fetchall()
+    for row in conn.execute("SELECT x FROM t"):
+        pass
+    cursor = conn.cursor()
+    cursor.execute("SELECT x FROM t WHERE id IN (?, ?, ?)", (1, 2, 3))
+    cursor.fetchmany(2)
+    cursor.fetchmany(2)
+    conn.execute("UPDATE t SET x = 0 WHERE id = ?", (1,))
+
+    summary = by_sql(stats)
+    assert summary["SELECT x FROM t WHERE id <= ?"]["count"] == 5
+    assert summary["SELECT x FROM t WHERE id <= ?"]["rows"] == 50
+    assert summary["SELECT x FROM t"]["rows"] == 100
+    assert summary["SELECT x FROM t WHERE id IN (?, ...)"]["rows"] == 3
+    assert summary["UPDATE t SET x = 0 WHERE id = ?"]["count"] == 1
+    assert all(entry["p50"] <= entry["p95"] <= entry["p99"] <= entry["max"] for entry in summary.values())
+
+
+def test_percentiles_are_exact_below_the_reservoir_size():
+    stats = QueryStats(slow_ms=1e9, reservoir_size=1000)
+    latencies = np.random.default_rng(0).exponential(0.001, 500)
+    for seconds in latencies:
+        stats.record("q", float(seconds), 1)
+
+    entry = stats.summary()[0]
+    assert entry["count"] == 500 and entry["rows"] == 500
+    assert entry["total"] == pytest.approx(latencies.sum())
+    assert entry["max"] == latencies.max()
+    assert [entry["p50"], entry["p95"], entry["p99"]] == pytest.approx(np.percentile(latencies, [50, 95, 99]))
+
+
+def test_memory_is_bounded_and_percentiles_stay_close():
+    stats = QueryStats(slow_ms=1e9, reservoir_size=512)
+    latencies = np.random.default_rng(1).uniform(0, 0.01, 50_000)
+    for seconds in latencies:
+        stats.record("q", float(seconds), 0)
+
+    assert len(stats.latencies["q"]) == 512
+    entry = stats.summary()[0]
+    assert entry["count"] == 50_000
+    assert entry["total"] == pytest.approx(latencies.sum())
+    assert entry["mean"] == pytest.approx(latencies.mean())
+    assert entry["max"] == latencies.max()
+    assert entry["p50"] == pytest.approx(0.005, abs=0.001)
+    assert entry["p95"] == pytest.approx(0.0095, abs=0.0005)
+
+
+def test_slow_statements_capture_one_plan(conn, stats):
+    stats.slow_ms = 0.0
+    for _ in range(3):
+        conn.execute("SELECT x FROM t WHERE id = ?", (5,)).fetchall()
+    conn.execute("SELECT x FROM t WHERE x > ?", (50.0,)).fetchall()
+
+    assert stats.plans["SELECT x FROM t WHERE id = ?"] == ["SEARCH t USING INTEGER PRIMARY KEY (rowid=?)"]
+    assert stats.plans["SELECT x FROM t WHERE x > ?"] == ["SCAN t"]
+    assert stats.record("SELECT x FROM t WHERE id = ?", 1.0, 0) is False  # plan already captured
+
+    report = stats.report()
+    assert "Statements slower than 0 ms:" in report and "SCAN t" in report
+
+
+def test_fast_statements_capture_no_plan(conn, stats):
+    conn.execute("SELECT x FROM t WHERE id = ?", (5,)).fetchall()
+    assert stats.plans == {}
+    assert "Statements slower" not in stats.report()
@@ -0,0 +1,124 @@
+"""
+In-memory mode: per-thread connections, write-back that leaves file connections open
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from database.connection import get_manager
+from database.memory import InMemoryDatabase
+from database.schema import FinancialDatabaseSchema
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    """A WAL database file with one company"""
+    path = tmp_path / "financial.db"
+    conn = get_manager(path).connection()
+    FinancialDatabaseSchema.create_schema(conn)
+    conn.execute("INSERT INTO companies (ticker, cik, company_name) VALUES ('A', '1', 'A Inc')")
+    conn.commit()
+    yield path
+    get_manager(path).close_all()
+
+
+def in_thread(target):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(target()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def tickers(conn) -> list:
+    return [row[0] for row in conn.execute("SELECT ticker FROM companies ORDER BY ticker")]
+
+
+def test_load_modify_save_reopen(db_file):
+    with InMemoryDatabase(db_file, write_back=True) as conn:
+        assert tickers(conn) == ["A"]
+        conn.execute("INSERT INTO companies (ticker, cik, company_name) VALUES ('B', '2', 'B Inc')")
+        assert tickers(sqlite3.connect(db_file)) == ["A"]  # the file is untouched until save
+    assert FinancialDatabaseSchema._memory_database is None
+
+    reopened = sqlite3.connect(db_file)
+    assert tickers(reopened) == ["A", "B"]
+    assert reopened.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert reopened.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    reopened.close()
+
+
+def test_save_to_a_new_file(db_file, tmp_path):
+    database = InMemoryDatabase(db_file)
+    database.load()
+    database.save(tmp_path / "copy" / "financial.db")
+    database.close()
+    assert tickers(sqlite3.connect(tmp_path / "copy" / "financial.db")) == ["A"]
+
+
+def test_failed_block_is_not_written_back(db_file):
+    with pytest.raises(RuntimeError):
+        with InMemoryDatabase(db_file, write_back=True) as conn:
+            conn.execute("DELETE FROM companies")
+            raise RuntimeError("batch failed")
+    assert tickers(sqlite3.connect(db_file)) == ["A"]
+
+
+def test_save_keeps_other_threads_file_connections_open(db_file):
+    reader_ready, saved, checked = threading.Event(), threading.Event(), threading.Event()
+    seen = {}
+
+    def file_reader():
+        conn = get_manager(db_file).read_connection()
+        seen["before"] = tickers(conn)
+        reader_ready.set()
+        saved.wait()
+        seen["open"] = conn.is_open
+        seen["after"] = tickers(conn)
+        checked.set()
+
+    thread = threading.Thread(target=file_reader)
+    thread.start()
+    reader_ready.wait(10)
+    try:
+        with InMemoryDatabase(db_file, write_back=True) as conn:
+            conn.execute("INSERT INTO companies (ticker, cik, company_name) VALUES ('C', '3', 'C Inc')")
+    finally:
+        saved.set()
+    checked.wait(10)
+    thread.join()
+    assert seen == {"before": ["A"], "open": True, "after": ["A", "C"]}
+
+
+def test_each_thread_gets_its_own_connection(db_file):
+    with InMemoryDatabase(db_file) as conn:
+        assert FinancialDatabaseSchema.get_connection() is conn
+        assert FinancialDatabaseSchema.get_read_connection() is conn
+
+        def write():
+            own = FinancialDatabaseSchema.get_connection()
+            own.execute("INSERT INTO companies (ticker, cik, company_name) VALUES ('T', '9', 'T Inc')")
+            own.commit()
+            return own
+
+        other = in_thread(write)
+        assert other is not conn and not other.is_open  # released when its thread exited
+        assert tickers(conn) == ["A", "T"]
+
+
+def test_uncommitted_writes_stay_private_to_their_thread(db_file):
+    with InMemoryDatabase(db_file) as conn:
+        conn.execute("UPDATE companies SET company_name = 'Renamed'")
+        conn.rollback()
+
+        def rename():
+            own = FinancialDatabaseSchema.get_connection()
+            own.execute("UPDATE companies SET company_name = 'Other thread'")
+            own.rollback()
+            return own.execute("SELECT company_name FROM companies").fetchone()[0]
+
+        assert in_thread(rename) == "A Inc"
+        assert conn.execute("SELECT company_name FROM companies").fetchone()[0] == "A Inc"
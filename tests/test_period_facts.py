@@ -0,0 +1,118 @@
+"""
+period_facts: kept current for direct writers; zero depreciation fallback
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import random
+import sqlite3
+
+import pytest
+
+from database.period_facts import deferred_refresh, get_period_facts, refresh_period_facts
+from database.schema import FinancialDatabaseSchema
+from database.xbrl_classifier import get_tag_classifier
+from extraction.sec_extractor import SECEDGARExtractor
+from tests.conftest import add_period
+
+
+@pytest.fixture(params=[False, True], ids=["tables", "compact"])
+def storage(request):
+    conn = sqlite3.connect(":memory:")
+    FinancialDatabaseSchema.create_schema(conn, compact=request.param)
+    conn.execute("INSERT INTO companies (ticker, cik, company_name) VALUES ('T', '1', 'T Inc')")
+    conn.executemany("""
+        INSERT INTO financial_periods (company_id, period_end_date, fiscal_year, filing_type, filing_date)
+        VALUES (1, ?, ?, '10-K', ?)
+    """, [(f"{year}-12-31", year, f"{year + 1}-02-15") for year in range(2018, 2024)])
+    yield conn
+    conn.close()
+
+
+def period_facts(conn) -> list:
+    return conn.execute("SELECT * FROM period_facts ORDER BY period_id").fetchall()
+
+
+def without_timestamps(rows) -> list:
+    return [row[:-1] for row in rows]
+
+
+def test_direct_writes_match_full_refresh(storage):
+    classifier = get_tag_classifier()
+    tags = [(tag, *classifier.classify(tag)) for tag in classifier.tags]
+    tables = {"INCOME": "income_statement", "BALANCE_SHEET": "balance_sheet",
+              "CASH_FLOW": "cash_flow_statement"}
+    rng = random.Random(0)
+
+    for _ in range(400):
+        period_id = rng.randint(1, 6)
+        tag, statement_type, line_item = rng.choice(tags)
+        table = tables[statement_type]
+        operation = rng.random()
+        if operation < 0.6:
+            storage.execute(f"DELETE FROM {table} WHERE period_id = ? AND xbrl_tag = ?", (period_id, tag))
+            storage.execute(f"""
+                INSERT INTO {table} (period_id, line_item, xbrl_tag, value) VALUES (?, ?, ?, ?)
+            """, (period_id, line_item, tag, rng.choice([0.0, rng.uniform(-1e9, 1e9)])))
+        elif operation < 0.8:
+            storage.execute(f"UPDATE {table} SET value = ? WHERE period_id = ? AND xbrl_tag = ?",
+                            (rng.uniform(0, 1e9), period_id, tag))
+        elif operation < 0.9:
+            storage.execute(f"DELETE FROM {table} WHERE period_id = ? AND xbrl_tag = ?", (period_id, tag))
+        else:
+            storage.execute("INSERT INTO shares_outstanding (period_id, shares_outstanding) VALUES (?, ?)",
+                            (period_id, rng.uniform(1e6, 1e9)))
+    storage.commit()
+
+    maintained = period_facts(storage)
+    assert any(row[4] is not None for row in maintained)
+    refresh_period_facts(storage)
+    assert without_timestamps(maintained) == without_timestamps(period_facts(storage))
+
+
+def test_period_rows_follow_financial_periods(storage):
+    assert storage.execute("SELECT COUNT(*) FROM period_facts").fetchone()[0] == 6
+    storage.execute("UPDATE financial_periods SET fiscal_year = 2030 WHERE id = 1")
+    storage.execute("DELETE FROM financial_periods WHERE id = 6")
+    assert storage.execute("SELECT period_id, fiscal_year FROM period_facts WHERE period_id IN (1, 6)") \
+        .fetchall() == [(1, 2030)]
+
+
+def test_deferred_refresh_leaves_rows_to_the_caller(storage):
+    with deferred_refresh(storage):
+        storage.execute("""
+            INSERT INTO income_statement (period_id, line_item, xbrl_tag, value)
+            VALUES (1, 'OperatingIncome', 'OperatingIncomeLoss', 5.0)
+        """)
+    assert "ebit" not in get_period_facts(storage.cursor(), 1)
+    refresh_period_facts(storage, [1])
+    assert get_period_facts(storage.cursor(), 1)["ebit"] == 5.0
+    assert storage.execute("SELECT COUNT(*) FROM period_facts_deferred").fetchone()[0] == 0
+
+
+def test_deferral_is_invisible_to_other_connections(tmp_path):
+    path = tmp_path / "shared.db"
+    writer = sqlite3.connect(path)
+    FinancialDatabaseSchema.create_schema(writer)
+    extractor = SECEDGARExtractor(writer)
+    company_id = extractor.insert_company("T", "1", "T Inc")
+    period_id = add_period(extractor, company_id, "2023-12-31", 2023, {"OperatingIncomeLoss": 1.0})
+
+    # The extractor commits; the marker row never does
+    other = sqlite3.connect(path)
+    other.execute("UPDATE income_statement SET value = 2.0 WHERE period_id = ?", (period_id,))
+    other.commit()
+    assert get_period_facts(writer.cursor(), period_id)["ebit"] == 2.0
+    writer.close()
+    other.close()
+
+
+@pytest.mark.parametrize("facts, expected", [
+    ({"DepreciationDepletionAndAmortization": 0.0, "DepreciationAndAmortization": 40.0}, 40.0),
+    ({"DepreciationDepletionAndAmortization": 25.0, "DepreciationAndAmortization": 40.0}, 25.0),
+    ({"DepreciationDepletionAndAmortization": 0.0}, 0.0),
+    ({"DepreciationAndAmortization": 40.0}, 40.0),
+])
+def test_zero_depreciation_falls_back(extractor, facts, expected):
+    company_id = extractor.insert_company("DA", "2", "Depreciation Inc")
+    period_id = add_period(extractor, company_id, "2023-12-31", 2023, facts)
+    assert get_period_facts(extractor.cursor, period_id)["da"] == expected
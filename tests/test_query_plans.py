@@ -0,0 +1,70 @@
+"""
+Query plans: every HOT_QUERIES entry is served by an index
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import sqlite3
+
+import pytest
+
+from database.schema import FinancialDatabaseSchema
+
+# Statement-table reads answered from the covering index alone
+COVERING_INDEXES = {
+    "historical_periods": "idx_financial_periods_company_form_year",
+    "income_statement_by_period": "idx_income_statement_period_tag_value",
+    "balance_sheet_by_period": "idx_balance_sheet_period_tag_value",
+    "cash_flow_by_period": "idx_cash_flow_statement_period_tag_value",
+    "balance_sheet_by_tags": "idx_balance_sheet_period_tag_value",
+}
+
+
+def fresh(compact: bool = False) -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    FinancialDatabaseSchema.create_schema(conn, compact=compact)
+    return conn
+
+
+def migrated() -> sqlite3.Connection:
+    """A database that predates schema_version, upgraded in place"""
+    conn = sqlite3.connect(":memory:")
+    for statement in FinancialDatabaseSchema.CREATE_STATEMENTS.values():
+        conn.execute(statement)
+    FinancialDatabaseSchema.migrate(conn)
+    return conn
+
+
+def plan(conn: sqlite3.Connection, name: str) -> list:
+    sql, params = FinancialDatabaseSchema.HOT_QUERIES[name]
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+@pytest.fixture(params=["fresh", "compact", "migrated"])
+def conn(request):
+    conn = {"fresh": fresh, "compact": lambda: fresh(compact=True), "migrated": migrated}[request.param]()
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("name", list(FinancialDatabaseSchema.HOT_QUERIES))
+def test_hot_query_searches_an_index(conn, name):
+    steps = plan(conn, name)
+    assert steps and all(step.startswith("SEARCH") and "TEMP B-TREE" not in step for step in steps), steps
+
+
+@pytest.mark.parametrize("builder", [fresh, migrated], ids=["fresh", "migrated"])
+@pytest.mark.parametrize("name, index", list(COVERING_INDEXES.items()))
+def test_statement_reads_use_covering_index(builder, name, index):
+    conn = builder()
+    assert any(f"COVERING INDEX {index}" in step for step in plan(conn, name)), plan(conn, name)
+    conn.close()
+
+
+def test_check_query_plans_reports_scans():
+    conn = sqlite3.connect(":memory:")
+    for statement in FinancialDatabaseSchema.CREATE_STATEMENTS.values():
+        conn.execute(statement)
+    assert "validation_log_by_period" in FinancialDatabaseSchema.check_query_plans(conn)
+    FinancialDatabaseSchema.migrate(conn)
+    assert FinancialDatabaseSchema.check_query_plans(conn) == {}
+    conn.close()
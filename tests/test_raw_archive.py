@@ -0,0 +1,52 @@
+"""
+Rebuilding the database from the raw facts archive
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+from benchmarks.synthetic import make_company_facts
+from extraction.raw_archive import RawFactsArchive
+from extraction.sec_extractor import SECEDGARExtractor
+
+STATEMENT_TABLES = ("income_statement", "balance_sheet", "cash_flow_statement")
+
+
+class ArchivingExtractor(SECEDGARExtractor):
+    """Extractor serving a fixed payload instead of calling SEC"""
+
+    def __init__(self, db, archive, payload):
+        super().__init__(db, archive=archive)
+        self.payload = payload
+
+    def fetch_company_facts(self, cik: str) -> dict:
+        return self.payload
+
+
+def snapshot(db) -> dict:
+    tables = {table: sorted(db.execute(f"SELECT period_id, xbrl_tag, value FROM {table}"))
+              for table in STATEMENT_TABLES}
+    tables["period_facts"] = sorted(db.execute("SELECT period_id, revenue, ebit, cash FROM period_facts"))
+    return tables
+
+
+def test_rebuild_drops_rows_no_longer_derived(db, tmp_path):
+    archive = RawFactsArchive(tmp_path / "archive")
+    extractor = ArchivingExtractor(db, archive, make_company_facts(1, years=3, extra_tags=5))
+    assert extractor.process_company_10k("T1", "1", "Company 1")
+    expected = snapshot(db)
+
+    # Rows a since-changed classification would no longer produce: an
+    # unmapped tag, and a tag stored in the wrong statement table
+    period_id = db.execute("SELECT MIN(id) FROM financial_periods").fetchone()[0]
+    db.executemany("INSERT INTO balance_sheet (period_id, line_item, xbrl_tag, value, unit) "
+                   "VALUES (?, ?, ?, ?, 'USD')",
+                   [(period_id, "Stale", "NoLongerMappedTag", 1.0),
+                    (period_id, "Revenue", "Revenues", 999.0)])
+    db.execute("UPDATE period_facts SET revenue = 999 WHERE period_id = ?", (period_id,))
+    db.commit()
+
+    stats = archive.rebuild_database(db)
+
+    assert snapshot(db) == expected
+    assert stats["facts"] == sum(len(rows) for table, rows in expected.items()
+                                 if table in STATEMENT_TABLES)
+    assert stats["archived_facts"] >= stats["facts"]
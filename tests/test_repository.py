@@ -0,0 +1,92 @@
+"""
+Fundamentals repository: per-company year limits and (company x year) matrices
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import numpy as np
+import pytest
+
+from database.repository import FUNDAMENTAL_COLUMNS, KEY_COLUMNS, FundamentalsRepository
+from tests.conftest import add_period
+
+
+@pytest.fixture
+def companies(db, extractor):
+    """Companies with different history lengths, a duplicate fiscal year, a 10-Q and no periods"""
+    long_id = extractor.insert_company("LONG", "1", "Long History Inc")
+    for year in range(2010, 2024):
+        add_period(extractor, long_id, f"{year}-12-31", year, {"Revenues": float(year)})
+    add_period(extractor, long_id, "2023-09-30", 2023, {"Revenues": 1.0}, filing_type="10-Q")
+
+    short_id = extractor.insert_company("SHORT", "2", "Short History Inc")
+    add_period(extractor, short_id, "2022-12-31", 2022, {"Revenues": 22.0})
+    # Two 10-Ks in FY2023 (a changed year end); the later period end is the latest
+    add_period(extractor, short_id, "2023-12-31", 2023, {"Revenues": 23.0, "Assets": 5.0})
+    add_period(extractor, short_id, "2023-06-30", 2023, {"Revenues": 21.0})
+    # A period with no facts has no period_facts row
+    extractor.insert_financial_period(short_id, "2021-12-31", 2021, "10-K", "2-2021")
+    db.commit()
+
+    empty_id = extractor.insert_company("EMPTY", "3", "No Filings Inc")
+    return long_id, short_id, empty_id
+
+
+def latest_periods(db, company_id: int, years, filing_type: str = "10-K") -> list:
+    """Per-company reference: the most recent `years` periods, returned oldest first"""
+    rows = db.execute("""
+        SELECT id, fiscal_year, period_end_date FROM financial_periods
+        WHERE company_id = ? AND filing_type = ?
+        ORDER BY fiscal_year DESC, period_end_date DESC, id DESC
+    """, (company_id, filing_type)).fetchall()
+    return [row[0] for row in reversed(rows[:years] if years is not None else rows)]
+
+
+@pytest.mark.parametrize("years", [None, 1, 2, 3, 5, 20])
+def test_history_limit_applies_per_company(db, companies, years):
+    history = FundamentalsRepository(db).company_history(companies, years=years)
+    assert set(history) == {*KEY_COLUMNS, *FUNDAMENTAL_COLUMNS}
+
+    expected = [(company_id, period_id) for company_id in sorted(companies)
+                for period_id in latest_periods(db, company_id, years)]
+    assert list(zip(history["company_id"].tolist(), history["period_id"].tolist())) == expected
+    assert all(len(values) == len(expected) for values in history.values())
+
+
+def test_history_reads_period_facts_and_filing_type(db, companies):
+    long_id, short_id, _ = companies
+    repository = FundamentalsRepository(db)
+
+    history = repository.company_history(short_id)
+    assert history["period_end_date"].tolist() == ["2021-12-31", "2022-12-31", "2023-06-30", "2023-12-31"]
+    assert np.isnan(history["revenue"][0])
+    assert history["revenue"][1:].tolist() == [22.0, 21.0, 23.0]
+
+    quarterly = repository.company_history([long_id], filing_type="10-Q")
+    assert quarterly["revenue"].tolist() == [1.0]
+    assert repository.company_history([]).keys() == history.keys()
+    assert len(repository.company_history([]).get("period_id")) == 0
+
+
+def test_matrix_aligns_companies_and_fiscal_years(db, companies):
+    long_id, short_id, empty_id = companies
+    # Rows follow the requested order, not company id order
+    matrix = FundamentalsRepository(db).company_history_matrix([short_id, empty_id, long_id], years=3)
+
+    assert matrix["company_ids"].tolist() == [short_id, empty_id, long_id]
+    assert matrix["fiscal_years"].tolist() == [2021, 2022, 2023]
+    # SHORT's latest three periods are FY2022 plus both FY2023 periods, so FY2021 is cut
+    revenue = matrix["revenue"]
+    assert np.isnan(revenue[0, 0]) and matrix["period_id"][0, 0] == -1
+    assert revenue[0, 1:].tolist() == [22.0, 23.0]
+    assert matrix["total_assets"][0, 2] == 5.0
+    assert np.isnan(revenue[1]).all() and (matrix["period_id"][1] == -1).all()
+    assert revenue[2].tolist() == [2021.0, 2022.0, 2023.0]
+
+    for column in FUNDAMENTAL_COLUMNS:
+        assert matrix[column].shape == (3, 3)
+
+
+def test_matrix_without_periods(db, companies):
+    matrix = FundamentalsRepository(db).company_history_matrix([companies[2]])
+    assert matrix["fiscal_years"].size == 0
+    assert matrix["revenue"].shape == (1, 0)
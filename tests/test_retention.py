@@ -0,0 +1,65 @@
+"""
+Retention: UTC cutoffs and archive checksums covering the data files
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import warnings
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from database.retention import apply_retention, archive_checksum
+from database.snapshot import Snapshot
+
+NOW = datetime(2024, 6, 30, 12, 0, 0)
+
+
+@pytest.fixture
+def audit_log(db):
+    """validation_log runs for one period, 1 to 200 days old at NOW"""
+    db.executemany("""
+        INSERT INTO validation_log (period_id, check_name, passed, check_date)
+        VALUES (1, 'BS', 1, ?)
+    """, [((NOW - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S"),) for days in (200, 150, 100, 1)])
+    db.commit()
+    return db
+
+
+def test_checksum_covers_data_files(audit_log, tmp_path):
+    archived = apply_retention(audit_log, archive_dir=tmp_path, now=NOW)
+    assert archived["validation_log"] == 3
+
+    path, checksum = audit_log.execute(
+        "SELECT archive_path, archive_sha256 FROM retention_runs WHERE table_name = 'validation_log'"
+    ).fetchone()
+    assert checksum == archive_checksum(path)
+    assert len(Snapshot(path).column("validation_log", "id")) == 3
+
+    data = next(p for p in tmp_path.rglob("validation_log.npz"))
+    data.write_bytes(data.read_bytes() + b"tampered")
+    assert archive_checksum(path) != checksum
+
+
+def test_aware_reference_time_is_converted_to_utc(db, tmp_path):
+    # An hour either side of the 90-day cutoff, plus each period's latest run (always kept)
+    stamps = [(1, NOW - timedelta(days=90, hours=1)), (2, NOW - timedelta(days=90, hours=-1)),
+              (1, NOW), (2, NOW)]
+    db.executemany("INSERT INTO validation_log (period_id, check_name, passed, check_date) VALUES (?, 'BS', 1, ?)",
+                   [(period_id, stamp.strftime("%Y-%m-%d %H:%M:%S")) for period_id, stamp in stamps])
+    db.commit()
+
+    # 14:00 at UTC+2 is NOW in UTC: only the run older than the cutoff expires
+    aware = NOW.replace(hour=14, tzinfo=timezone(timedelta(hours=2)))
+    assert apply_retention(db, archive_dir=tmp_path, now=aware)["validation_log"] == 1
+
+
+def test_default_reference_time_is_current_utc(db, tmp_path):
+    db.executemany("""
+        INSERT INTO validation_log (period_id, check_name, passed, check_date)
+        VALUES (1, 'BS', 1, datetime('now', ?))
+    """, [("-49 hours",), ("-47 hours",), ("-1 hours",)])
+    db.commit()
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        assert apply_retention(db, {"validation_log": {"keep_days": 2}},
+                               archive_dir=tmp_path)["validation_log"] == 1
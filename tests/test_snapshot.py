@@ -0,0 +1,81 @@
+"""
+Snapshots: one consistent read transaction; the previous snapshot survives until swapped
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import sqlite3
+
+import numpy as np
+import pytest
+
+from database import snapshot
+from database.schema import FinancialDatabaseSchema
+from database.snapshot import Snapshot, export_snapshot
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "snapshot.db"
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    FinancialDatabaseSchema.create_schema(conn)
+    conn.executemany("INSERT INTO companies (ticker, cik, company_name) VALUES (?, ?, ?)",
+                     [(f"T{c}", str(c), f"Company {c}") for c in range(1, 4)])
+    conn.commit()
+    yield path, conn
+    conn.close()
+
+
+def test_tables_are_read_in_one_transaction(database, tmp_path, monkeypatch):
+    path, conn = database
+    writer = sqlite3.connect(path)
+    save = np.savez_compressed
+
+    def save_then_write(file, **arrays):
+        # Another connection commits after the first table is read
+        save(file, **arrays)
+        if writer.total_changes:
+            return
+        writer.execute("INSERT INTO companies (ticker, cik, company_name) VALUES ('NEW', '99', 'New')")
+        writer.execute("""
+            INSERT INTO financial_periods (company_id, period_end_date, fiscal_year, filing_type, filing_date)
+            VALUES (1, '2023-12-31', 2023, '10-K', '2024-02-01')
+        """)
+        writer.commit()
+
+    monkeypatch.setattr(snapshot.np, "savez_compressed", save_then_write)
+    manifest = export_snapshot(conn, tmp_path / "out", tables=("companies", "financial_periods"))
+    writer.close()
+
+    assert manifest["tables"]["companies"]["rows"] == 3
+    assert manifest["tables"]["financial_periods"]["rows"] == 0
+    assert not conn.in_transaction
+
+
+def test_caller_transaction_is_left_open(database, tmp_path):
+    _, conn = database
+    conn.execute("BEGIN")
+    export_snapshot(conn, tmp_path / "out", tables=("companies",))
+    assert conn.in_transaction
+    conn.rollback()
+
+
+def test_swap_replaces_previous_snapshot(database, tmp_path, monkeypatch):
+    _, conn = database
+    out = tmp_path / "out"
+    export_snapshot(conn, out, tables=("companies",))
+    conn.execute("DELETE FROM companies WHERE id = 3")
+    conn.commit()
+
+    # A failed export leaves the previous snapshot in place
+    def fail(file, **arrays):
+        raise OSError("disk full")
+    with monkeypatch.context() as patch:
+        patch.setattr(snapshot.np, "savez_compressed", fail)
+        with pytest.raises(OSError):
+            export_snapshot(conn, out, tables=("companies",))
+    assert len(Snapshot(out).column("companies", "id")) == 3
+
+    export_snapshot(conn, out, tables=("companies",))
+    assert Snapshot(out).column("companies", "id").tolist() == [1, 2]
+    assert sorted(p.name for p in tmp_path.iterdir() if p.name.startswith("out")) == ["out"]
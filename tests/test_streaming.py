@@ -0,0 +1,82 @@
+"""
+Streaming parser: same periods as the whole-document path, whatever the chunking
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import io
+import json
+
+import pytest
+
+from benchmarks.synthetic import make_company_facts
+from extraction.sec_extractor import (extract_10k_periods, extract_10k_periods_from_entries,
+                                      iter_fact_entries)
+from extraction.streaming import CompanyFactsStreamParser
+
+
+@pytest.fixture(scope="module")
+def payload():
+    facts = make_company_facts(320193, years=4, extra_tags=10)
+    # A non-ASCII name and a taxonomy that is walked and dropped
+    facts["entityName"] = "Société Générale ünïcode"
+    facts["facts"]["dei"] = {"EntityCommonStockSharesOutstanding": {
+        "units": {"shares": [{"end": "2023-12-31", "val": 1000, "form": "10-K"}]}}}
+    return facts
+
+
+def parse(body: bytes, chunk_size: int = CompanyFactsStreamParser.CHUNK_SIZE, **kwargs):
+    parser = CompanyFactsStreamParser(io.BytesIO(body), **kwargs)
+    parser.CHUNK_SIZE = chunk_size
+    return parser, list(parser)
+
+
+def test_periods_match_whole_document_path(payload):
+    parser, entries = parse(json.dumps(payload).encode())
+    assert extract_10k_periods_from_entries(entries) == extract_10k_periods(payload)
+    assert parser.meta == {"cik": payload["cik"], "entityName": payload["entityName"]}
+
+
+def test_entries_match_decoded_payload_without_form_filter(payload):
+    _, entries = parse(json.dumps(payload).encode(), forms=None, taxonomies=("us-gaap", "dei"))
+    assert entries == list(iter_fact_entries(payload, taxonomies=("us-gaap", "dei")))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_small_chunks_split_tokens_across_refills(payload, chunk_size, indent):
+    # Multi-byte characters, numbers and keys all straddle chunk boundaries
+    body = json.dumps(payload, indent=indent, ensure_ascii=False).encode()
+    parser, entries = parse(body, chunk_size=chunk_size)
+    assert entries == list(parse(body)[1])
+    assert parser.meta["entityName"] == payload["entityName"]
+
+
+def test_number_at_buffer_edge_is_not_truncated():
+    body = b'{"cik": 1234567890, "facts": {}}'
+    for chunk_size in range(1, len(body) + 1):
+        parser, _ = parse(body, chunk_size=chunk_size)
+        assert parser.meta["cik"] == 1234567890
+
+
+def test_empty_facts_yield_nothing():
+    parser, entries = parse(b' { "cik" : 1 , "facts" : { "us-gaap" : { } } } ')
+    assert entries == [] and parser.meta == {"cik": 1}
+
+
+@pytest.mark.parametrize("fraction", [0.1, 0.5, 0.9, 0.999])
+def test_truncated_payload_raises(payload, fraction):
+    body = json.dumps(payload).encode()
+    with pytest.raises(ValueError):
+        parse(body[:int(len(body) * fraction)], chunk_size=512)
+
+
+@pytest.mark.parametrize("body", [
+    b'',
+    b'[1, 2]',
+    b'{"cik": 1 "facts": {}}',
+    b'{"facts": {"us-gaap": {"Revenues": {"units": {"USD": [}}}}}',
+    b'{"facts": {"us-gaap": {"Revenues" {}}}}',
+])
+def test_malformed_payload_raises(body):
+    with pytest.raises(ValueError):
+        parse(body)
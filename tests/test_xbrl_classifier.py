@@ -0,0 +1,63 @@
+"""
+XBRL tag classifier: synonyms resolve to one line item, canonical tag first
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import pytest
+
+from database.schema import FinancialDatabaseSchema
+from database.xbrl_classifier import XBRLTagClassifier, get_tag_classifier
+
+UNMAPPED_RANK = len(get_tag_classifier().tags)
+
+
+@pytest.mark.parametrize("tag, classification, canonical, rank", [
+    ("Revenues", ("INCOME", "Revenues"), "Revenues", 0),
+    ("NetRevenues", ("INCOME", "Revenues"), "Revenues", 1),
+    ("TotalNetRevenues", ("INCOME", "Revenues"), "Revenues", 2),
+    ("OperatingIncome", ("INCOME", "OperatingIncome"), "OperatingIncomeLoss", 1),
+    ("NetIncome", ("INCOME", "NetIncome"), "NetIncomeLoss", 1),
+    ("Inventory", ("BALANCE_SHEET", "Inventory"), "InventoryNetCurrent", 1),
+    ("PropertyPlantAndEquipmentNet", ("BALANCE_SHEET", "PPE"), "PropertyPlantAndEquipmentGross", 1),
+    ("LongTermDebt", ("BALANCE_SHEET", "LongTermDebt"), "LongTermBorrowings", 1),
+    ("Assets", ("BALANCE_SHEET", "TotalAssets"), "Assets", 0),
+    ("DepreciationAndAmortization", ("CASH_FLOW", "DepreciationAndAmortization"),
+     "DepreciationAndAmortization", 0),
+    ("CustomSegmentRevenue", ("OTHER", "CustomSegmentRevenue"), "CustomSegmentRevenue", UNMAPPED_RANK),
+])
+def test_synonym_resolution(tag, classification, canonical, rank):
+    classifier = get_tag_classifier()
+    assert classifier.classify(tag) == classification
+    assert classifier.canonical_tag(tag) == canonical
+    assert classifier.rank(tag) == rank
+    assert classifier.line_item(tag) == (None if classification[0] == "OTHER" else classification[1])
+
+
+@pytest.mark.parametrize("line_item, tags", [
+    ("Revenues", ("Revenues", "NetRevenues", "TotalNetRevenues")),
+    ("Inventory", ("InventoryNetCurrent", "Inventory")),
+    ("Goodwill", ("Goodwill",)),
+    ("NoSuchLineItem", ()),
+])
+def test_tags_for_lists_canonical_first(line_item, tags):
+    classifier = get_tag_classifier()
+    assert classifier.tags_for(line_item) == tags
+    assert all(classifier.canonical_tag(tag) == tags[0] for tag in tags)
+
+
+def test_ranking_orders_every_line_items_synonyms():
+    classifier = get_tag_classifier()
+    for line_item, tags in FinancialDatabaseSchema.XBRL_TAG_MAPPING.items():
+        assert sorted(tags, key=classifier.rank) == tags, line_item
+        assert classifier.rank("UnmappedTag") > max(map(classifier.rank, tags))
+
+
+def test_tag_listed_twice_keeps_its_first_line_item():
+    classifier = XBRLTagClassifier(
+        {"Debt": ["LongTermDebt", "Borrowings"], "OtherDebt": ["OtherBorrowings", "LongTermDebt"]},
+        {"Debt": "BALANCE_SHEET", "OtherDebt": "BALANCE_SHEET"},
+    )
+    assert classifier.classify("LongTermDebt") == ("BALANCE_SHEET", "Debt")
+    assert (classifier.canonical_tag("LongTermDebt"), classifier.rank("LongTermDebt")) == ("LongTermDebt", 0)
+    assert classifier.tags_for("OtherDebt") == ("OtherBorrowings", "LongTermDebt")
+    assert classifier.rank("UnknownTag") == 3
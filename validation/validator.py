@@ -9,6 +9,9 @@ import sqlite3
 from typing import Dict, List, Tuple, Optional
 import logging
 
+from database.component_cache import COMPONENT_CACHE
+from database.xbrl_classifier import get_tag_classifier
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -22,7 +25,19 @@ class FinancialValidator:
     def __init__(self, db_connection: sqlite3.Connection):
         self.db = db_connection
         self.cursor = self.db.cursor()
+        self.component_cache = COMPONENT_CACHE
         self.tolerance = 0.01  # 1% tolerance for rounding differences
+        self.classifier = get_tag_classifier()
+    
+    def _by_tag(self, rows: List[Tuple[str, float]]) -> Dict[str, float]:
+        """
+        Key statement rows by XBRL tag, also filling each canonical tag from
+        its best-ranked synonym (e.g. AssetsTotal -> Assets) when absent
+        """
+        values = {tag: value for tag, value in rows}
+        for tag, value in sorted(rows, key=lambda row: self.classifier.rank(row[0])):
+            values.setdefault(self.classifier.canonical_tag(tag), value)
+        return values
     
     def get_period_data(self, period_id: int) -> Dict:
         """Retrieve all financial data for a period"""
@@ -36,19 +51,19 @@ class FinancialValidator:
         self.cursor.execute("""
             SELECT xbrl_tag, value FROM income_statement WHERE period_id = ?
         """, (period_id,))
-        data["income_statement"] = {row[0]: row[1] for row in self.cursor.fetchall()}
+        data["income_statement"] = self._by_tag(self.cursor.fetchall())
         
         # Balance Sheet
         self.cursor.execute("""
             SELECT xbrl_tag, value FROM balance_sheet WHERE period_id = ?
         """, (period_id,))
-        data["balance_sheet"] = {row[0]: row[1] for row in self.cursor.fetchall()}
+        data["balance_sheet"] = self._by_tag(self.cursor.fetchall())
         
         # Cash Flow
         self.cursor.execute("""
             SELECT xbrl_tag, value FROM cash_flow_statement WHERE period_id = ?
         """, (period_id,))
-        data["cash_flow"] = {row[0]: row[1] for row in self.cursor.fetchall()}
+        data["cash_flow"] = self._by_tag(self.cursor.fetchall())
         
         return data
     
@@ -60,11 +75,6 @@ class FinancialValidator:
         Returns:
             (passed: bool, results: Dict with details)
         """
-        self.cursor.execute("""
-            SELECT value FROM balance_sheet 
-            WHERE period_id = ? AND xbrl_tag IN ('Assets', 'Liabilities', 'StockholdersEquity')
-        """, (period_id,))
-        
         results = {
             "check_name": "Balance Sheet Equality",
             "expected": 0,
@@ -74,12 +84,11 @@ class FinancialValidator:
             "passed": False
         }
         
-        data = self.get_period_data(period_id)
-        bs = data["balance_sheet"]
+        facts = self.component_cache.get_period_facts(self.cursor, period_id)
         
-        total_assets = bs.get("Assets", 0)
-        total_liabilities = bs.get("Liabilities", 0)
-        total_equity = bs.get("StockholdersEquity", 0)
+        total_assets = facts.get("total_assets", 0)
+        total_liabilities = facts.get("total_liabilities", 0)
+        total_equity = facts.get("total_equity", 0)
         
         if total_assets == 0:
             logger.warning(f"Period {period_id}: No balance sheet data found")
@@ -121,10 +130,9 @@ class FinancialValidator:
             "note": "Informational check"
         }
         
-        data = self.get_period_data(period_id)
-        is_data = data["income_statement"]
+        facts = self.component_cache.get_period_facts(self.cursor, period_id)
         
-        net_income = is_data.get("NetIncomeLoss", 0)
+        net_income = facts.get("net_income", 0)
         
         results.update({
             "net_income": net_income,
@@ -144,12 +152,10 @@ class FinancialValidator:
             "passed": True
         }
         
-        data = self.get_period_data(period_id)
-        is_data = data["income_statement"]
-        cf_data = data["cash_flow"]
+        facts = self.component_cache.get_period_facts(self.cursor, period_id)
         
-        net_income = is_data.get("NetIncomeLoss", 0)
-        ocf = cf_data.get("NetCashProvidedByUsedInOperatingActivities", 0)
+        net_income = facts.get("net_income", 0)
+        ocf = facts.get("ocf", 0)
         
         # OCF should typically be positive for healthy companies
         if ocf < 0 and net_income > 0:
@@ -180,11 +186,10 @@ class FinancialValidator:
             "passed": False
         }
         
-        data = self.get_period_data(period_id)
-        cf_data = data["cash_flow"]
+        facts = self.component_cache.get_period_facts(self.cursor, period_id)
         
-        ocf = cf_data.get("NetCashProvidedByUsedInOperatingActivities", 0)
-        capex = cf_data.get("PaymentsForAcquisitionsOfProductiveAssets", 0)
+        ocf = facts.get("ocf", 0)
+        capex = facts.get("capex", 0)
         
         if ocf == 0:
             results["note"] = "OCF not found in period"
@@ -214,14 +219,8 @@ class FinancialValidator:
             "passed": True
         }
         
-        data = self.get_period_data(period_id)
-        cf_data = data["cash_flow"]
-        
-        da = cf_data.get("DepreciationDepletionAndAmortization", 0)
-        
-        if da == 0:
-            # Try alternative tags
-            da = cf_data.get("DepreciationAndAmortization", 0)
+        # DepreciationDepletionAndAmortization, else DepreciationAndAmortization
+        da = self.component_cache.get_period_facts(self.cursor, period_id).get("da", 0)
         
         results.update({
             "depreciation_amortization": da,
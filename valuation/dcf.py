@@ -10,6 +10,9 @@ import logging
 import numpy as np
 from datetime import datetime
 
+from database.component_cache import COMPONENT_CACHE
+from database.repository import FundamentalsRepository
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -25,6 +28,8 @@ class DCFValuationEngine:
     def __init__(self, db_connection: sqlite3.Connection):
         self.db = db_connection
         self.cursor = self.db.cursor()
+        self.component_cache = COMPONENT_CACHE
+        self.repository = FundamentalsRepository(self.db)
     
     def calculate_npv(self, cash_flows: List[float], discount_rate: float) -> Tuple[float, List[float]]:
         """
@@ -121,58 +126,61 @@ class DCFValuationEngine:
     def get_balance_sheet_data(self, period_id: int) -> Dict:
         """
         Extract debt and cash data from balance sheet
+        
+        Debt is the sum of FinancialDatabaseSchema.DEBT_TAGS, read with cash
+        from the period's period_facts row.
         """
+        facts = self.component_cache.get_period_facts(self.cursor, period_id)
+        
         data = {
-            "total_debt": 0,
-            "cash": 0,
-            "net_debt": 0
+            "total_debt": facts.get("debt", 0),
+            "cash": facts.get("cash", 0),
         }
-        
-        # Get Long-Term Debt and Short-Term Borrowings
-        self.cursor.execute("""
-            SELECT value FROM balance_sheet
-            WHERE period_id = ? AND xbrl_tag IN 
-            ('LongTermBorrowings', 'LongTermDebt', 'CurrentPortionOfLongTermDebt')
-        """, (period_id,))
-        
-        debt_sum = sum([row[0] for row in self.cursor.fetchall()])
-        data["total_debt"] = debt_sum
-        
-        # Get Cash
-        self.cursor.execute("""
-            SELECT value FROM balance_sheet
-            WHERE period_id = ? AND xbrl_tag IN ('Cash', 'CashAndCashEquivalents')
-        """, (period_id,))
-        
-        result = self.cursor.fetchone()
-        if result:
-            data["cash"] = result[0]
-        
         data["net_debt"] = data["total_debt"] - data["cash"]
         
         return data
     
     def get_shares_outstanding(self, period_id: int) -> float:
         """
-        Get weighted average shares outstanding from database
+        Get weighted average shares outstanding from database,
+        falling back to basic shares outstanding
         """
-        self.cursor.execute("""
-            SELECT weighted_avg_shares FROM shares_outstanding
-            WHERE period_id = ?
-        """, (period_id,))
+        shares = self.component_cache.get_period_facts(self.cursor, period_id).get("shares")
+        return shares if shares else 1000  # Default fallback
+    
+    def get_base_period_data(self, company_ids: List[int]) -> Dict[str, np.ndarray]:
+        """
+        Equity-bridge inputs from each company's latest 10-K, in one query
         
-        result = self.cursor.fetchone()
-        if result and result[0]:
-            return result[0]
+        Same values as get_balance_sheet_data() and get_shares_outstanding()
+        for the base period, as arrays aligned with company_ids; companies
+        without a 10-K get period_id -1.
         
-        # Fallback: get basic shares outstanding
-        self.cursor.execute("""
-            SELECT shares_outstanding FROM shares_outstanding
-            WHERE period_id = ?
-        """, (period_id,))
-        
-        result = self.cursor.fetchone()
-        return result[0] if result and result[0] else 1000  # Default fallback
+        Returns:
+            {"company_ids", "period_id", "total_debt", "cash", "net_debt", "shares_outstanding"}
+        """
+        latest = self.repository.company_history(company_ids, years=1)
+        row_of = {company_id: row for row, company_id in enumerate(latest["company_id"].tolist())}
+        rows = np.array([row_of.get(company_id, -1) for company_id in company_ids], dtype=np.int64)
+        found = rows >= 0
+        
+        def pick(name):
+            values = latest[name][rows[found]]
+            column = np.zeros(len(rows))
+            column[found] = np.nan_to_num(values)
+            return column
+        
+        total_debt, cash, shares = pick("debt"), pick("cash"), pick("shares")
+        period_id = np.full(len(rows), -1, dtype=np.int64)
+        period_id[found] = latest["period_id"][rows[found]]
+        return {
+            "company_ids": np.asarray(company_ids, dtype=np.int64),
+            "period_id": period_id,
+            "total_debt": total_debt,
+            "cash": cash,
+            "net_debt": total_debt - cash,
+            "shares_outstanding": np.where(shares != 0, shares, 1000),  # Default fallback
+        }
     
     def perform_dcf_valuation(self, company_id: int, base_period_id: int,
                              fcff_projections: List[float],
@@ -265,6 +273,9 @@ class DCFValuationEngine:
         
         return results
     
+    # Legacy fixed projection columns on dcf_calculations
+    LEGACY_PROJECTION_YEARS = 5
+    
     def save_dcf_results(self, results: Dict) -> int:
         """
         Save DCF valuation results to database
@@ -272,35 +283,123 @@ class DCFValuationEngine:
         Returns:
             DCF calculation ID
         """
+        dcf_calc_id = self.save_dcf_results_many([results])[0]
+        logger.info(f"✓ Saved DCF valuation (ID: {dcf_calc_id})")
+        
+        return dcf_calc_id
+    
+    def save_dcf_results_many(self, results_list: List[Dict], commit: bool = True) -> List[int]:
+        """
+        Save many DCF valuations with one executemany per table
+        
+        Every projection year goes to dcf_projections, so horizons of any
+        length are kept; the first five are also written to the legacy
+        fcff_year_1..5 columns. Ids are assigned up front under the write
+        lock (BEGIN IMMEDIATE when no transaction is open).
+        
+        Args:
+            results_list: Dicts returned by perform_dcf_valuation()
+            commit: Commit after writing
+        
+        Returns:
+            DCF calculation IDs, in input order
+        """
+        if not results_list:
+            return []
+        
+        if not self.db.in_transaction:
+            self.db.execute("BEGIN IMMEDIATE")
+        
         self.cursor.execute("""
+            SELECT MAX(COALESCE((SELECT MAX(id) FROM dcf_calculations), 0),
+                       COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'dcf_calculations'), 0))
+        """)
+        first_id = self.cursor.fetchone()[0] + 1
+        ids = list(range(first_id, first_id + len(results_list)))
+        
+        legacy = self.LEGACY_PROJECTION_YEARS
+        calc_rows = []
+        projection_rows = []
+        for dcf_calc_id, results in zip(ids, results_list):
+            projections = list(results["fcff_projections"])
+            head = projections[:legacy] + [0] * (legacy - len(projections[:legacy]))
+            calc_rows.append((
+                dcf_calc_id,
+                results["company_id"],
+                results["base_period_id"],
+                len(projections),
+                results["wacc"],
+                results["terminal_growth_rate"],
+                *head,
+                results["terminal_value"],
+                results["enterprise_value"],
+                results["equity_value"],
+                results["intrinsic_value_per_share"]
+            ))
+            projection_rows.extend(
+                (dcf_calc_id, year, float(fcff)) for year, fcff in enumerate(projections, 1)
+            )
+        
+        self.cursor.executemany("""
             INSERT INTO dcf_calculations
-            (company_id, base_year_id, projection_years, wacc, terminal_growth_rate,
+            (id, company_id, base_year_id, projection_years, wacc, terminal_growth_rate,
              fcff_year_1, fcff_year_2, fcff_year_3, fcff_year_4, fcff_year_5,
              terminal_value, enterprise_value, equity_value, price_per_share)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            results["company_id"],
-            results["base_period_id"],
-            len(results["fcff_projections"]),
-            results["wacc"],
-            results["terminal_growth_rate"],
-            results["fcff_projections"][0] if len(results["fcff_projections"]) > 0 else 0,
-            results["fcff_projections"][1] if len(results["fcff_projections"]) > 1 else 0,
-            results["fcff_projections"][2] if len(results["fcff_projections"]) > 2 else 0,
-            results["fcff_projections"][3] if len(results["fcff_projections"]) > 3 else 0,
-            results["fcff_projections"][4] if len(results["fcff_projections"]) > 4 else 0,
-            results["terminal_value"],
-            results["enterprise_value"],
-            results["equity_value"],
-            results["intrinsic_value_per_share"]
-        ))
-        
-        self.db.commit()
-        
-        dcf_calc_id = self.cursor.lastrowid
-        logger.info(f"✓ Saved DCF valuation (ID: {dcf_calc_id})")
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, calc_rows)
+        self.cursor.executemany("""
+            INSERT INTO dcf_projections (dcf_calc_id, year, fcff) VALUES (?, ?, ?)
+        """, projection_rows)
         
-        return dcf_calc_id
+        if commit:
+            self.db.commit()
+        
+        return ids
+    
+    def get_projections(self, dcf_calc_id: int) -> np.ndarray:
+        """Projected FCFF of one valuation, year 1 first"""
+        self.cursor.execute("""
+            SELECT fcff FROM dcf_projections WHERE dcf_calc_id = ? ORDER BY year
+        """, (dcf_calc_id,))
+        return np.array([row[0] for row in self.cursor.fetchall()], dtype=float)
+    
+    def get_projection_matrix(self, dcf_calc_ids: List[int]) -> np.ndarray:
+        """
+        Projections of many valuations as one array
+        
+        Returns:
+            Array of shape (len(dcf_calc_ids), longest horizon); row i holds
+            dcf_calc_ids[i], padded with NaN past its horizon
+        """
+        row_of = {}
+        for i, dcf_calc_id in enumerate(dcf_calc_ids):
+            row_of.setdefault(dcf_calc_id, i)
+        calc_ids, years, values = [], [], []
+        
+        unique_ids = list(row_of)
+        for start in range(0, len(unique_ids), 900):
+            chunk = unique_ids[start:start + 900]
+            self.cursor.execute(f"""
+                SELECT dcf_calc_id, year, fcff FROM dcf_projections
+                WHERE dcf_calc_id IN ({",".join("?" * len(chunk))})
+            """, chunk)
+            for dcf_calc_id, year, fcff in self.cursor.fetchall():
+                calc_ids.append(dcf_calc_id)
+                years.append(year)
+                values.append(fcff)
+        
+        years = np.array(years, dtype=np.int64)
+        matrix = np.full((len(dcf_calc_ids), int(years.max()) if len(years) else 0), np.nan)
+        if len(years):
+            rows = np.array([row_of[dcf_calc_id] for dcf_calc_id in calc_ids])
+            matrix[rows, years - 1] = values
+        
+        # Repeated ids share the row of their first occurrence
+        for i, dcf_calc_id in enumerate(dcf_calc_ids):
+            if row_of[dcf_calc_id] != i:
+                matrix[i] = matrix[row_of[dcf_calc_id]]
+        
+        return matrix
     
     def sensitivity_analysis(self, enterprise_value: float,
                             net_debt: float,
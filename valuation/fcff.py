@@ -10,10 +10,135 @@ import logging
 import numpy as np
 from datetime import datetime
 
+from database.component_cache import COMPONENT_CACHE
+from database.repository import FundamentalsRepository
+from valuation.growth import DISPERSION_COLUMNS, GROWTH_METHODS, growth_estimates
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Share of revenue used as the change in NWC when no balance-sheet lag exists
+NWC_REVENUE_SHARE = 0.05
+
+
+def nwc_change_from_arrays(components: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Balance-sheet change in NWC against each company's previous fiscal year
+    
+    NWC = (Current Assets - Cash) - Current Liabilities. A period uses its
+    lag when the same company has a period for fiscal_year - 1 and both
+    carry current assets and current liabilities (missing cash counts as
+    0); otherwise the change falls back to NWC_REVENUE_SHARE of revenue.
+    Rows may come in any order. Of several periods in the previous fiscal
+    year the lag is the one with the latest period_end_date, then highest
+    period_id (when those arrays are given), as in FCFFCalculator.nwc_change().
+    
+    Args:
+        components: Arrays for company_id, fiscal_year, revenue,
+                    current_assets, cash and current_liabilities; optionally
+                    period_end_date and period_id
+    
+    Returns:
+        (change_nwc, nwc_fallback mask)
+    """
+    revenue = np.nan_to_num(np.asarray(components["revenue"], dtype=float)) \
+        if "revenue" in components else np.zeros(len(components["company_id"]))
+    fallback_change = revenue * NWC_REVENUE_SHARE
+    if not all(name in components for name in
+               ("company_id", "fiscal_year", "current_assets", "current_liabilities")):
+        return fallback_change, np.ones(len(revenue), dtype=bool)
+    
+    company_id = np.asarray(components["company_id"], dtype=np.int64)
+    fiscal_year = np.asarray(components["fiscal_year"], dtype=np.int64)
+    cash = np.nan_to_num(np.asarray(components.get("cash", np.zeros(len(revenue))), dtype=float))
+    nwc = (np.asarray(components["current_assets"], dtype=float) - cash) \
+        - np.asarray(components["current_liabilities"], dtype=float)  # NaN if either is missing
+    
+    # Sort like NWC_LAG_SQL ranks candidates: company, fiscal year, then
+    # period_end_date and period id, so the last row of each (company, fiscal
+    # year) group is the lag for the following year
+    size = len(nwc)
+    tiebreakers = [np.asarray(components[name]) for name in ("period_id", "period_end_date")
+                   if name in components]
+    order = np.lexsort((np.arange(size), *tiebreakers, fiscal_year, company_id))
+    keys = company_id[order] * 100000 + fiscal_year[order]  # fiscal years are below 100000
+    
+    wanted = company_id * 100000 + fiscal_year - 1
+    position = np.searchsorted(keys, wanted, side="right") - 1
+    found = (position >= 0) & (keys[np.maximum(position, 0)] == wanted)
+    lag = np.full(size, np.nan)
+    lag[found] = nwc[order[position[found]]]
+    
+    change = nwc - lag
+    fallback = np.isnan(change)
+    return np.where(fallback, fallback_change, change), fallback
+
+
+def fcff_from_arrays(components: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    FCFFCalculator.calculate_fcff over many periods at once
+    
+    Args:
+        components: Arrays keyed like extract_fcff_components() output
+                    (ebit, revenue, net_income, tax_expense, da, capex);
+                    NaN or absent counts as 0, as in the per-period path.
+                    With company_id, fiscal_year and the NWC columns of
+                    period_facts the change in NWC uses lagged periods
+                    (see nwc_change_from_arrays)
+    
+    Returns:
+        Arrays for tax_rate, nopat, change_nwc and fcff, plus the
+        default_tax_rate and nwc_fallback masks
+    """
+    size = len(next(iter(components.values())))
+    values = {
+        name: np.nan_to_num(np.asarray(components[name], dtype=float))
+        if name in components else np.zeros(size)
+        for name in ("ebit", "revenue", "net_income", "tax_expense", "da", "capex")
+    }
+    
+    # Effective rate when tax and net income are positive and the rate is 0-50%
+    tax, net_income = values["tax_expense"], values["net_income"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        effective = tax / (net_income + tax)
+    usable = (tax > 0) & (net_income > 0) & (effective >= 0) & (effective <= 0.5)
+    tax_rate = np.where(usable, effective, 0.25)
+    
+    nopat = values["ebit"] * (1 - tax_rate)
+    change_nwc, nwc_fallback = nwc_change_from_arrays({**components, "revenue": values["revenue"]})
+    fcff = nopat + values["da"] - values["capex"] - change_nwc
+    
+    return {"tax_rate": tax_rate, "nopat": nopat, "change_nwc": change_nwc, "fcff": fcff,
+            "default_tax_rate": ~usable, "nwc_fallback": nwc_fallback}
+
+
+def fcff_for_history(history: Dict[str, np.ndarray], years: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    fcff_from_arrays() over FundamentalsRepository.company_history() output
+    
+    Fetch the history with one year more than wanted so the oldest kept
+    period still has its balance-sheet lag; the extra year is dropped here.
+    
+    Returns:
+        History columns plus fcff_from_arrays() output for the latest
+        `years` periods of each company (all periods if years is None)
+    """
+    if not len(history["period_id"]):
+        return {**history, **fcff_from_arrays({"revenue": np.zeros(0)})}
+    
+    results = {**history, **fcff_from_arrays(history)}
+    if years is None:
+        return results
+    
+    # Rows are ordered by company, oldest first: keep the last `years` of each
+    company_id = history["company_id"]
+    starts = np.r_[0, np.flatnonzero(np.diff(company_id)) + 1]
+    ends = np.r_[starts[1:], len(company_id)]
+    keep = np.repeat(ends, ends - starts) - np.arange(len(company_id)) <= years
+    return {name: values[keep] for name, values in results.items()}
+
+
 class FCFFCalculator:
     """
     Calculates Free Cash Flow to the Firm (FCFF) from financial statements
@@ -26,9 +151,15 @@ class FCFFCalculator:
         NWC = Net Working Capital
     """
     
+    # FCFF components, read from the period_facts columns of the same name
+    # (FinancialDatabaseSchema.PERIOD_FACT_COLUMNS lists their line items)
+    COMPONENTS = ("ebit", "revenue", "net_income", "tax_expense", "da", "capex", "ocf")
+    
     def __init__(self, db_connection: sqlite3.Connection):
         self.db = db_connection
         self.cursor = self.db.cursor()
+        self.component_cache = COMPONENT_CACHE
+        self.repository = FundamentalsRepository(self.db)
     
     def get_historical_periods(self, company_id: int, years: int = 5) -> List[Dict]:
         """
@@ -41,63 +172,25 @@ class FCFFCalculator:
         Returns:
             List of period data dicts, sorted chronologically
         """
-        self.cursor.execute("""
-            SELECT id, period_end_date, fiscal_year
-            FROM financial_periods
-            WHERE company_id = ? AND filing_type = '10-K'
-            ORDER BY fiscal_year DESC
-            LIMIT ?
-        """, (company_id, years))
-        
-        periods = []
-        for row in self.cursor.fetchall():
-            periods.append({
-                "period_id": row[0],
-                "period_end_date": row[1],
-                "fiscal_year": row[2]
-            })
-        
-        # Sort chronologically (oldest first)
-        return sorted(periods, key=lambda x: x["fiscal_year"])
+        history = self.repository.company_history(company_id, years)
+        return [
+            {"period_id": period_id, "period_end_date": period_end_date, "fiscal_year": fiscal_year}
+            for period_id, period_end_date, fiscal_year in zip(
+                history["period_id"].tolist(),
+                history["period_end_date"].tolist(),
+                history["fiscal_year"].tolist(),
+            )
+        ]
     
     def extract_fcff_components(self, period_id: int) -> Dict:
         """
         Extract all components needed for FCFF calculation from database
+        
+        One indexed fetch of the period's period_facts row, where synonyms
+        such as NetRevenues were already resolved at ingest.
         """
-        components = {}
-        
-        # Income Statement items
-        self.cursor.execute("""
-            SELECT xbrl_tag, value FROM income_statement
-            WHERE period_id = ?
-        """, (period_id,))
-        
-        for xbrl_tag, value in self.cursor.fetchall():
-            if xbrl_tag == "OperatingIncomeLoss":
-                components["ebit"] = value
-            elif xbrl_tag == "Revenues":
-                components["revenue"] = value
-            elif xbrl_tag == "NetIncomeLoss":
-                components["net_income"] = value
-            elif xbrl_tag == "IncomeTaxExpenseBenefit":
-                components["tax_expense"] = value
-        
-        # Cash Flow Statement items
-        self.cursor.execute("""
-            SELECT xbrl_tag, value FROM cash_flow_statement
-            WHERE period_id = ?
-        """, (period_id,))
-        
-        for xbrl_tag, value in self.cursor.fetchall():
-            if "DepreciationDepletionAndAmortization" in xbrl_tag or \
-               "DepreciationAndAmortization" in xbrl_tag:
-                components["da"] = value
-            elif "PaymentsForAcquisitionsOfProductiveAssets" in xbrl_tag:
-                components["capex"] = value
-            elif "NetCashProvidedByUsedInOperatingActivities" in xbrl_tag:
-                components["ocf"] = value
-        
-        return components
+        facts = self.component_cache.get_period_facts(self.cursor, period_id)
+        return {component: facts[component] for component in self.COMPONENTS if component in facts}
     
     def calculate_tax_rate(self, period_id: int, components: Dict) -> float:
         """
@@ -122,58 +215,69 @@ class FCFFCalculator:
         logger.warning(f"Period {period_id}: Using default tax rate (25%)")
         return 0.25
     
+    # A period's NWC inputs with those of its lag: prev_period_id if given,
+    # else the same company's 10-K for the previous fiscal year
+    NWC_LAG_SQL = """
+        SELECT cur.revenue,
+               cur.current_assets, cur.cash, cur.current_liabilities,
+               prev.current_assets, prev.cash, prev.current_liabilities
+        FROM period_facts cur
+        LEFT JOIN period_facts prev ON prev.period_id = COALESCE(?, (
+            SELECT f.period_id FROM period_facts f
+            JOIN financial_periods p ON p.id = f.period_id
+            WHERE f.company_id = cur.company_id AND f.fiscal_year = cur.fiscal_year - 1
+              AND p.filing_type = '10-K'
+            ORDER BY p.period_end_date DESC, p.id DESC
+            LIMIT 1
+        ))
+        WHERE cur.period_id = ?
+    """
+    
+    def nwc_change(self, period_id: int, prev_period_id: Optional[int] = None) -> Tuple[float, bool]:
+        """
+        Change in NWC from the balance sheet, in one query
+        
+        NWC = (Current Assets - Cash) - Current Liabilities, against the
+        previous fiscal year (or prev_period_id). Falls back to 5% of
+        revenue when the lag or its current assets / liabilities are missing.
+        
+        Returns:
+            (change in NWC, True if the revenue fallback was used)
+        """
+        self.cursor.execute(self.NWC_LAG_SQL, (prev_period_id, period_id))
+        row = self.cursor.fetchone()
+        if row is None:
+            return 0.0, True
+        
+        revenue, ca, cash, cl, prev_ca, prev_cash, prev_cl = row
+        if None in (ca, cl, prev_ca, prev_cl):
+            return (revenue or 0) * NWC_REVENUE_SHARE, True
+        
+        nwc_curr = (ca - (cash or 0)) - cl
+        nwc_prev = (prev_ca - (prev_cash or 0)) - prev_cl
+        return nwc_curr - nwc_prev, False
+    
     def estimate_nwc_change(self, period_id: int, prev_period_id: Optional[int] = None) -> float:
         """
         Calculate change in Net Working Capital
-        Change in NWC = (Current Assets - Cash) - (Current Liabilities - Debt)
+        Change in NWC = (Current Assets - Cash) - Current Liabilities
         
-        If previous period not provided, estimates as % of revenue growth
+        Uses the previous fiscal year unless prev_period_id is given; see nwc_change()
         """
-        if prev_period_id is None:
-            # Estimate based on revenue changes
-            components = self.extract_fcff_components(period_id)
-            revenue = components.get("revenue", 0)
-            
-            # Conservative estimate: NWC change is 5% of revenue growth
-            # This is a simplification; ideally would calculate from balance sheet
-            return revenue * 0.05
-        
-        # Calculate actual NWC change from balance sheet data
-        current_assets_curr = self._get_balance_sheet_item(period_id, ["AssetsCurrent"])
-        current_liab_curr = self._get_balance_sheet_item(period_id, ["LiabilitiesCurrent"])
-        
-        current_assets_prev = self._get_balance_sheet_item(prev_period_id, ["AssetsCurrent"])
-        current_liab_prev = self._get_balance_sheet_item(prev_period_id, ["LiabilitiesCurrent"])
-        
-        nwc_curr = (current_assets_curr - self._get_balance_sheet_item(
-            period_id, ["Cash"]
-        )) - current_liab_curr
-        
-        nwc_prev = (current_assets_prev - self._get_balance_sheet_item(
-            prev_period_id, ["Cash"]
-        )) - current_liab_prev
-        
-        return nwc_curr - nwc_prev
-    
-    def _get_balance_sheet_item(self, period_id: int, possible_tags: List[str]) -> float:
-        """Helper to retrieve balance sheet items by multiple possible tags"""
-        for tag in possible_tags:
-            self.cursor.execute("""
-                SELECT value FROM balance_sheet
-                WHERE period_id = ? AND xbrl_tag = ?
-            """, (period_id, tag))
-            result = self.cursor.fetchone()
-            if result:
-                return result[0]
-        return 0
+        return self.nwc_change(period_id, prev_period_id)[0]
     
     def calculate_fcff(self, period_id: int, components: Dict, 
-                       tax_rate: Optional[float] = None) -> Dict:
+                       tax_rate: Optional[float] = None,
+                       prev_period_id: Optional[int] = None) -> Dict:
         """
         Calculate FCFF for a given period
         
         FCFF = NOPAT + D&A - CapEx - Change in NWC
         where NOPAT = EBIT × (1 - Tax Rate)
+        
+        Change in NWC comes from the balance sheet against prev_period_id
+        (default the previous fiscal year); nwc_fallback marks periods
+        that used 5% of revenue instead.
         """
         if tax_rate is None:
             tax_rate = self.calculate_tax_rate(period_id, components)
@@ -185,44 +289,62 @@ class FCFFCalculator:
         # NOPAT (Net Operating Profit After Tax)
         nopat = ebit * (1 - tax_rate)
         
-        # Change in NWC (estimate for now, ideally calculated from balance sheet)
-        change_nwc = self.estimate_nwc_change(period_id)
+        # Change in NWC from consecutive balance sheets
+        change_nwc, nwc_fallback = self.nwc_change(period_id, prev_period_id)
         
         # Calculate FCFF
         fcff = nopat + da - capex - change_nwc
         
         return {
+            "revenue": components.get("revenue", 0),
             "ebit": ebit,
             "tax_rate": tax_rate,
             "nopat": nopat,
             "da": da,
             "capex": capex,
             "change_nwc": change_nwc,
+            "nwc_fallback": nwc_fallback,
             "fcff": fcff
         }
     
+    def historical_fcff_arrays(self, company_ids, years: int = 5) -> Dict[str, np.ndarray]:
+        """
+        Set-based FCFF for the last N fiscal years of one or many companies
+        
+        One repository query for every period (plus one earlier year for
+        the NWC lag), then calculate_fcff() over all of them as arrays.
+        
+        Returns:
+            FundamentalsRepository.company_history() columns plus
+            fcff_from_arrays() output, one entry per period
+        """
+        history = self.repository.company_history(company_ids, years + 1 if years else years)
+        results = fcff_for_history(history, years)
+        for period_id in results["period_id"][results["default_tax_rate"]].tolist():
+            logger.warning(f"Period {period_id}: Using default tax rate (25%)")
+        return results
+    
     def calculate_historical_fcff(self, company_id: int, years: int = 5) -> List[Dict]:
         """
         Calculate FCFF for last N fiscal years
         Used to establish growth trends for projections
+        
+        Same records as calculate_fcff() per period, computed set-based
+        through historical_fcff_arrays().
         """
-        periods = self.get_historical_periods(company_id, years)
-        historical_fcff = []
+        arrays = self.historical_fcff_arrays(company_id, years)
         
-        logger.info(f"\nCalculating historical FCFF for {len(periods)} periods...")
+        logger.info(f"\nCalculating historical FCFF for {len(arrays['period_id'])} periods...")
         
-        for period in periods:
-            components = self.extract_fcff_components(period["period_id"])
-            fcff_data = self.calculate_fcff(period["period_id"], components)
-            
-            result = {
-                **period,
-                **fcff_data
-            }
-            
-            historical_fcff.append(result)
-            
-            logger.info(f"  FY{period['fiscal_year']}: FCFF = ${fcff_data['fcff']:,.0f}")
+        columns = {name: np.nan_to_num(arrays[name]).tolist() if arrays[name].dtype.kind == "f"
+                   else arrays[name].tolist()
+                   for name in ("period_id", "period_end_date", "fiscal_year", "revenue",
+                                "ebit", "tax_rate", "nopat", "da", "capex", "change_nwc",
+                                "nwc_fallback", "fcff")}
+        historical_fcff = [dict(zip(columns, values)) for values in zip(*columns.values())]
+        
+        for result in historical_fcff:
+            logger.info(f"  FY{result['fiscal_year']}: FCFF = ${result['fcff']:,.0f}")
         
         return historical_fcff
     
@@ -230,40 +352,53 @@ class FCFFCalculator:
         """
         Analyze FCFF growth patterns from historical data
         Returns growth metrics for projection period
-        """
-        if len(historical_fcff) < 2:
-            logger.warning("Insufficient historical data for growth analysis")
-            return {"growth_rate": 0.05, "method": "default"}
         
-        # Extract FCFF values
-        fcff_values = [p["fcff"] for p in historical_fcff]
+        growth_rate is the CAGR between the first and last positive FCFF,
+        clipped to [-10%, 15%]. "estimates" adds every method of
+        valuation.growth (revenue_cagr needs records carrying revenue) and
+        "dispersion" how far they disagree. Every path returns the same
+        keys; estimates that cannot be computed are NaN.
+        """
+        # Place values by fiscal year so gap years count toward the CAGR period
+        fiscal_years = [p.get("fiscal_year") for p in historical_fcff]
+        if None in fiscal_years or len(set(fiscal_years)) < len(fiscal_years):
+            columns = np.arange(len(historical_fcff))
+        else:
+            columns = np.array(fiscal_years, dtype=int) - min(fiscal_years, default=0)
+        series = {}
+        for name in ("fcff", "revenue", "ebit"):
+            if all(name in p for p in historical_fcff):
+                series[name] = np.full(columns.max() + 1 if len(columns) else 0, np.nan)
+                series[name][columns] = [p[name] for p in historical_fcff]
+        estimates = growth_estimates(series["fcff"], series.get("revenue"), series.get("ebit"))
         
         # Filter out zero/negative values for growth calculation
-        valid_fcff = [f for f in fcff_values if f > 0]
+        valid_fcff = [p["fcff"] for p in historical_fcff if p["fcff"] > 0]
+        
+        analysis = {
+            "years_analyzed": int(estimates["cagr_years"]),  # fiscal years the CAGR spans
+            "cagr": estimates["cagr"],
+            "fcff_values": valid_fcff,
+            "estimates": {method: estimates[method] for method in GROWTH_METHODS},
+            "dispersion": {column: estimates[column] for column in DISPERSION_COLUMNS},
+        }
+        
+        if len(historical_fcff) < 2:
+            logger.warning("Insufficient historical data for growth analysis")
+            return {"growth_rate": 0.05, "method": "default", **analysis}
         
         if len(valid_fcff) < 2:
             logger.warning("Insufficient positive FCFF values")
-            return {"growth_rate": 0.03, "method": "default"}
+            return {"growth_rate": 0.03, "method": "default", **analysis}
         
-        # Calculate CAGR (Compound Annual Growth Rate)
-        years = len(valid_fcff) - 1
-        if years > 0:
-            cagr = (valid_fcff[-1] / valid_fcff[0]) ** (1/years) - 1
-        else:
-            cagr = (valid_fcff[-1] - valid_fcff[0]) / valid_fcff[0] if valid_fcff[0] != 0 else 0
+        cagr = estimates["cagr"]
         
         # Use CAGR but cap at reasonable levels
         # Most companies don't grow faster than GDP indefinitely
         growth_rate = min(cagr, 0.15)  # Cap at 15%
         growth_rate = max(growth_rate, -0.10)  # Floor at -10%
         
-        return {
-            "growth_rate": growth_rate,
-            "method": "historical_cagr",
-            "years_analyzed": years,
-            "cagr": cagr,
-            "fcff_values": valid_fcff
-        }
+        return {"growth_rate": growth_rate, "method": "historical_cagr", **analysis}
     
     def project_fcff(self, base_fcff: float, growth_rates: List[float], 
                      years: int = 5) -> List[float]:
@@ -330,5 +465,7 @@ if __name__ == "__main__":
     
     print("\nGrowth Analysis:")
     print(f"  Implied Growth Rate: {growth_analysis['growth_rate']*100:.2f}%")
+    for method, rate in growth_analysis.get("estimates", {}).items():
+        print(f"  {method}: {rate*100:.2f}%")
     
     conn.close()
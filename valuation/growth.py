@@ -0,0 +1,268 @@
+"""
+Vectorized Growth Analysis
+Several growth estimators for one company or a companies x years universe in one NumPy pass
+Prof. V. Ravichandran - The Mountain Path - World of Finance
+"""
+
+import argparse
+import logging
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Per-company estimates, each an annual growth rate (NaN when not estimable)
+GROWTH_METHODS = ("cagr", "log_linear", "median_yoy", "revenue_cagr", "ebit_cagr")
+
+# Summary of the available estimates of each company
+DISPERSION_COLUMNS = ("methods", "mean", "median", "std", "min", "max", "spread")
+
+
+def _positive(values: np.ndarray) -> np.ndarray:
+    """Values with non-positive and missing entries as NaN; growth is only defined between positives"""
+    values = np.asarray(values, dtype=float)
+    return np.where(values > 0, values, np.nan)
+
+
+def _row_median(matrix: np.ndarray) -> np.ndarray:
+    """NaN-ignoring median of each row (np.nanmedian is slow on small inputs)"""
+    count = (~np.isnan(matrix)).sum(axis=1)
+    ordered = np.sort(matrix, axis=1)  # NaN sort last
+    rows = np.arange(len(matrix))
+    low, high = np.maximum((count - 1) // 2, 0), np.minimum(count // 2, matrix.shape[1] - 1)
+    return np.where(count > 0, (ordered[rows, low] + ordered[rows, high]) / 2, np.nan)
+
+
+def _first_last(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Column of each row's first and last non-NaN value (equal when it has fewer than two)"""
+    valid = ~np.isnan(matrix)
+    first = np.argmax(valid, axis=1)
+    last = matrix.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    return first, np.maximum(last, first)
+
+
+def cagr(matrix: np.ndarray) -> np.ndarray:
+    """
+    Compound annual growth between each row's first and last positive value
+
+    Columns are consecutive fiscal years, so the compounding period is the
+    number of years between the two values, including any non-positive or
+    missing years in between.
+    """
+    first, last = _first_last(matrix)
+    span = last - first  # 0 when a row has fewer than two positive values
+
+    rows = np.arange(len(matrix))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = (matrix[rows, last] / matrix[rows, first]) ** (1 / span) - 1
+    return np.where(span > 0, growth, np.nan)
+
+
+def log_linear_growth(matrix: np.ndarray) -> np.ndarray:
+    """
+    exp(slope) - 1 of a least-squares fit of log(value) on fiscal year
+
+    Uses every positive value of the row instead of only the endpoints,
+    so a single unusual first or last year moves it less than CAGR.
+    """
+    valid = ~np.isnan(matrix)
+    weights = valid.astype(float)
+    x = np.arange(matrix.shape[1], dtype=float)
+    y = np.log(np.where(valid, matrix, 1.0))
+
+    count = weights.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_mean = (weights * x).sum(axis=1) / count
+        y_mean = (weights * y).sum(axis=1) / count
+        dx = (x - x_mean[:, None]) * weights
+        slope = (dx * (y - y_mean[:, None])).sum(axis=1) / (dx * dx).sum(axis=1)
+    return np.where(count >= 2, np.expm1(slope), np.nan)
+
+
+def median_yoy_growth(matrix: np.ndarray) -> np.ndarray:
+    """Median year-over-year growth over consecutive years that are both positive"""
+    if matrix.shape[1] < 2:
+        return np.full(len(matrix), np.nan)
+    return _row_median(matrix[:, 1:] / matrix[:, :-1] - 1)
+
+
+def growth_estimates(fcff, revenue=None, ebit=None) -> Dict:
+    """
+    Every estimator in GROWTH_METHODS plus their dispersion
+
+    Args:
+        fcff: Values by fiscal year, oldest first: one company (1-D) or a
+              companies x years matrix; NaN marks a missing year
+        revenue: Revenue, same shape (revenue_cagr is NaN without it)
+        ebit: EBIT, same shape (ebit_cagr is NaN without it)
+
+    Returns:
+        {name: array per company} for GROWTH_METHODS, DISPERSION_COLUMNS,
+        "observations" (positive FCFF years), "non_positive" (negative
+        or zero FCFF years) and "cagr_years" (the compounding period of
+        the FCFF cagr, 0 when it is NaN); floats instead of arrays for 1-D input
+    """
+    fcff = np.asarray(fcff, dtype=float)
+    single = fcff.ndim == 1
+    fcff = np.atleast_2d(fcff)
+    if fcff.shape[1] == 0:
+        fcff, revenue, ebit = np.full((len(fcff), 1), np.nan), None, None
+    missing = np.full(fcff.shape, np.nan)
+
+    def matrix(values):
+        return missing if values is None else _positive(np.atleast_2d(np.asarray(values, dtype=float)))
+
+    positive = _positive(fcff)
+    results = {
+        "cagr": cagr(positive),
+        "log_linear": log_linear_growth(positive),
+        "median_yoy": median_yoy_growth(positive),
+        "revenue_cagr": cagr(matrix(revenue)),
+        "ebit_cagr": cagr(matrix(ebit)),
+    }
+
+    # Dispersion across methods, one row per company; NaN where no method applies
+    stacked = np.column_stack([results[method] for method in GROWTH_METHODS])
+    available = ~np.isnan(stacked)
+    count = available.sum(axis=1)
+    some = count > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(available, stacked, 0).sum(axis=1) / count
+        deviation = np.where(available, stacked - mean[:, None], 0)
+        results.update({
+            "methods": count,
+            "mean": mean,
+            "median": _row_median(stacked),
+            "std": np.sqrt((deviation * deviation).sum(axis=1) / count),
+            "min": np.where(some, np.where(available, stacked, np.inf).min(axis=1), np.nan),
+            "max": np.where(some, np.where(available, stacked, -np.inf).max(axis=1), np.nan),
+        })
+    results["spread"] = results["max"] - results["min"]
+    results["observations"] = (~np.isnan(positive)).sum(axis=1)
+    results["non_positive"] = (fcff <= 0).sum(axis=1)
+    first, last = _first_last(positive)
+    results["cagr_years"] = last - first
+
+    if single:
+        return {name: values[0].item() for name, values in results.items()}
+    return results
+
+
+def pivot_years(company_id: np.ndarray, fiscal_year: np.ndarray,
+                columns: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Columnar company-years into companies x fiscal years matrices
+
+    Years a company lacks are NaN; of several periods in one fiscal year
+    the last in input order is kept.
+
+    Returns:
+        (company_ids, fiscal_years, {name: matrix})
+    """
+    company_id = np.asarray(company_id)
+    fiscal_year = np.asarray(fiscal_year, dtype=np.int64)
+    company_ids, rows = np.unique(company_id, return_inverse=True)
+    if not len(fiscal_year):
+        return company_ids, fiscal_year, {name: np.zeros((0, 0)) for name in columns}
+
+    first_year = fiscal_year.min()
+    fiscal_years = np.arange(first_year, fiscal_year.max() + 1)
+    cols = fiscal_year - first_year
+    matrices = {}
+    for name, values in columns.items():
+        matrix = np.full((len(company_ids), len(fiscal_years)), np.nan)
+        matrix[rows, cols] = values
+        matrices[name] = matrix
+    return company_ids, fiscal_years, matrices
+
+
+def growth_from_history(arrays: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    growth_estimates() per company from columnar company-years
+
+    Args:
+        arrays: company_id, fiscal_year and fcff, optionally revenue and
+                ebit (BatchFCFFEngine.compute() or
+                FCFFCalculator.historical_fcff_arrays() output)
+
+    Returns:
+        growth_estimates() output plus "company_id", one entry per company
+    """
+    drivers = [name for name in ("fcff", "revenue", "ebit") if name in arrays]
+    company_ids, _, matrices = pivot_years(arrays["company_id"], arrays["fiscal_year"],
+                                           {name: arrays[name] for name in drivers})
+    if not len(company_ids):
+        return {"company_id": company_ids, **growth_estimates(np.zeros((0, 0)))}
+    return {"company_id": company_ids,
+            **growth_estimates(matrices["fcff"], matrices.get("revenue"), matrices.get("ebit"))}
+
+
+class GrowthAnalyzer:
+    """
+    Growth estimates for a whole universe of companies
+
+    FCFF comes from BatchFCFFEngine, so the universe costs one query per
+    chunk of companies and one NumPy pass for every estimator.
+    """
+
+    def __init__(self, db_connection: sqlite3.Connection, **engine_options):
+        """
+        Args:
+            db_connection: Source database
+            engine_options: chunk_size / max_workers for BatchFCFFEngine
+        """
+        from valuation.batch_fcff import BatchFCFFEngine  # imports valuation.fcff, which imports this module
+
+        self.db = db_connection
+        self.engine = BatchFCFFEngine(self.db, **engine_options)
+
+    def analyze(self, company_ids: Optional[List[int]] = None, years: int = 10) -> Dict[str, np.ndarray]:
+        """
+        Growth estimates over each company's last N fiscal years
+
+        Returns:
+            growth_from_history() output, ordered by company_id
+        """
+        return growth_from_history(self.engine.compute(company_ids, years))
+
+    @staticmethod
+    def screen(results: Dict[str, np.ndarray], min_growth: float,
+               method: str = "log_linear", max_spread: Optional[float] = None) -> np.ndarray:
+        """
+        Companies whose `method` estimate is at least min_growth
+
+        Args:
+            results: analyze() output
+            min_growth: Minimum annual growth rate
+            method: One of GROWTH_METHODS, or "median" for the cross-method median
+            max_spread: Also require the methods to agree within this range
+
+        Returns:
+            Matching company ids
+        """
+        selected = results[method] >= min_growth  # NaN never passes
+        if max_spread is not None:
+            selected &= results["spread"] <= max_spread
+        return results["company_id"][selected]
+
+
+if __name__ == "__main__":
+    from database.schema import FinancialDatabaseSchema
+
+    parser = argparse.ArgumentParser(description="Growth estimates for every company")
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--min-growth", type=float, default=0.05)
+    args = parser.parse_args()
+
+    conn = FinancialDatabaseSchema.get_read_connection()
+    results = GrowthAnalyzer(conn).analyze(years=args.years)
+    for i, company_id in enumerate(results["company_id"][:10].tolist()):
+        print(f"company {company_id}: " + ", ".join(
+            f"{method} {results[method][i] * 100:.1f}%" for method in GROWTH_METHODS
+        ) + f" (spread {results['spread'][i] * 100:.1f} pts)")
+    growers = GrowthAnalyzer.screen(results, args.min_growth)
+    print(f"{len(growers):,} companies growing at least {args.min_growth:.0%} a year")
+    conn.close()